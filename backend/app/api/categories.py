@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.deps import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.core.deps import DbSession, get_read_session, get_session
+from app.core.etag import cache_headers, etag_matches, not_modified
+from app.core.serialization import json_response
 from app.schemas.category import CategoryCreate, CategoryResponse
 from app.services import category_service
 
@@ -8,10 +9,14 @@ router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 @router.get("", response_model=list[CategoryResponse])
-def list_categories(db: Session = Depends(get_db)):
-    return category_service.list_categories(db)
+async def list_categories(request: Request, db: DbSession = Depends(get_read_session)):
+    """分类列表来自进程内缓存；ETag 为缓存内容摘要，命中 If-None-Match 时返回 304。"""
+    snapshot = await db.run_sync(category_service.snapshot)
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    return json_response(snapshot.body, headers=cache_headers(snapshot.etag))
 
 
 @router.post("", response_model=CategoryResponse)
-def create_category(data: CategoryCreate, db: Session = Depends(get_db)):
-    return category_service.create_category(db, data)
\ No newline at end of file
+async def create_category(data: CategoryCreate, db: DbSession = Depends(get_session)):
+    return await db.run_sync(category_service.create_category, data)
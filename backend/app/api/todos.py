@@ -1,13 +1,31 @@
-from datetime import datetime
+from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.core.deps import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.core.deps import DbSession, get_read_session, get_session
+from app.core.etag import cache_headers, etag_matches, make_etag, not_modified
 from app.core.logging import get_logger
-from app.schemas.todo import TodoCreate, TodoUpdate, TodoResponse
-from app.services import todo_service
-from app.llm.ali_client import parse_natural_language_to_todo
+from app.core.serialization import json_response, row_to_json, rows_to_json, to_json, to_ndjson
+from app.db import replicas
+from app.db.session import session_scope
+from app.models.models import TodoArchive
+from app.schemas.todo import (
+    NlJobResponse,
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchResult,
+    TodoBatchUpdate,
+    TodoChangesResponse,
+    TodoCreate,
+    TodoImportResult,
+    TodoResponse,
+    TodoStatsResponse,
+    TodoUpdate,
+)
+from app.services import archive_service, change_service, event_service, nl_job_service, nl_todo_service, search_service, stats_service, todo_service, transfer_service
+from app.llm.ali_client import LLMUnavailableError
 
 logger = get_logger(__name__)
 
@@ -18,74 +36,315 @@ class NaturalLanguageTodoBody(BaseModel):
     text: str
 
 
+class NaturalLanguageTodoBatchBody(BaseModel):
+    texts: list[str] = Field(..., min_length=1, max_length=200)
+
+
 @router.get("", response_model=list[TodoResponse])
-def list_todos(
-    db: Session = Depends(get_db),
+async def list_todos(
+    request: Request,
+    db: DbSession = Depends(get_read_session),
     status: str | None = Query(None),
     priority: str | None = Query(None),
     category_id: int | None = Query(None),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值，传入后忽略 offset"),
+    sort: str = Query("id", pattern="^(id|due_date)$"),
+    with_total: bool = Query(False, description="是否返回精确总数（响应头 X-Total-Count）"),
+    estimate_total: bool = Query(False, description="返回估算总数（PostgreSQL 使用查询计划估计，代价远低于 COUNT）"),
+    include_archived: bool = Query(False, description="是否包含已归档（完成较久、移入归档表）的待办"),
+):
+    """
+    列表为数组；下一页游标放在响应头 X-Next-Cursor，总数（按需）放在 X-Total-Count。
+    查询结果为元组，直接序列化为 JSON 字节返回，不再经 response_model 逐行校验（格式不变）。
+    支持 If-None-Match：数据版本号与查询参数都未变时直接 304，不执行列表查询。
+    """
+    version = await db.run_sync(todo_service.list_version)
+    etag = make_etag("todos", version, sorted(request.query_params.multi_items()))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        rows, total, next_cursor = await db.run_sync(
+            todo_service.list_todos,
+            status=status,
+            priority=priority,
+            category_id=category_id,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            sort=sort,
+            with_total=with_total,
+            estimate_total=estimate_total,
+            include_archived=include_archived,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = cache_headers(etag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return json_response(rows_to_json(todo_service.READ_FIELDS, rows), headers=headers)
+
+
+# 事件流、增量同步、导入导出、统计、搜索、批量与任务接口需注册在 /{todo_id} 之前，避免 "batch" 被当作 todo_id 匹配
+@router.get("/events")
+async def todo_events(
+    last_event_id: str | None = Header(None),
+    since: str | None = Query(None, description="与 Last-Event-ID 相同，供无法设置请求头的客户端使用"),
+):
+    """
+    待办与分类的变更事件流（text/event-stream）。事件：
+    - ready：连接建立，data.seq 为当前版本号；resumed=false 时客户端应（重新）加载列表；
+    - reset：Last-Event-ID 过旧、缓冲中已无法补齐，客户端应重新加载列表；
+    - change：{"seq", "type": "todo"|"category", "changes": [{"op": "upsert"|"delete", "id", "todo"|"category"}]}，
+      大批量变更可能只带 id，或为 {"reload": true}。
+    断线后浏览器 EventSource 会自动带 Last-Event-ID 重连并补发期间的事件。
+    """
+    last_id = event_service.parse_last_event_id(last_event_id or since)
+    # 只在建立连接时短暂占用数据库会话，事件流本身不持有连接
+    async with session_scope() as db:
+        current = await db.run_sync(todo_service.list_version)
+    return StreamingResponse(
+        event_service.stream(last_id, current),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/changes", response_model=TodoChangesResponse)
+async def todo_changes(
+    request: Request,
+    db: DbSession = Depends(get_read_session),
+    since: str | None = Query(None, description="上次响应的 watermark；不传为全量同步"),
+    limit: int = Query(500, ge=1, le=1000),
+):
+    """
+    增量同步：返回 since 之后改动过的待办（op=upsert）与删除（op=delete），按变更序号升序，耗时只与变更条数有关。
+    has_more 为 true 时用返回的 watermark 继续请求，直到为 false 后保存 watermark 供下次使用。
+    since 早于已清理的删除记录时返回 410，客户端应不带 since 重新全量同步。支持 If-None-Match。
+    """
+    version = await db.run_sync(todo_service.list_version)
+    etag = make_etag("todos-changes", version, sorted(request.query_params.multi_items()))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        result = await db.run_sync(change_service.list_changes, since, limit)
+    except change_service.TombstonesExpired:
+        raise HTTPException(status_code=410, detail="since 过旧，期间的删除记录已清理，请不带 since 全量同步")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(to_json(result), headers=cache_headers(etag))
+
+
+@router.get("/export")
+async def export_todos(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: str | None = Query(None),
+    priority: str | None = Query(None),
+    category_id: int | None = Query(None),
 ):
-    items, _ = todo_service.list_todos(db, status=status, priority=priority, category_id=category_id, limit=limit, offset=offset)
-    return items
+    """
+    流式导出全部（或按条件筛选的）待办，按 id 升序；NDJSON 每行一个对象，CSV 首行为表头，字段同列表接口。
+    服务端游标分块读取，内存占用与行数无关。配置了只读副本时在副本上导出。
+    """
+    chunks = transfer_service.export_todos(
+        format, status=status, priority=priority, category_id=category_id, replica=replicas.choose(request),
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=transfer_service.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+
+@router.post("/import", response_model=TodoImportResult)
+async def import_todos(
+    request: Request,
+    db: DbSession = Depends(get_session),
+    format: str | None = Query(None, pattern="^(ndjson|csv)$", description="默认按 Content-Type 判断，含 csv 时为 CSV"),
+):
+    """
+    流式导入：请求体为 NDJSON（每行一个对象）或带表头的 CSV，字段 title / description / status / priority /
+    due_date / category_id，其余列（如导出文件中的 id、时间戳）忽略。逐行校验，无效行跳过并按行号报告，
+    有效行分批写入（PostgreSQL 为 COPY），每批一个事务。
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    return await transfer_service.import_todos(db, fmt, request.stream())
+
+
+@router.get("/stats", response_model=TodoStatsResponse)
+async def todo_stats(
+    request: Request,
+    db: DbSession = Depends(get_read_session),
+    today: date | None = Query(None, description="计算逾期 / 今天到期所用的日期，默认服务器当天"),
+):
+    """按状态、优先级、分类的计数与逾期、今天到期数，读计数器表，不扫描待办。支持 If-None-Match。"""
+    today = today or date.today()
+    version = await db.run_sync(todo_service.list_version)
+    etag = make_etag("todos-stats", version, today.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    stats = await db.run_sync(stats_service.get_stats, today)
+    return json_response(to_json(stats), headers=cache_headers(etag))
+
+
+@router.get("/search", response_model=list[TodoResponse])
+async def search_todos(
+    request: Request,
+    db: DbSession = Depends(get_read_session),
+    q: str = Query(..., min_length=1, max_length=100, description="搜索词，多个词用空格分隔（AND）"),
+    status: str | None = Query(None),
+    priority: str | None = Query(None),
+    category_id: int | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+):
+    """按标题与描述全文搜索，结果按相关度排序；可与列表相同的筛选条件组合，游标分页。支持 If-None-Match。"""
+    version = await db.run_sync(todo_service.list_version)
+    etag = make_etag("todos-search", version, sorted(request.query_params.multi_items()))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        rows, next_cursor = await db.run_sync(
+            search_service.search_todos,
+            q,
+            status=status,
+            priority=priority,
+            category_id=category_id,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = cache_headers(etag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return json_response(rows_to_json(todo_service.READ_FIELDS, rows), headers=headers)
+
+
+@router.post("/batch", response_model=list[TodoBatchResult])
+async def create_todos_batch(body: TodoBatchCreate, db: DbSession = Depends(get_session)):
+    """批量创建，整批一个事务；返回逐条结果（顺序与请求一致）。"""
+    return await db.run_sync(todo_service.create_todos, body.items)
+
+
+@router.patch("/batch", response_model=list[TodoBatchResult])
+async def patch_todos_batch(body: TodoBatchUpdate, db: DbSession = Depends(get_session)):
+    """批量部分更新，每条需带 id，其余字段语义同 PATCH /todos/{id}。"""
+    return await db.run_sync(todo_service.update_todos, body.items)
+
+
+@router.delete("/batch", response_model=list[TodoBatchResult])
+async def delete_todos_batch(body: TodoBatchDelete, db: DbSession = Depends(get_session)):
+    """批量删除，请求体 {"ids": [...]}。"""
+    return await db.run_sync(todo_service.delete_todos, body.ids)
+
+
+@router.post("/jobs", response_model=NlJobResponse, status_code=202)
+async def create_nl_job(body: NaturalLanguageTodoBody, response: Response, db: DbSession = Depends(get_session)):
+    """自然语言创建待办的异步模式：立即返回 202 与任务 id，结果通过 GET /todos/jobs/{id} 查询。"""
+    try:
+        job_id = await nl_job_service.submit(db, body.text)
+    except nl_job_service.JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    response.headers["Location"] = f"/todos/jobs/{job_id}"
+    return await db.run_sync(nl_job_service.get_job, job_id)
+
+
+@router.get("/jobs/{job_id}", response_model=NlJobResponse)
+async def get_nl_job(job_id: str, db: DbSession = Depends(get_read_session)):
+    job = await db.run_sync(nl_job_service.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
 
 
 @router.get("/{todo_id}", response_model=TodoResponse)
-def get_todo(todo_id: int, db: Session = Depends(get_db)):
-    item = todo_service.get_todo(db, todo_id)
-    if not item:
+async def get_todo(
+    todo_id: int,
+    db: DbSession = Depends(get_read_session),
+    include_archived: bool = Query(False, description="热表中不存在时再查归档表，命中时响应头 X-Archived: true"),
+):
+    row = await db.run_sync(todo_service.get_todo, todo_id)
+    headers = None
+    if not row and include_archived:
+        row = await db.run_sync(todo_service.get_todo, todo_id, TodoArchive)
+        headers = {"X-Archived": "true"}
+    if not row:
         raise HTTPException(status_code=404, detail="待办不存在")
-    return item
+    return json_response(row_to_json(todo_service.READ_FIELDS, row), headers=headers)
 
 
 @router.post("", response_model=TodoResponse)
-def create_todo(data: TodoCreate, db: Session = Depends(get_db)):
-    return todo_service.create_todo(db, data)
+async def create_todo(data: TodoCreate, db: DbSession = Depends(get_session)):
+    return await db.run_sync(todo_service.create_todo, data)
 
 
 @router.post("/from-natural-language", response_model=TodoResponse)
-def create_todo_from_natural_language(body: NaturalLanguageTodoBody, db: Session = Depends(get_db)):
-    """用自然语言描述一句话，由阿里 API 解析为待办字段并创建任务。"""
+async def create_todo_from_natural_language(
+    body: NaturalLanguageTodoBody, response: Response, db: DbSession = Depends(get_session)
+):
+    """用自然语言描述一句话，由阿里 API 解析为待办字段并创建任务；相同句子当天命中解析缓存。"""
     try:
-        parsed = parse_natural_language_to_todo(body.text)
+        item, source = await nl_todo_service.create_from_text(db, body.text)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except LLMUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         logger.exception("from-natural-language llm call failed: %s", e)
         raise HTTPException(status_code=502, detail=f"调用解析服务失败: {e}")
+    response.headers["X-NL-Parse-Source"] = source
+    return item
 
-    due_date_str = parsed.get("due_date")
-    due_date = None
-    if due_date_str and isinstance(due_date_str, str):
-        try:
-            due_date = datetime.strptime(due_date_str.strip()[:10], "%Y-%m-%d").date()
-        except ValueError:
-            pass
-    parsed["due_date"] = due_date
 
-    data = TodoCreate(**parsed)
-    return todo_service.create_todo(db, data)
+@router.post("/from-natural-language/batch")
+async def create_todos_from_natural_language_batch(body: NaturalLanguageTodoBatchBody):
+    """
+    批量自然语言创建，响应为 NDJSON 流：每行一条结果 {index, id, ok, item, error, source}，
+    index 为请求中的序号；多句打包为一次 LLM 调用，每包完成即写库并输出，行的顺序不保证与请求一致。
+    """
+    async def lines():
+        async for results in nl_todo_service.create_many_from_texts(body.texts):
+            for result in results:
+                yield to_ndjson(result)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.put("/{todo_id}", response_model=TodoResponse)
-def update_todo(todo_id: int, data: TodoUpdate, db: Session = Depends(get_db)):
-    item = todo_service.update_todo_full(db, todo_id, data)
+async def update_todo(todo_id: int, data: TodoUpdate, db: DbSession = Depends(get_session)):
+    item = await db.run_sync(todo_service.update_todo_full, todo_id, data)
     if not item:
         raise HTTPException(status_code=404, detail="待办不存在")
     return item
 
 
 @router.patch("/{todo_id}", response_model=TodoResponse)
-def patch_todo(todo_id: int, data: TodoUpdate, db: Session = Depends(get_db)):
-    item = todo_service.update_todo_partial(db, todo_id, data)
+async def patch_todo(todo_id: int, data: TodoUpdate, db: DbSession = Depends(get_session)):
+    item = await db.run_sync(todo_service.update_todo_partial, todo_id, data)
     if not item:
         raise HTTPException(status_code=404, detail="待办不存在")
     return item
 
 
+@router.post("/{todo_id}/restore", response_model=TodoResponse)
+async def restore_todo(todo_id: int, db: DbSession = Depends(get_session)):
+    """把已归档的待办移回热表（更新时间刷新为当前时间，不会马上被再次归档）。"""
+    try:
+        item = await db.run_sync(archive_service.restore_todo, todo_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not item:
+        raise HTTPException(status_code=404, detail="归档中不存在该待办")
+    return item
+
+
 @router.delete("/{todo_id}", status_code=204)
-def delete_todo(todo_id: int, db: Session = Depends(get_db)):
-    ok = todo_service.delete_todo(db, todo_id)
+async def delete_todo(todo_id: int, db: DbSession = Depends(get_session)):
+    ok = await db.run_sync(todo_service.delete_todo, todo_id)
     if not ok:
         raise HTTPException(status_code=404, detail="待办不存在")
\ No newline at end of file
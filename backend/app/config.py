@@ -8,17 +8,118 @@ if _env_path.exists():
     load_dotenv(_env_path)
 
 
+def _to_async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
 class Settings:
     """从环境变量读取配置，带默认值。"""
     def __init__(self):
         self.DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text / json
+        # 成功请求（状态码 < 400）访问日志的采样率，0～1；失败请求与异常始终记录
+        self.LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1"))
+        # Prometheus 指标（GET /metrics）；多 worker 时另设 PROMETHEUS_MULTIPROC_DIR
+        self.METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        # 响应头 X-DB-Queries / Server-Timing 输出本请求的 SQL 条数与耗时，默认仅 DEBUG 下开启
+        self.DB_QUERY_HEADERS = os.getenv("DB_QUERY_HEADERS", str(self.DEBUG)).lower() in ("1", "true", "yes")
+        # 同一请求内同一条 SELECT 执行次数达到该值时记录疑似 N+1 告警，0 关闭
+        self.DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+        # 前端静态文件改动后自动重新加载（本地开发用），默认仅 DEBUG 下开启；关闭时前端改动需重启进程
+        self.FRONTEND_RELOAD = os.getenv("FRONTEND_RELOAD", str(self.DEBUG)).lower() in ("1", "true", "yes")
         self.DATABASE_URL = os.getenv("DATABASE_URL", "")
+        # 连接池大小（同步/异步引擎共用）
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        # 异步数据库模式：路由通过 AsyncSession（asyncpg）访问数据库，不再占用线程池
+        self.DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+        # 异步驱动连接串，未配置时由 DATABASE_URL 推导（postgresql -> postgresql+asyncpg，sqlite -> sqlite+aiosqlite）
+        self.DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL", "") or _to_async_url(self.DATABASE_URL)
+        # 只读副本连接串，逗号分隔；配置后 GET 接口轮询读副本，见 app/db/replicas.py
+        _read_urls = os.getenv("DATABASE_READ_URLS", "")
+        self.DATABASE_READ_URLS = [x.strip() for x in _read_urls.split(",") if x.strip()]
+        # 副本检查间隔；落后主库超过 DB_REPLICA_MAX_LAG_SECONDS 的副本暂不参与读
+        self.DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "1"))
+        self.DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+        self.DB_REPLICA_CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "3"))  # 秒，仅 PostgreSQL
+        # 读己之写：客户端写入成功后这段时间内的读请求走主库
+        self.DB_READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+        # 分类缓存兜底过期时间（秒）；PostgreSQL 下新建分类会通过 NOTIFY 立即失效各 worker 的缓存
+        self.CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "300"))
+        # 变更事件推送（GET /todos/events）：每进程缓冲最近的事件供 Last-Event-ID 续传，每个连接的待发队列上限
+        self.SSE_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", "1000"))
+        self.SSE_CLIENT_QUEUE_SIZE = int(os.getenv("SSE_CLIENT_QUEUE_SIZE", "256"))
+        self.SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+        self.SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))  # 断线后浏览器的重连间隔
+        # 增量同步（GET /todos/changes）的删除墓碑保留天数，超过的由 scripts.todo_tombstones purge 清理
+        self.TODO_TOMBSTONE_RETENTION_DAYS = float(os.getenv("TODO_TOMBSTONE_RETENTION_DAYS", "30"))
+        # 批量导出每次从服务端游标取的行数；批量导入每批写库（COPY / executemany）的行数
+        self.TODO_EXPORT_CHUNK_ROWS = int(os.getenv("TODO_EXPORT_CHUNK_ROWS", "2000"))
+        self.TODO_IMPORT_BATCH_ROWS = int(os.getenv("TODO_IMPORT_BATCH_ROWS", "5000"))
+        # 冷热分离：完成超过该天数的待办由后台任务移入归档表（0 关闭）；每批行数、两轮之间与批次之间的间隔（秒）
+        self.TODO_ARCHIVE_AFTER_DAYS = float(os.getenv("TODO_ARCHIVE_AFTER_DAYS", "0"))
+        self.TODO_ARCHIVE_BATCH_ROWS = int(os.getenv("TODO_ARCHIVE_BATCH_ROWS", "500"))
+        self.TODO_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("TODO_ARCHIVE_INTERVAL_SECONDS", "3600"))
+        self.TODO_ARCHIVE_PAUSE_SECONDS = float(os.getenv("TODO_ARCHIVE_PAUSE_SECONDS", "0.2"))
         self.BAILIAN_API_KEY = os.getenv("BAILIAN_API_KEY", "")
         # 阿里云百炼（DashScope）兼容 OpenAI 接口，用于自然语言解析等
         self.ALI_API_KEY = os.getenv("BAILIAN_API_KEY") or os.getenv("OPENAI_API_KEY") or ""
         self.ALI_BASE_URL = os.getenv("ALI_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
         self.ALI_MODEL = os.getenv("ALI_MODEL", "qwen-turbo")
+        # LLM 客户端：进程内复用连接池；超时、并发上限与熔断参数
+        self.LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        self.LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+        self.LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))  # 等待并发名额的最长时间
+        self.LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+        self.LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+        self.LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "5"))  # 连续失败多少次后熔断
+        self.LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+        # 自然语言解析缓存：进程内 LRU + 可选的数据库共享层
+        self.NL_CACHE_ENABLED = os.getenv("NL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.NL_CACHE_SIZE = int(os.getenv("NL_CACHE_SIZE", "1024"))
+        self.NL_CACHE_TTL = int(os.getenv("NL_CACHE_TTL", "86400"))  # 秒
+        self.NL_CACHE_DB = os.getenv("NL_CACHE_DB", "true").lower() in ("1", "true", "yes")
+        # 本地规则解析：置信度不低于阈值时不调用 LLM
+        self.NL_RULE_ENABLED = os.getenv("NL_RULE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.NL_RULE_MIN_CONFIDENCE = float(os.getenv("NL_RULE_MIN_CONFIDENCE", "0.8"))
+        # 批量自然语言解析：每次 LLM 调用最多打包的条数与字符数（受模型上下文与输出长度限制）
+        self.NL_BATCH_MAX_ITEMS = int(os.getenv("NL_BATCH_MAX_ITEMS", "20"))
+        self.NL_BATCH_MAX_CHARS = int(os.getenv("NL_BATCH_MAX_CHARS", "3000"))
+        # 自然语言后台任务：每个进程的 worker 数与队列长度，队列满时返回 503
+        self.NL_JOB_WORKERS = int(os.getenv("NL_JOB_WORKERS", "4"))
+        self.NL_JOB_QUEUE_SIZE = int(os.getenv("NL_JOB_QUEUE_SIZE", "100"))
+        self.NL_JOB_STALE_SECONDS = int(os.getenv("NL_JOB_STALE_SECONDS", "300"))  # running / queued 超过该时长未推进视为进程已退出，重新排队
+        # 每隔多少秒巡检一次滞留任务；执行被中断达到该次数的任务标记失败，不再重试
+        self.NL_JOB_SWEEP_SECONDS = float(os.getenv("NL_JOB_SWEEP_SECONDS", "60"))
+        self.NL_JOB_MAX_ATTEMPTS = int(os.getenv("NL_JOB_MAX_ATTEMPTS", "3"))
+        # 准入控制（app/core/admission.py）：按路由类别限制并发与排队时间，超出时快速返回 503；均为每进程
+        self.ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+        # 进程内处理中的请求总数上限；低优先级类别在达到其一定比例时即被拒绝，为 CRUD 留出余量
+        self.ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256"))
+        # 各类别并发上限（0 不限）与名额已满时最多排队的秒数
+        self.ADMISSION_CRUD_CONCURRENCY = int(os.getenv("ADMISSION_CRUD_CONCURRENCY", "0"))
+        self.ADMISSION_CRUD_QUEUE_SECONDS = float(os.getenv("ADMISSION_CRUD_QUEUE_SECONDS", "2"))
+        self.ADMISSION_HEAVY_CONCURRENCY = int(os.getenv("ADMISSION_HEAVY_CONCURRENCY", "8"))
+        self.ADMISSION_HEAVY_QUEUE_SECONDS = float(os.getenv("ADMISSION_HEAVY_QUEUE_SECONDS", "2"))
+        self.ADMISSION_NL_CONCURRENCY = int(os.getenv("ADMISSION_NL_CONCURRENCY", "16"))
+        self.ADMISSION_NL_QUEUE_SECONDS = float(os.getenv("ADMISSION_NL_QUEUE_SECONDS", "0.5"))
+        # GET /todos 的 offset 不小于该值时按重查询计入 heavy 类别
+        self.ADMISSION_DEEP_OFFSET = int(os.getenv("ADMISSION_DEEP_OFFSET", "1000"))
+        self.ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))  # 503 的 Retry-After
+        # 按客户端的令牌桶限流：每秒补充的令牌数（0 关闭）与桶容量；默认按连接来源 IP 区分，
+        # 部署在反向代理之后时设置 RATE_LIMIT_CLIENT_HEADER（如 X-Forwarded-For，取第一个地址）
+        self.RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+        self.RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "0")) or max(1.0, 2 * self.RATE_LIMIT_PER_SECOND)
+        self.RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER", "")
+        self.RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))  # 记录的客户端数上限，超出淘汰最久未访问的
         # CORS 允许的源，逗号分隔，如 "https://your-domain.com,https://www.your-domain.com"
         _origins = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
         self.CORS_ORIGINS = [x.strip() for x in _origins.split(",") if x.strip()]
@@ -0,0 +1,185 @@
+"""
+准入控制与限流，由 AdmissionMiddleware（app/core/middleware.py）在路由执行前调用，均为每进程、仅内存：
+- 请求按路径分类，类别带优先级：critical（/health、/metrics、静态文件、预检）不受任何限制；
+  crud 为普通增删改查；heavy 为深分页列表、搜索、导入导出、批量接口；nl 为自然语言解析（调用 LLM）；
+  events（SSE 长连接）只参与限流，不占并发名额；
+- 进程内处理中的请求达到 ADMISSION_MAX_IN_FLIGHT 乘以类别比例（crud 100%、heavy 75%、nl 50%）时，
+  新来的该类请求立即 503：过载时先丢弃自然语言解析与重查询，余量留给 CRUD 与健康检查；
+- 每个类别可设并发上限，名额满时按到达顺序排队，超过该类别的排队时间预算仍未拿到名额则 503；
+- 按客户端的令牌桶（RATE_LIMIT_PER_SECOND / RATE_LIMIT_BURST），不同类别消耗的令牌数不同，不足时 429；
+- 拒绝都带 Retry-After，决策计入 admission_decisions_total。
+多 worker 部署时各进程独立计数，整体上限约为单进程配置乘以 worker 数。
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+from starlette.types import Scope
+
+from app.config import settings
+from app.core import metrics
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class RouteClass:
+    """一个路由类别：优先级比例、限流消耗，以及并发名额（名额释放时直接交给排队最久的请求）。"""
+    __slots__ = ("name", "share", "cost", "limit", "queue_seconds", "in_flight", "_waiters")
+
+    def __init__(self, name: str, share: float | None, cost: float, limit: int = 0, queue_seconds: float = 0):
+        self.name = name
+        self.share = share  # None：不计入处理中请求总数，也不受过载丢弃影响
+        self.cost = cost
+        self.limit = limit
+        self.queue_seconds = queue_seconds
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> float | None:
+        """拿到名额返回排队秒数（未排队为 0），超过排队时间预算返回 None。只在事件循环中调用，无需加锁。"""
+        if not self.limit or (self.in_flight < self.limit and not self._waiters):
+            self.in_flight += 1
+            return 0.0
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait((fut,), timeout=self.queue_seconds)
+        except asyncio.CancelledError:
+            # 排队时客户端断开：已转给本请求的名额要还回去
+            if fut.done():
+                self.release()
+            else:
+                self._waiters.remove(fut)
+            raise
+        if not fut.done():
+            self._waiters.remove(fut)
+            return None
+        return time.perf_counter() - start
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # 名额直接转交，in_flight 不变
+                return
+        self.in_flight -= 1
+
+
+CRITICAL = RouteClass("critical", None, 0)
+EVENTS = RouteClass("events", None, 1)
+CRUD = RouteClass("crud", 1.0, 1, settings.ADMISSION_CRUD_CONCURRENCY, settings.ADMISSION_CRUD_QUEUE_SECONDS)
+HEAVY = RouteClass("heavy", 0.75, 5, settings.ADMISSION_HEAVY_CONCURRENCY, settings.ADMISSION_HEAVY_QUEUE_SECONDS)
+NL = RouteClass("nl", 0.5, 5, settings.ADMISSION_NL_CONCURRENCY, settings.ADMISSION_NL_QUEUE_SECONDS)
+
+_API_PREFIXES = ("/todos", "/categories")
+_HEAVY_PATHS = ("/todos/search", "/todos/export", "/todos/import", "/todos/batch")
+_NL_PATHS = ("/todos/from-natural-language", "/todos/from-natural-language/batch")
+
+
+def _deep_offset(query_string: bytes) -> bool:
+    if b"offset=" not in query_string or b"cursor=" in query_string:  # 带游标时 offset 被忽略
+        return False
+    for pair in query_string.split(b"&"):
+        key, _, value = pair.partition(b"=")
+        if key == b"offset" and value.isdigit():
+            return int(value) >= settings.ADMISSION_DEEP_OFFSET
+    return False
+
+
+def classify(scope: Scope) -> RouteClass:
+    path, method = scope["path"].rstrip("/") or "/", scope["method"]
+    if method == "OPTIONS" or not path.startswith(_API_PREFIXES):
+        return CRITICAL
+    if path in _NL_PATHS or (path == "/todos/jobs" and method == "POST"):
+        return NL
+    if path in _HEAVY_PATHS or (path == "/todos" and method == "GET" and _deep_offset(scope["query_string"])):
+        return HEAVY
+    if path == "/todos/events":
+        return EVENTS
+    return CRUD
+
+
+class _TokenBuckets:
+    """每个客户端一个令牌桶，按最近访问顺序保存，超过 max_clients 时淘汰最久未访问的（再来时桶是满的）。"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # client -> (令牌数, 更新时刻)
+
+    def take(self, client: str, cost: float) -> float:
+        """扣除 cost 个令牌，成功返回 0，否则返回还需等待的秒数（不扣除）。"""
+        now = time.monotonic()
+        cost = min(cost, self.burst)
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+_buckets = (
+    _TokenBuckets(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST, settings.RATE_LIMIT_MAX_CLIENTS)
+    if settings.RATE_LIMIT_PER_SECOND > 0 else None
+)
+_client_header = settings.RATE_LIMIT_CLIENT_HEADER.lower().encode("latin-1")
+_in_flight = 0  # 计入总数的类别中正在处理（已拿到名额）的请求数
+
+
+def client_key(scope: Scope) -> str:
+    if _client_header:
+        for key, value in scope["headers"]:
+            if key == _client_header:
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+def _reject(route_class: RouteClass, decision: str, status: int, detail: str, retry_after: float) -> Rejected:
+    metrics.ADMISSION_DECISIONS.labels(route_class.name, decision).inc()
+    return Rejected(status, detail, max(1, math.ceil(retry_after)))
+
+
+async def enter(route_class: RouteClass, scope: Scope) -> None:
+    """放行则占用名额（之后必须调用 leave），否则抛出 Rejected。"""
+    global _in_flight
+    if _buckets is not None and route_class.cost:
+        wait = _buckets.take(client_key(scope), route_class.cost)
+        if wait:
+            raise _reject(route_class, "rate_limited", 429, "请求过于频繁，请稍后重试", wait)
+    if route_class.share is None:
+        metrics.ADMISSION_DECISIONS.labels(route_class.name, "admitted").inc()
+        return
+    retry_after = settings.ADMISSION_RETRY_AFTER_SECONDS
+    if _in_flight >= settings.ADMISSION_MAX_IN_FLIGHT * route_class.share:
+        raise _reject(route_class, "shed", 503, "服务繁忙，请稍后重试", retry_after)
+    waited = await route_class.acquire()
+    if waited is None:
+        raise _reject(route_class, "queue_timeout", 503, "服务繁忙，排队超时，请稍后重试", retry_after)
+    if waited:
+        metrics.ADMISSION_QUEUE_SECONDS.labels(route_class.name).observe(waited)
+    _in_flight += 1
+    metrics.ADMISSION_DECISIONS.labels(route_class.name, "admitted").inc()
+
+
+def leave(route_class: RouteClass) -> None:
+    global _in_flight
+    if route_class.share is None:
+        return
+    route_class.release()
+    _in_flight -= 1
@@ -1,3 +1,4 @@
-from app.db.session import get_db
+from app.db.replicas import get_read_session
+from app.db.session import DbSession, get_db, get_session
 
-__all__ = ["get_db"]
\ No newline at end of file
+__all__ = ["DbSession", "get_db", "get_read_session", "get_session"]
@@ -0,0 +1,37 @@
+"""
+弱 ETag 与条件请求：列表接口先用廉价的版本水位算出 ETag，命中 If-None-Match 时直接 304，
+不执行列表查询也不序列化。
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _normalize(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """按弱比较规则检查 If-None-Match。"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = _normalize(etag)
+    return any(_normalize(t) == target for t in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def cache_headers(etag: str) -> dict:
+    # no-cache：浏览器可缓存但每次都带 If-None-Match 回源校验
+    return {"ETag": etag, "Cache-Control": "no-cache"}
@@ -1,17 +1,27 @@
 """
 统一日志模块：项目内通过 get_logger(__name__) 获取 logger，不在各处 print。
 支持 request_id：中间件设置后，本请求内所有日志自动带 request_id。
+输出经 QueueHandler 放入内存队列，由后台 QueueListener 线程写 stdout，请求线程 / 事件循环不阻塞在 I/O 上。
+LOG_FORMAT=json 时输出一行一个 JSON 对象，便于日志平台解析。
 """
+import atexit
 import logging
+import queue
 import sys
 from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any
 
+import orjson
+
 from app.config import settings
 
 # 当前请求的 request_id，由中间件设置
 request_id_ctx: ContextVar[str] = ContextVar("request_id", default="-")
 
+# 日志调用时通过 extra 传入、JSON 格式下单独输出的字段
+_EXTRA_FIELDS = ("method", "path", "status", "duration_ms")
+
 
 class RequestIdFilter(logging.Filter):
     """为每条 LogRecord 注入 request_id（从 contextvars 读取）。"""
@@ -20,23 +30,92 @@ class RequestIdFilter(logging.Filter):
         return True
 
 
+class JsonFormatter(logging.Formatter):
+    """一行一个 JSON 对象：ts / level / logger / request_id / msg，以及 extra 中的请求字段与异常堆栈。"""
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key in _EXTRA_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return orjson.dumps(data).decode()
+
+
+class _QueueHandler(QueueHandler):
+    """
+    在调用线程里只做必要的工作：取 request_id、拼好消息、把异常转成文本（跨线程后 traceback 对象不再可用），
+    最终格式化交给监听线程上的输出 handler。
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        "%(asctime)s [%(request_id)s] %(levelname)s %(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
+_level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = _QueueHandler(_queue)
+_queue_handler.setLevel(_level)
+_queue_handler.addFilter(RequestIdFilter())
+_listener: QueueListener | None = None
+
+
+def _output_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setLevel(_level)
+    handler.setFormatter(_build_formatter())
+    return handler
+
+
+def start_listener() -> None:
+    """首次 get_logger 时自动启动；进程退出时停止并写完队列中剩余的日志。"""
+    global _listener
+    if _listener is not None:
+        return
+    _listener = QueueListener(_queue, _output_handler(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_listener)
+
+
+def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     获取带统一配置的 logger。各模块使用 get_logger(__name__)。
-    日志格式：时间 [request_id] 级别 模块名: 消息
+    日志格式：时间 [request_id] 级别 模块名: 消息（LOG_FORMAT=json 时为 JSON）
     """
     logger = logging.getLogger(name)
     if logger.handlers:
         return logger
-    level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
-    logger.setLevel(level)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(level)
-    formatter = logging.Formatter(
-        "%(asctime)s [%(request_id)s] %(levelname)s %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    logger.addFilter(RequestIdFilter())
+    start_listener()
+    logger.setLevel(_level)
+    logger.addHandler(_queue_handler)
     return logger
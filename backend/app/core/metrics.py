@@ -0,0 +1,89 @@
+"""
+Prometheus 指标：HTTP 路由延迟 / 在途请求、准入决策、数据库连接池与每请求查询、LLM 调用延迟 / 错误 / token 用量。
+GET /metrics 输出文本格式。多 worker 部署时设置 PROMETHEUS_MULTIPROC_DIR（需在进程启动前设置，
+启动前清空该目录），各进程把数值写入共享的 mmap 文件，/metrics 汇总所有进程。
+热路径上只有一次 labels() 字典查找与几次加法，不加锁、不做 I/O。
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+# ---- HTTP ----
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（按路由模板）", ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "正在处理的 HTTP 请求数", ("method",), multiprocess_mode="livesum",
+)
+
+# ---- 准入控制 ----
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total", "准入决策：admitted / rate_limited / shed / queue_timeout", ("route_class", "decision"),
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "admission_queue_seconds", "因类别并发已满而排队等待的时间（只记录排过队的请求）", ("route_class",),
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+
+# ---- 数据库 ----
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "单条 SQL 执行耗时")
+DB_REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "每个请求执行的 SQL 条数", ("route",), buckets=_QUERY_BUCKETS,
+)
+DB_REQUEST_SECONDS = Histogram("db_time_per_request_seconds", "每个请求的 SQL 总耗时", ("route",))
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "已借出的连接数", ("pool",), multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "超出 pool_size 的连接数（可为负，表示池未满）", ("pool",), multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "连接池大小", ("pool",), multiprocess_mode="livesum")
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds", "从连接池获取连接的等待时间", ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_READS = Counter(
+    "db_reads_total", "读接口的会话去向：replica / primary（读己之写或无可用副本）/ fallback（副本出错改读主库）",
+    ("target",),
+)
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds", "副本落后主库的时间（按数据版本号估算），不可用时为 -1", ("replica",),
+    multiprocess_mode="max",
+)
+
+# ---- LLM ----
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM 接口调用耗时（不含等待并发名额）", ("outcome",), buckets=_LLM_BUCKETS,
+)
+LLM_ERRORS = Counter("llm_errors_total", "LLM 调用失败次数", ("error",))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM token 用量", ("kind",))
+
+
+def render() -> tuple[bytes, str]:
+    """返回 /metrics 的响应体与 Content-Type；多进程模式下汇总所有 worker。"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """worker 退出时调用，清理 livesum 类 Gauge 在本进程的取值。"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
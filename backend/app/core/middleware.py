@@ -0,0 +1,176 @@
+"""
+纯 ASGI 中间件：为每个请求生成/透传 request_id，统计本请求的 SQL（DB_QUERY_HEADERS 开启时输出 X-DB-Queries / Server-Timing），
+并记录访问日志（含耗时）；MetricsMiddleware 记录 Prometheus 指标；AdmissionMiddleware 做准入控制与限流；
+ReadYourWritesMiddleware 为写请求设置读主库窗口。
+不走 BaseHTTPMiddleware，没有额外的任务与内存流开销，流式响应（NDJSON 等）可以逐块送达。
+"""
+import random
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core import admission, metrics
+from app.core.logging import get_logger, request_id_ctx
+from app.db import instrumentation, replicas
+
+logger = get_logger("app.main")  # 沿用原访问日志的 logger 名，便于已有的日志检索
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header(scope, b"x-request-id") or str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id  # request.state.request_id
+        token = request_id_ctx.set(request_id)
+        stats, stats_token = instrumentation.begin_request(request_id)
+        method, path = scope["method"], scope["path"]
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                if settings.DB_QUERY_HEADERS:
+                    # 流式响应在响应头之后执行的 SQL 不计入
+                    headers.append("X-DB-Queries", str(stats.count))
+                    headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            logger.debug("request started %s %s", method, path)
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            duration_ms = (time.perf_counter() - start) * 1000
+            logger.exception(
+                "request failed %s %s %.2fms: %s", method, path, duration_ms, e,
+                extra={"method": method, "path": path, "status": 500, "duration_ms": round(duration_ms, 2)},
+            )
+            raise
+        else:
+            # 成功请求按 LOG_SUCCESS_SAMPLE_RATE 采样，4xx/5xx 始终记录
+            if status >= 400 or settings.LOG_SUCCESS_SAMPLE_RATE >= 1 or random.random() < settings.LOG_SUCCESS_SAMPLE_RATE:
+                duration_ms = (time.perf_counter() - start) * 1000
+                logger.info(
+                    "request finished %s %s %s %.2fms", method, path, status, duration_ms,
+                    extra={"method": method, "path": path, "status": status, "duration_ms": round(duration_ms, 2)},
+                )
+        finally:
+            instrumentation.end_request(stats, stats_token, method, path)
+            request_id_ctx.reset(token)
+
+
+def _route_label(scope: Scope) -> str:
+    """取路由模板（/todos/{todo_id}）而不是实际路径，避免标签基数失控。"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return "static" if scope.get("endpoint") is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """纯 ASGI：记录请求耗时、在途请求数，以及本请求内的 SQL 条数与耗时。"""
+    def __init__(self, app: ASGIApp, skip_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        in_flight = metrics.HTTP_IN_FLIGHT.labels(method)
+        stats = instrumentation.current_stats()  # 由外层 RequestContextMiddleware 设置
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_flight.dec()
+            route = _route_label(scope)
+            metrics.HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(duration)
+            if stats is not None:
+                metrics.DB_REQUEST_QUERIES.labels(route).observe(stats.count)
+                metrics.DB_REQUEST_SECONDS.labels(route).observe(stats.duration)
+
+
+class AdmissionMiddleware:
+    """纯 ASGI：按路由类别做并发限制、排队与过载丢弃，按客户端令牌桶限流，见 app/core/admission.py。"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = admission.classify(scope)
+        if route_class is admission.CRITICAL:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await admission.enter(route_class, scope)
+        except admission.Rejected as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status, headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.leave(route_class)
+
+
+class ReadYourWritesMiddleware:
+    """
+    纯 ASGI：写请求（GET / HEAD / OPTIONS 以外）成功后，在响应中带上读主库的截止时间（Cookie 与 X-Primary-Until 头），
+    此后 DB_READ_STICKY_SECONDS 内该客户端的 GET 不读只读副本，见 app/db/replicas.py。仅配置了副本时注册。
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.DB_READ_STICKY_SECONDS
+                until = f"{time.time() + window:.3f}"
+                headers = MutableHeaders(scope=message)
+                headers.append(replicas.STICKY_HEADER, until)
+                headers.append(
+                    "Set-Cookie",
+                    f"{replicas.STICKY_COOKIE}={until}; Max-Age={max(1, round(window))}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,31 @@
+"""
+快速 JSON 序列化：读路径直接把查询返回的元组转成 JSON 字节，跳过 Pydantic 校验与 jsonable_encoder。
+输出格式与 FastAPI 按 response_model 序列化一致（UTC 时间输出为 Z 后缀，非 ASCII 字符不转义）。
+"""
+from typing import Iterable, Sequence
+
+import orjson
+from fastapi import Response
+
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def to_json(obj) -> bytes:
+    return orjson.dumps(obj, option=_OPTIONS)
+
+
+def to_ndjson(obj) -> bytes:
+    """单行 NDJSON（末尾带换行），用于流式响应。"""
+    return orjson.dumps(obj, option=_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+def rows_to_json(fields: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    return orjson.dumps([dict(zip(fields, row)) for row in rows], option=_OPTIONS)
+
+
+def row_to_json(fields: Sequence[str], row: Sequence) -> bytes:
+    return orjson.dumps(dict(zip(fields, row)), option=_OPTIONS)
+
+
+def json_response(content: bytes, status_code: int = 200, headers: dict | None = None) -> Response:
+    return Response(content=content, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,231 @@
+"""
+前端静态文件（挂载在 /）：启动时把 frontend/ 读入内存，计算内容指纹并预压缩（gzip；安装了 brotli 包时加 br），
+请求时不读盘、不压缩，只按 Accept-Encoding 选出预先生成的字节返回。
+- 非 HTML 文件另以带指纹的文件名提供（app.js -> app.<hash>.js），响应 Cache-Control: immutable，浏览器一年内不再回源；
+  HTML 中引用这些文件的 href / src 改写为带指纹的 URL。HTML 与原文件名 no-cache，每次带 ETag 校验，发布后立即生效；
+- 按 Accept-Encoding 优先 br、其次 gzip，带 Vary: Accept-Encoding；压缩收益不足 10% 的文件只保留原文；
+- If-None-Match / If-Modified-Since 命中时返回 304；
+- FRONTEND_RELOAD（默认仅 DEBUG）开启时，请求 HTML 或原文件名时至多每秒在线程池中检查一次文件改动，有改动则重新加载，
+  本地改前端无需重启；上一版的指纹 URL 继续可用，更早的版本释放。关闭时请求路径上没有任何文件系统操作。
+"""
+import gzip
+import hashlib
+import mimetypes
+import posixpath
+import re
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import URL, Headers
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.config import settings
+from app.core.etag import etag_matches
+from app.core.logging import get_logger
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只提供 gzip
+    brotli = None
+
+logger = get_logger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+_CHECK_INTERVAL = 1.0
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+# HTML 中的 href="..." / src="..."，不含查询串与锚点部分
+_REF = re.compile(r"""(\b(?:href|src)\s*=\s*["'])([^"'?#]+)""")
+
+
+class _Asset:
+    """一个 URL 对应的预生成响应：各编码的字节、ETag 与缓存策略。"""
+    __slots__ = ("bodies", "etags", "media_type", "last_modified", "cache_control")
+
+    def __init__(self, data: bytes, media_type: str, digest: str, mtime: float, cache_control: str = "no-cache"):
+        self.bodies = {"identity": data}
+        if media_type.startswith(_COMPRESSIBLE):
+            for coding, compress in (("br", _brotli), ("gzip", _gzip)):
+                packed = compress(data)
+                if packed is not None and len(packed) < len(data) * 0.9:
+                    self.bodies[coding] = packed
+        self.etags = {coding: f'"{digest}-{coding}"' for coding in self.bodies}
+        self.media_type = media_type
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.cache_control = cache_control
+
+    def with_cache_control(self, cache_control: str) -> "_Asset":
+        twin = object.__new__(_Asset)
+        for name in self.__slots__:
+            setattr(twin, name, getattr(self, name))
+        twin.cache_control = cache_control
+        return twin
+
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes | None:
+    return brotli.compress(data, quality=11) if brotli is not None else None
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=5).hexdigest()
+
+
+def _fingerprinted(rel: str, digest: str) -> str:
+    stem, suffix = posixpath.splitext(rel)
+    return f"{stem}.{digest}{suffix}"
+
+
+def _rewrite_html(html: bytes, html_rel: str, renamed: dict[str, str]) -> bytes:
+    """把 HTML 中指向已知文件的相对 / 绝对引用替换为带指纹的文件名，其余引用（外链、data:）不动。"""
+    base = posixpath.dirname(html_rel)
+
+    def replace(m: re.Match) -> str:
+        ref = m.group(2).strip()
+        if "://" in ref or ref.startswith(("//", "data:", "mailto:")):
+            return m.group(0)
+        target = ref.lstrip("/") if ref.startswith("/") else posixpath.normpath(posixpath.join(base, ref))
+        if target not in renamed:
+            return m.group(0)
+        head, _, _ = ref.rpartition("/")
+        name = posixpath.basename(renamed[target])
+        return m.group(1) + (f"{head}/{name}" if head or ref.startswith("/") else name)
+
+    return _REF.sub(replace, html.decode("utf-8")).encode("utf-8")
+
+
+def _media_type(rel: str) -> str:
+    return mimetypes.guess_type(rel)[0] or "application/octet-stream"
+
+
+def _accepted(header: str) -> set[str]:
+    codings = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip().removeprefix("q=") if params.strip().startswith("q=") else "1"
+        try:
+            if float(q) > 0:
+                codings.add(coding.strip().lower())
+        except ValueError:
+            pass
+    return codings
+
+
+class FrontendFiles(StaticFiles):
+    """StaticFiles 的内存版本（html=True 语义），见模块说明。"""
+
+    def __init__(self, directory: str | Path, reload: bool | None = None):
+        super().__init__(directory=directory, html=True)
+        self._root = Path(directory)
+        self._watch = settings.FRONTEND_RELOAD if reload is None else reload
+        self._signature = None
+        self._assets: dict[str, _Asset] = {}
+        self._current: dict[str, _Asset] = {}
+        self._checked_at = 0.0
+        self._reload()
+
+    def _scan(self) -> list[tuple[str, Path, int, int]]:
+        entries = []
+        for p in sorted(self._root.rglob("*")):
+            if p.is_file():
+                st = p.stat()
+                entries.append((p.relative_to(self._root).as_posix(), p, st.st_mtime_ns, st.st_size))
+        return entries
+
+    def _reload(self) -> None:
+        entries = self._scan()
+        signature = [(rel, mtime, size) for rel, _, mtime, size in entries]
+        if signature == self._signature:
+            return
+        files = {rel: (p.read_bytes(), mtime / 1e9) for rel, p, mtime, _ in entries}
+        assets: dict[str, _Asset] = {}
+        renamed: dict[str, str] = {}
+        for rel, (data, mtime) in files.items():
+            if rel.endswith(".html"):
+                continue
+            digest = _digest(data)
+            asset = _Asset(data, _media_type(rel), digest, mtime)
+            renamed[rel] = _fingerprinted(rel, digest)
+            assets[rel] = asset
+            assets[renamed[rel]] = asset.with_cache_control(IMMUTABLE)
+        for rel, (data, mtime) in files.items():
+            if rel.endswith(".html"):
+                data = _rewrite_html(data, rel, renamed)
+                assets[rel] = _Asset(data, "text/html", _digest(data), mtime)
+        # 只保留上一版的指纹 URL（已打开的页面仍可能引用），更早的版本不再占用内存
+        previous = {k: v for k, v in self._current.items() if v.cache_control == IMMUTABLE and k not in assets}
+        self._current = assets
+        self._assets = {**previous, **assets}
+        self._signature = signature
+        logger.info(
+            "frontend assets loaded files=%s fingerprinted=%s brotli=%s",
+            len(files), len(renamed), brotli is not None,
+        )
+
+    async def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < _CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        await run_in_threadpool(self._reload)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        rel = Path(path).as_posix()
+        asset = self._assets.get(rel)
+        if self._watch and (asset is None or asset.cache_control != IMMUTABLE):
+            await self._maybe_reload()
+            asset = self._assets.get(rel)
+        if asset is None:
+            index = "index.html" if rel == "." else f"{rel}/index.html"
+            asset = self._assets.get(index)
+            if asset is not None and not scope["path"].endswith("/"):
+                url = URL(scope=scope)
+                return RedirectResponse(url=url.replace(path=url.path + "/"))
+        if asset is None:
+            asset = self._assets.get("404.html")
+            if asset is None:
+                raise HTTPException(status_code=404)
+            return self._respond(asset, scope, status_code=404)
+        return self._respond(asset, scope)
+
+    def _respond(self, asset: _Asset, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        accepted = _accepted(request_headers.get("accept-encoding", ""))
+        coding = next(
+            (c for c in ("br", "gzip") if c in asset.bodies and (c in accepted or "*" in accepted)), "identity",
+        )
+        headers = {
+            "ETag": asset.etags[coding],
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if status_code == 200 and self._not_modified(asset, scope, request_headers):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(asset.bodies[coding], status_code=status_code, headers=headers, media_type=asset.media_type)
+
+    @staticmethod
+    def _not_modified(asset: _Asset, scope: Scope, request_headers: Headers) -> bool:
+        if "if-none-match" in request_headers:
+            # 内容相同、编码不同的缓存副本都算命中
+            request = Request(scope)
+            return any(etag_matches(request, etag) for etag in asset.etags.values())
+        since = request_headers.get("if-modified-since")
+        if since:
+            try:
+                return parsedate_to_datetime(since) >= parsedate_to_datetime(asset.last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
@@ -0,0 +1,187 @@
+"""
+数据库埋点：通过引擎事件统计每条 SQL 的耗时，并按请求累计条数与耗时（ContextVar，中间件在请求开始时设置，带 request_id）；
+同一请求内同一条 SELECT 重复执行多次时记一条疑似 N+1 的告警。query_budget 用于测试中限制一段代码 / 一个接口的 SQL 条数。
+连接池借出 / 归还事件维护已借出连接数与 overflow，TimedQueuePool 记录获取连接的等待时间。
+同步引擎与异步引擎（async_engine.sync_engine）共用同一套监听。
+"""
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar, Token
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+from app.core import metrics
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueryStats:
+    """一段范围（一个请求 / 一个 query_budget）内的 SQL 统计；statements 按语句文本计数，用于发现 N+1。"""
+    __slots__ = ("request_id", "count", "duration", "statements")
+
+    def __init__(self, request_id: str = "-"):
+        self.request_id = request_id
+        self.count = 0
+        self.duration = 0.0
+        self.statements: dict[str, int] = {}
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """执行次数不少于 threshold 的 SELECT（参数不同、语句相同，多为循环里逐条查询）；pg_notify 不是读取，不计入。"""
+        return sorted(
+            ((sql, n) for sql, n in self.statements.items()
+             if n >= threshold and sql.lstrip()[:6].upper() == "SELECT" and "pg_notify(" not in sql),
+            key=lambda item: -item[1],
+        )
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("db_query_stats", default=None)
+# query_budget 注册的统计对象：不依赖 ContextVar，TestClient 在另一线程处理请求时也能统计到
+_budgets: list[QueryStats] = []
+_budgets_lock = threading.Lock()
+
+
+def begin_request(request_id: str = "-") -> tuple[QueryStats, Token]:
+    stats = QueryStats(request_id)
+    return stats, _current.set(stats)
+
+
+def end_request(stats: QueryStats, token: Token, method: str = "", path: str = "") -> None:
+    """请求结束：检查疑似 N+1（需在 request_id_ctx 复位前调用，日志才带 request_id）。"""
+    _current.reset(token)
+    threshold = settings.DB_N_PLUS_ONE_THRESHOLD
+    if threshold <= 0:
+        return
+    for sql, n in stats.repeated(threshold):
+        logger.warning(
+            "possible N+1: %s %s ran the same query %sx (%s queries total): %s",
+            method, path, n, stats.count, " ".join(sql.split())[:300],
+        )
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """SQL 条数超出预算；继承 AssertionError，pytest 中按断言失败展示。"""
+
+
+class query_budget(ContextDecorator):
+    """
+    限制范围内执行的 SQL 条数，超出时抛出 QueryBudgetExceeded 并列出执行过的语句。可作上下文管理器或装饰器：
+
+        with query_budget(3):
+            client.get("/todos")
+
+        @query_budget(2)
+        def test_get_todo(client): ...
+
+    统计的是全进程的 SQL（含 TestClient 线程里执行的），范围内不要并发跑其他数据库操作。
+    """
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.stats = QueryStats()
+
+    def __enter__(self) -> QueryStats:
+        self.stats = QueryStats()
+        with _budgets_lock:
+            _budgets.append(self.stats)
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        with _budgets_lock:
+            _budgets.remove(self.stats)
+        if exc_type is None and self.stats.count > self.max_queries:
+            lines = "\n".join(f"  {n}x {' '.join(sql.split())[:200]}" for sql, n in self.stats.statements.items())
+            raise QueryBudgetExceeded(f"执行了 {self.stats.count} 条 SQL，预算 {self.max_queries}：\n{lines}")
+        return False
+
+
+# ---- 引擎事件 ----
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    metrics.DB_QUERY_SECONDS.observe(duration)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if _budgets:
+        with _budgets_lock:
+            for budget in _budgets:
+                budget.record(statement, duration)
+
+
+def _handle_error(exception_context):
+    # 执行失败时不会触发 after_cursor_execute，弹出对应的开始时间
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+class _TimedGetMixin:
+    """记录从池中取连接的等待时间（含新建连接）。"""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT_SECONDS.labels(self.metrics_label).observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedGetMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedGetMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def instrument(engine, label: str) -> None:
+    """为同步引擎注册 SQL 计时；异步引擎传入 async_engine.sync_engine。"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    if settings.METRICS_ENABLED:
+        _instrument_pool(engine, label)
+
+
+def _instrument_pool(engine, label: str) -> None:
+    """连接池借出 / 归还监听：已借出连接数与 overflow。"""
+    checked_out = metrics.DB_POOL_CHECKED_OUT.labels(label)
+    overflow = metrics.DB_POOL_OVERFLOW.labels(label)
+    if isinstance(engine.pool, QueuePool):
+        metrics.DB_POOL_SIZE.labels(label).set(engine.pool.size())
+
+    def _update_overflow():
+        pool = engine.pool  # dispose() 后会换成新的池
+        if isinstance(pool, QueuePool):
+            overflow.set(pool.overflow())
+
+    def on_checkout(dbapi_conn, record, proxy):
+        checked_out.inc()
+        _update_overflow()
+
+    def on_checkin(dbapi_conn, record):
+        checked_out.dec()
+        _update_overflow()
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
@@ -0,0 +1,130 @@
+"""
+跨进程通知：写路径在事务内 publish，提交后送达所有 worker 的订阅回调。
+- PostgreSQL：pg_notify + 每个进程一条共享的 LISTEN 连接（后台线程），按 channel 分发。
+- 其他库（本地 SQLite）：仅在本进程内、于事务提交后直接回调订阅者。
+回调在监听线程中执行，应尽快返回；需要切回事件循环的订阅者自行 call_soon_threadsafe。
+"""
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.db import session as db_session
+
+logger = get_logger(__name__)
+
+# 回调签名：callback(payload)；payload 为 None 表示监听连接重建，期间的通知可能丢失，订阅者应全量失效
+Callback = Callable[[str | None], None]
+
+_subscribers: dict[str, list[Callback]] = defaultdict(list)
+_PENDING_KEY = "pending_notifies"
+
+
+def subscribe(channel: str, callback: Callback) -> None:
+    _subscribers[channel].append(callback)
+
+
+def _dispatch(channel: str, payload: str | None) -> None:
+    for callback in list(_subscribers.get(channel, ())):
+        try:
+            callback(payload)
+        except Exception:
+            logger.exception("notify callback failed channel=%s", channel)
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def publish(db: Session, channel: str, payload: str = "") -> None:
+    """在当前事务中登记一条通知，事务提交后才会送达；回滚则丢弃。"""
+    if _is_postgres(db):
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+    else:
+        db.info.setdefault(_PENDING_KEY, []).append((channel, payload))
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_local_notifies(session: Session) -> None:
+    for channel, payload in session.info.pop(_PENDING_KEY, ()):
+        _dispatch(channel, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_local_notifies(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class _PgListener(threading.Thread):
+    """每个进程一条 LISTEN 连接，断线后指数退避重连。"""
+    def __init__(self, engine):
+        super().__init__(name="pg-listener", daemon=True)
+        self.engine = engine
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                logger.warning("pg listener disconnected: %s, retry in %.0fs", e, backoff)
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self) -> None:
+        fairy = self.engine.raw_connection()
+        conn = fairy.driver_connection
+        fairy.detach()  # 长连接独占，不归还连接池
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for channel in list(_subscribers):
+                    cur.execute(f'LISTEN "{channel}"')
+            # 重连期间可能漏掉通知，让订阅者全量失效
+            for channel in list(_subscribers):
+                _dispatch(channel, None)
+            last_ping = time.monotonic()
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], 5.0) == ([], [], []):
+                    if time.monotonic() - last_ping > 30:
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT 1")
+                        last_ping = time.monotonic()
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    n = conn.notifies.pop(0)
+                    _dispatch(n.channel, n.payload)
+        finally:
+            conn.close()
+
+
+_listener: _PgListener | None = None
+
+
+def start_listener() -> None:
+    """应用启动时调用；仅 PostgreSQL 且有订阅者时启动监听线程。"""
+    global _listener
+    engine = db_session.engine
+    if engine is None or engine.dialect.name != "postgresql" or not _subscribers or _listener is not None:
+        return
+    _listener = _PgListener(engine)
+    _listener.start()
+    logger.info("pg listener started channels=%s", ",".join(_subscribers))
+
+
+def stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,226 @@
+"""
+只读副本（DATABASE_READ_URLS，逗号分隔）：GET 接口注入 get_read_session，读请求分摊到副本；写接口、事件流与后台任务仍用主库。
+- 每个请求轮询选一个可用副本，请求内的多条查询都在同一副本上执行，看到的是同一份数据；
+- 后台每 DB_REPLICA_CHECK_SECONDS 读一次主库与各副本的 todos 数据版本号：副本版本号低于主库时，
+  从主库最早出现更高版本号的那次检查起计算落后时间，超过 DB_REPLICA_MAX_LAG_SECONDS、连不上或检查结果过期的副本暂不参与；
+  按数据版本号而不是复制时间戳衡量，与复制方式无关，主库空闲时也不会误判为落后；
+- 请求中副本连接出错、或 service 抛出 StaleRead（副本比客户端已见的数据旧）时，本请求改用主库重做：
+  读路径的 service 函数都是只读的，可以安全重做；出错的副本在下次检查通过前不再参与；
+- 读己之写：写请求成功后响应设置 Cookie 与响应头 X-Primary-Until（截止时间戳，见 ReadYourWritesMiddleware），
+  DB_READ_STICKY_SECONDS 内该客户端的读请求走主库；不保存 Cookie 的客户端把该响应头原样放进请求头带回即可。
+没有配置副本时 get_read_session 直接给出主库会话，与 get_session 相同。
+"""
+import asyncio
+import contextlib
+import itertools
+import time
+from collections import deque
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.config import _to_async_url, settings
+from app.core import metrics
+from app.core.logging import get_logger
+from app.db import instrumentation
+from app.db import session as db_session
+from app.services import version_service
+
+logger = get_logger(__name__)
+
+STICKY_COOKIE = "db_primary_until"
+STICKY_HEADER = "X-Primary-Until"
+
+
+class StaleRead(ValueError):
+    """副本数据比请求所需的旧（如增量同步的 since 超出副本当前版本）；在主库上抛出时按普通 ValueError 处理。"""
+
+
+def _connect_args(url: str) -> dict:
+    # 副本宕机时尽快失败并改读主库，不卡在 TCP 连接上
+    if url.startswith("postgresql+asyncpg"):
+        return {"timeout": settings.DB_REPLICA_CONNECT_TIMEOUT}
+    if url.startswith(("postgresql", "postgres")):
+        return {"connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT}
+    return {}
+
+
+def _open(session_factory, async_session_factory):
+    if async_session_factory is not None:
+        return async_session_factory()
+    return db_session.ThreadedSession(session_factory())
+
+
+def _open_primary():
+    if db_session.SessionLocal is None:
+        raise RuntimeError("DATABASE_URL 未配置，无法使用数据库")
+    return _open(db_session.SessionLocal, db_session.AsyncSessionLocal)
+
+
+class Replica:
+    def __init__(self, index: int, url: str):
+        self.label = f"replica{index}"
+        self.name = make_url(url).render_as_string(hide_password=True)
+        # 检查用同步引擎，始终创建；DB_ASYNC 时请求走异步引擎
+        self.engine = create_engine(url, pool_pre_ping=True, connect_args=_connect_args(url), **db_session._pool_kwargs(url))
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        instrumentation.instrument(self.engine, self.label)
+        self.async_session_factory = None
+        if settings.DB_ASYNC:
+            async_url = _to_async_url(url)
+            async_engine = create_async_engine(
+                async_url, pool_pre_ping=True, connect_args=_connect_args(async_url), **db_session._pool_kwargs(async_url),
+            )
+            self.async_session_factory = async_sessionmaker(async_engine, autoflush=False)
+            instrumentation.instrument(async_engine.sync_engine, self.label + "-async")
+        self.usable: bool | None = None  # None：尚未检查过，不参与
+        self.checked_at = 0.0
+
+    def open(self):
+        return _open(self.session_factory, self.async_session_factory)
+
+    def update(self, lag: float | None, reason: str = "") -> None:
+        """记录一次检查结果；lag 为 None 表示不可用。"""
+        usable = lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if usable != self.usable:
+            if usable:
+                logger.info("read replica %s in rotation", self.name)
+            else:
+                logger.warning("read replica %s out of rotation: %s", self.name, reason or f"lag {lag:.1f}s")
+        self.usable = usable
+        self.checked_at = time.monotonic()
+        metrics.DB_REPLICA_LAG_SECONDS.labels(self.label).set(-1 if lag is None else lag)
+
+    def fail(self, exc: Exception) -> None:
+        self.update(None, f"{type(exc).__name__}: {exc}".splitlines()[0])
+
+
+replicas = [Replica(i, url) for i, url in enumerate(settings.DATABASE_READ_URLS)] if settings.DATABASE_URL else []
+_rotation = itertools.count()
+# 最近的 (检查时刻, 主库版本号)，保留足以判断是否超过最大落后时间的一段
+_history: deque[tuple[float, int]] = deque()
+_task: asyncio.Task | None = None
+
+
+def _read_version(session_factory) -> int:
+    with session_factory() as db:
+        return version_service.current(db, version_service.TODOS)
+
+
+def check() -> None:
+    """检查一次各副本（在线程池中执行）。先读主库再读副本，写入恰好发生在两次读之间时副本不会被误判为落后。"""
+    now = time.monotonic()
+    try:
+        primary = _read_version(db_session.SessionLocal)
+    except Exception as e:
+        logger.warning("read replica check skipped, primary unavailable: %s", e)
+        return
+    _history.append((now, primary))
+    horizon = now - settings.DB_REPLICA_MAX_LAG_SECONDS - 2 * settings.DB_REPLICA_CHECK_SECONDS
+    while _history[0][0] < horizon:
+        _history.popleft()
+    for replica in replicas:
+        try:
+            version = _read_version(replica.session_factory)
+        except Exception as e:
+            replica.fail(e)
+            continue
+        # 已裁掉的更早记录里主库版本号也不低于此，落后时间至少为保留的窗口长度，同样判为落后
+        lag = 0.0 if version >= primary else now - next(t for t, v in _history if v > version)
+        replica.update(lag)
+
+
+def _pick() -> Replica | None:
+    # 检查结果过期（检查本身卡住，如主库或副本网络中断）的副本同样不参与
+    fresh_after = time.monotonic() - settings.DB_REPLICA_MAX_LAG_SECONDS - settings.DB_REPLICA_CHECK_SECONDS
+    usable = [r for r in replicas if r.usable and r.checked_at >= fresh_after]
+    return usable[next(_rotation) % len(usable)] if usable else None
+
+
+def _sticky(request: Request) -> bool:
+    for value in (request.headers.get(STICKY_HEADER), request.cookies.get(STICKY_COOKIE)):
+        try:
+            if value and float(value) > time.time():
+                return True
+        except ValueError:
+            pass
+    return False
+
+
+def choose(request: Request) -> Replica | None:
+    """本请求读哪个副本；None 表示读主库（未配置副本、读己之写窗口内或没有可用副本）。"""
+    if not replicas:
+        return None
+    replica = None if _sticky(request) else _pick()
+    metrics.DB_READS.labels("replica" if replica is not None else "primary").inc()
+    return replica
+
+
+class ReadSession:
+    """
+    副本会话，run_sync / close 与 DbSession 一致。副本连接出错或 service 抛出 StaleRead 时关闭副本会话，
+    当前调用与本请求之后的调用都改在主库执行（只会从旧数据换到新数据，不会反过来）。
+    """
+    def __init__(self, replica: Replica):
+        self._replica: Replica | None = replica
+        self._db = replica.open()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        if self._replica is None:
+            return await self._db.run_sync(fn, *args, **kwargs)
+        try:
+            return await self._db.run_sync(fn, *args, **kwargs)
+        except StaleRead:
+            pass
+        except (OperationalError, InterfaceError, OSError, asyncio.TimeoutError) as e:
+            # asyncpg 建连失败抛出的是未经包装的 OSError / TimeoutError
+            self._replica.fail(e)
+        metrics.DB_READS.labels("fallback").inc()
+        replica_db, self._replica = self._db, None
+        self._db = _open_primary()
+        with contextlib.suppress(Exception):
+            await replica_db.close()
+        return await self._db.run_sync(fn, *args, **kwargs)
+
+    async def close(self):
+        await self._db.close()
+
+
+async def get_read_session(request: Request):
+    """供 GET 路由注入：可用时为副本会话（出错自动改读主库），否则为主库会话。"""
+    replica = choose(request)
+    db = ReadSession(replica) if replica is not None else _open_primary()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def _check_loop() -> None:
+    while True:
+        try:
+            await run_in_threadpool(check)
+        except Exception:
+            logger.exception("read replica check failed")
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_SECONDS)
+
+
+def start() -> None:
+    """应用启动时调用；首次检查通过前读请求走主库。"""
+    global _task
+    if replicas and _task is None:
+        _task = asyncio.get_running_loop().create_task(_check_loop())
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _task
+        _task = None
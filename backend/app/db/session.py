@@ -1,20 +1,72 @@
+from contextlib import asynccontextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.db import instrumentation
 
 # 仅当配置了 DATABASE_URL 时才创建引擎，避免未配库时启动报错
 engine = None
 SessionLocal = None
+# 异步引擎仅在 DB_ASYNC 开启时创建；同步引擎始终保留，供脚本与后台任务使用
+async_engine = None
+AsyncSessionLocal = None
 Base = declarative_base()
 
+
+def _pool_kwargs(url: str, poolclass=None) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    kwargs = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+    if settings.METRICS_ENABLED and poolclass is not None:
+        kwargs["poolclass"] = poolclass  # 记录获取连接的等待时间
+    return kwargs
+
+
 if getattr(settings, "DATABASE_URL", None):
     engine = create_engine(
         settings.DATABASE_URL,
         pool_pre_ping=True,
         echo=False,  # 开发时可改为 True 看 SQL
+        **_pool_kwargs(settings.DATABASE_URL, instrumentation.TimedQueuePool),
     )
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+    if settings.DB_ASYNC:
+        async_engine = create_async_engine(
+            settings.DATABASE_ASYNC_URL,
+            pool_pre_ping=True,
+            echo=False,
+            **_pool_kwargs(settings.DATABASE_ASYNC_URL, instrumentation.TimedAsyncQueuePool),
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+    # SQL 计数 / 计时（每请求统计、N+1 告警、query_budget）与连接池指标
+    instrumentation.instrument(engine, "sync")
+    if async_engine is not None:
+        instrumentation.instrument(async_engine.sync_engine, "async")
+
+
+class ThreadedSession:
+    """
+    同步 Session 的异步外观，接口与 AsyncSession.run_sync 一致：
+    run_sync(fn, *args) 在线程池中执行 fn(session, *args)。
+    路由统一写成 await db.run_sync(service_fn, ...)，由 DB_ASYNC 决定走线程池还是 asyncpg。
+    """
+    def __init__(self, session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.session.close)
+
+
+DbSession = AsyncSession | ThreadedSession
+
 
 def get_db():
     """供 FastAPI Depends 注入，请求结束时关闭 session。"""
@@ -24,4 +76,26 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_session():
+    """
+    供 async 路由注入：DB_ASYNC 开启时为 AsyncSession（service 函数经 run_sync 在 greenlet 中执行，
+    数据库 I/O 走 asyncpg，不占线程池）；否则为包装同步 Session 的 ThreadedSession。
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+    if SessionLocal is None:
+        raise RuntimeError("DATABASE_URL 未配置，无法使用数据库")
+    db = ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# 后台任务等不经过 Depends 的场景：async with session_scope() as db
+session_scope = asynccontextmanager(get_session)
@@ -1,70 +1,260 @@
 """
 阿里云百炼（DashScope）兼容 OpenAI 接口，用于自然语言解析等。
+客户端按进程复用（同步 / 异步各一个），底层 httpx 连接池保持长连接。HTTP/2 需要 h2 包（pip install "httpx[http2]"），
+不在默认依赖中，未安装时即使 LLM_HTTP2 开启也走 HTTP/1.1；
+同步与异步调用共用一个信号量，进程内同时在途的调用不超过 LLM_MAX_CONCURRENCY；
+连续失败后熔断快速失败，避免 DashScope 降级时拖住所有 worker。
 """
+import asyncio
 import json
-import os
 import re
-from openai import OpenAI
+import threading
+import time
+from datetime import date
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
 
 from app.config import settings
+from app.core import metrics
 from app.core.logging import get_logger
+from app.llm.circuit import CircuitBreaker, CircuitOpenError
 
 logger = get_logger(__name__)
 
-# 调用阿里 API 时绕过系统代理，避免部分环境下的 SSL/连接错误
-def _clear_proxy_for_request():
-    os.environ.pop("HTTP_PROXY", None)
-    os.environ.pop("HTTPS_PROXY", None)
-    os.environ.pop("http_proxy", None)
-    os.environ.pop("https_proxy", None)
-    os.environ.setdefault("NO_PROXY", "*")
 
-# 非流式调用，解析用户一句话为待办字段
-SYSTEM_PROMPT = """你是一个待办解析助手。根据用户用自然语言描述的一句话，解析出待办任务的字段，只输出一个 JSON 对象，不要输出任何其他文字、解释或 markdown。
+class LLMUnavailableError(Exception):
+    """LLM 服务暂不可用：熔断中或等待并发名额超时，调用方应返回 503。"""
 
-字段说明：
-- title: 任务标题，必填，简短概括
+
+# 字段说明，单条与批量提示词共用
+_FIELD_RULES = """- title: 任务标题，必填，简短概括
 - description: 任务描述，可选，可留空或 null
 - due_date: 截止日期，格式 YYYY-MM-DD，若能从句子中推断出日期则填写，否则 null
-- priority: 优先级，只能是 low / medium / high 之一，根据紧急程度推断，默认 medium
+- priority: 优先级，只能是 low / medium / high 之一，根据紧急程度推断，默认 medium"""
+
+# 非流式调用，解析用户一句话为待办字段
+SYSTEM_PROMPT = f"""你是一个待办解析助手。根据用户用自然语言描述的一句话，解析出待办任务的字段，只输出一个 JSON 对象，不要输出任何其他文字、解释或 markdown。
+
+字段说明：
+{_FIELD_RULES}
 
 示例：用户说「明天下午 3 点和导师开会讨论开题」，若今天是 2025-02-05，则 due_date 填 2025-02-06。
-输出：{"title":"与导师开会讨论开题","description":"明天下午 3 点","due_date":"2025-02-06","priority":"medium"}
+输出：{{"title":"与导师开会讨论开题","description":"明天下午 3 点","due_date":"2025-02-06","priority":"medium"}}
 若无法推断具体日期则 due_date 填 null。
 
 只输出 JSON，不要用 ```json 包裹。"""
 
+# 批量解析：一次请求解析多句，输入输出都是 JSON 数组，按序号 i 对应
+BATCH_SYSTEM_PROMPT = f"""你是一个待办解析助手。用户会给出一个 JSON 数组，每个元素形如 {{"i": 序号, "text": "一句话"}}，每句话描述一个待办任务。
+对每一句分别解析出待办字段，只输出一个 JSON 数组，不要输出任何其他文字、解释或 markdown。数组中每个元素是一个对象，与输入一一对应。
+
+字段说明：
+- i: 与输入相同的序号，必填
+{_FIELD_RULES}
+
+示例：输入 [{{"i":0,"text":"明天下午 3 点和导师开会讨论开题"}},{{"i":1,"text":"周五前交周报 很急"}}]，若今天是 2025-02-05，
+输出：[{{"i":0,"title":"与导师开会讨论开题","description":"明天下午 3 点","due_date":"2025-02-06","priority":"medium"}},{{"i":1,"title":"交周报","description":null,"due_date":"2025-02-07","priority":"high"}}]
+若无法推断具体日期则 due_date 填 null。
+
+只输出 JSON 数组，不要用 ```json 包裹。"""
+
+# 试探请求最长耗时：单次调用的连接 + 读取超时，乘以 SDK 的重试次数
+_breaker = CircuitBreaker(
+    settings.LLM_CIRCUIT_FAILURES, settings.LLM_CIRCUIT_RESET_SECONDS,
+    probe_timeout=(settings.LLM_CONNECT_TIMEOUT + settings.LLM_READ_TIMEOUT) * (settings.LLM_MAX_RETRIES + 1),
+)
+_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)  # 同步与异步调用共用
+
+_client: OpenAI | None = None
+_async_client: AsyncOpenAI | None = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    if not settings.LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _http_options() -> dict:
+    # trust_env=False：调用阿里 API 时绕过系统代理，避免部分环境下的 SSL/连接错误；
+    # 只作用于本客户端，不再改写进程环境变量
+    return {
+        "http2": _http2_available(),
+        "trust_env": False,
+        "timeout": httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+        ),
+    }
+
+
+def _client_options() -> dict:
+    return {
+        "api_key": settings.ALI_API_KEY,
+        "base_url": settings.ALI_BASE_URL,
+        "max_retries": settings.LLM_MAX_RETRIES,
+        "timeout": httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+    }
+
 
 def _get_client() -> OpenAI | None:
+    global _client
     if not settings.ALI_API_KEY:
         return None
-    _clear_proxy_for_request()
-    return OpenAI(
-        api_key=settings.ALI_API_KEY,
-        base_url=settings.ALI_BASE_URL,
-    )
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(http_client=httpx.Client(**_http_options()), **_client_options())
+    return _client
 
 
-def parse_natural_language_to_todo(text: str) -> dict:
-    """
-    将用户一句话解析为待办字段 dict，可直接用于 TodoCreate。
-    返回 {"title": str, "description": str|None, "due_date": str|None, "priority": str, ...}
-    若解析失败或未配置 API Key 则抛出 ValueError。
-    """
+def _get_async_client() -> AsyncOpenAI | None:
+    global _async_client
+    if not settings.ALI_API_KEY:
+        return None
+    if _async_client is None:
+        _async_client = AsyncOpenAI(http_client=httpx.AsyncClient(**_http_options()), **_client_options())
+    return _async_client
+
+
+def _release_if_acquired(waiter: asyncio.Future) -> None:
+    if not waiter.cancelled() and waiter.exception() is None and waiter.result():
+        _slots.release()
+
+
+async def _acquire_slot() -> bool:
+    """异步调用拿并发名额：有空位直接拿，否则在线程中等待（不阻塞事件循环），超时返回 False。"""
+    if _slots.acquire(blocking=False):
+        return True
+    waiter = asyncio.ensure_future(asyncio.to_thread(_slots.acquire, timeout=settings.LLM_QUEUE_TIMEOUT))
+    try:
+        return await asyncio.shield(waiter)
+    except asyncio.CancelledError:
+        # 线程里的等待无法中断：等到了名额就立即归还
+        waiter.add_done_callback(_release_if_acquired)
+        raise
+
+
+async def close_clients() -> None:
+    """应用关闭时释放连接池。"""
+    global _client, _async_client
+    if _client is not None:
+        _client.close()
+        _client = None
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def _is_service_failure(exc: Exception) -> bool:
+    """连接失败、超时、限流与 5xx 计入熔断；4xx 等调用方问题不计入。"""
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _record_outcome(exc: Exception | None, start: float, response=None) -> None:
+    """更新熔断状态与指标（耗时、错误类型、token 用量）。"""
+    metrics.LLM_REQUEST_SECONDS.labels("error" if exc else "ok").observe(time.perf_counter() - start)
+    if exc is not None:
+        metrics.LLM_ERRORS.labels(type(exc).__name__).inc()
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.LLM_TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+        metrics.LLM_TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+
+    if exc is None:
+        _breaker.record_success()
+    elif _is_service_failure(exc):
+        _breaker.record_failure()
+        logger.warning("llm call failed state=%s err=%s", _breaker.state, exc)
+    else:
+        _breaker.record_ignored()
+
+
+def _build_messages(text: str, today: date | None = None, system: str = SYSTEM_PROMPT) -> list[dict]:
+    # 相对日期依赖“今天”，显式告诉模型参考日期（也是解析缓存 key 的一部分）
+    today = today or date.today()
+    return [
+        {"role": "system", "content": f"{system}\n\n今天是 {today.isoformat()}。"},
+        {"role": "user", "content": text.strip()},
+    ]
+
+
+def _before_call() -> bool:
+    try:
+        return _breaker.before_call()
+    except CircuitOpenError as e:
+        metrics.LLM_ERRORS.labels("circuit_open").inc()
+        raise LLMUnavailableError(str(e)) from e
+
+
+def _complete(messages: list[dict]) -> str:
     client = _get_client()
     if not client:
         raise ValueError("未配置 BAILIAN_API_KEY 或 OPENAI_API_KEY，无法使用自然语言解析")
+    # 先拿并发名额再过熔断检查：half-open 的试探名额只给马上能发出的调用，不会耗在排队上
+    if not _slots.acquire(timeout=settings.LLM_QUEUE_TIMEOUT):
+        metrics.LLM_ERRORS.labels("queue_timeout").inc()
+        raise LLMUnavailableError("LLM 并发已满，请稍后重试")
+    try:
+        probe = _before_call()
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                model=settings.ALI_MODEL, messages=messages, temperature=0.2,
+            )
+        except Exception as e:
+            _record_outcome(e, start)
+            raise
+        except BaseException:
+            if probe:
+                _breaker.record_ignored()
+            raise
+    finally:
+        _slots.release()
+    _record_outcome(None, start, response)
+    return response.choices[0].message.content or ""
+
 
-    response = client.chat.completions.create(
-        model=settings.ALI_MODEL,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": text.strip()},
-        ],
-        temperature=0.2,
-        timeout=60.0,
-    )
-    raw = (response.choices[0].message.content or "").strip()
+async def _acomplete(messages: list[dict]) -> str:
+    client = _get_async_client()
+    if not client:
+        raise ValueError("未配置 BAILIAN_API_KEY 或 OPENAI_API_KEY，无法使用自然语言解析")
+    if not await _acquire_slot():
+        metrics.LLM_ERRORS.labels("queue_timeout").inc()
+        raise LLMUnavailableError("LLM 并发已满，请稍后重试")
+    try:
+        probe = _before_call()
+        start = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=settings.ALI_MODEL, messages=messages, temperature=0.2,
+            )
+        except Exception as e:
+            _record_outcome(e, start)
+            raise
+        except BaseException:
+            # 被取消（客户端断开、进程关闭、外层超时）与服务健康无关：试探请求要交还名额，否则一直停在熔断中
+            if probe:
+                _breaker.record_ignored()
+            raise
+    finally:
+        _slots.release()
+    _record_outcome(None, start, response)
+    return response.choices[0].message.content or ""
+
+
+def _loads_json(raw: str):
+    raw = raw.strip()
     if not raw:
         raise ValueError("模型未返回有效内容")
 
@@ -74,11 +264,14 @@ def parse_natural_language_to_todo(text: str) -> dict:
     raw = raw.strip()
 
     try:
-        data = json.loads(raw)
+        return json.loads(raw)
     except json.JSONDecodeError as e:
         logger.warning("llm parse json failed raw=%s err=%s", raw[:200], e)
         raise ValueError("解析结果不是合法 JSON") from e
 
+
+def normalize_parsed(data, text: str) -> dict:
+    """把模型输出的对象规整为可直接用于 TodoCreate 的 dict。"""
     if not isinstance(data, dict):
         raise ValueError("解析结果不是对象")
 
@@ -110,3 +303,46 @@ def parse_natural_language_to_todo(text: str) -> dict:
         "due_date": due_date,
         "category_id": None,
     }
+
+
+def parse_natural_language_to_todo(text: str, today: date | None = None) -> dict:
+    """
+    将用户一句话解析为待办字段 dict，可直接用于 TodoCreate。
+    返回 {"title": str, "description": str|None, "due_date": str|None, "priority": str, ...}
+    若解析失败或未配置 API Key 则抛出 ValueError；服务不可用时抛出 LLMUnavailableError。
+    """
+    return normalize_parsed(_loads_json(_complete(_build_messages(text, today))), text)
+
+
+async def aparse_natural_language_to_todo(text: str, today: date | None = None) -> dict:
+    """parse_natural_language_to_todo 的异步版本，不占用线程池。"""
+    return normalize_parsed(_loads_json(await _acomplete(_build_messages(text, today))), text)
+
+
+async def aparse_natural_language_batch(texts: list[str], today: date | None = None) -> list[dict | ValueError]:
+    """
+    一次 LLM 调用解析多句，返回与 texts 等长的列表：成功为 normalize_parsed 的结果，单条失败为 ValueError。
+    整批调用失败（服务不可用、返回不是数组等）时直接抛出异常。
+    """
+    payload = json.dumps([{"i": i, "text": t.strip()} for i, t in enumerate(texts)], ensure_ascii=False)
+    data = _loads_json(await _acomplete(_build_messages(payload, today, BATCH_SYSTEM_PROMPT)))
+    if isinstance(data, dict):  # 个别情况下模型会包一层 {"items": [...]}
+        data = next((v for v in data.values() if isinstance(v, list)), None)
+    if not isinstance(data, list):
+        raise ValueError("批量解析结果不是数组")
+
+    by_index = {}
+    for obj in data:
+        if isinstance(obj, dict) and isinstance(obj.get("i"), int):
+            by_index.setdefault(obj["i"], obj)
+    results: list[dict | ValueError] = []
+    for i, text in enumerate(texts):
+        obj = by_index.get(i)
+        if obj is None:
+            results.append(ValueError("模型未返回该条结果"))
+            continue
+        try:
+            results.append(normalize_parsed(obj, text))
+        except ValueError as e:
+            results.append(e)
+    return results
@@ -0,0 +1,69 @@
+"""
+简单熔断器：连续失败达到阈值后进入 open，冷却期内直接快速失败；
+冷却结束放行一个试探请求（half-open），成功则恢复，失败则重新计时。
+试探请求超过 probe_timeout 仍未报告结果（调用方漏记）时视为丢失，放行下一个试探，不会一直卡在熔断中。
+"""
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """熔断中，调用被快速拒绝。"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float, probe_timeout: float | None = None):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.probe_timeout = probe_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    @property
+    def probing(self) -> bool:
+        with self._lock:
+            return self._probing
+
+    def before_call(self) -> bool:
+        """调用前检查，返回本次是否为 half-open 的试探请求；熔断中抛出 CircuitOpenError。"""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            now = time.monotonic()
+            if self._probing and self.probe_timeout is not None and now - self._probe_started >= self.probe_timeout:
+                self._probing = False
+            if now - self._opened_at < self.reset_seconds or self._probing:
+                raise CircuitOpenError("LLM 服务暂不可用（熔断中）")
+            self._probing = True
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_ignored(self) -> None:
+        """与服务健康无关的结果（如参数错误）：只释放试探名额，不改变计数。"""
+        with self._lock:
+            self._probing = False
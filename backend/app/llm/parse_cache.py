@@ -0,0 +1,204 @@
+"""
+自然语言解析结果缓存。相同（或仅空白、标点、全半角不同）的句子在同一天的解析结果相同，
+key = sha256(参考日期 + 规整后的文本)。两层：
+- 进程内 LRU（带 TTL），命中为微秒级；
+- 数据库表 nl_parse_cache，多个 worker 共享，进程重启后仍有效（NL_CACHE_DB 控制）。
+数据库层出错只记日志，不影响解析本身。
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.models.models import NlParseCache
+
+logger = get_logger(__name__)
+
+_SPACES = re.compile(r"\s+")
+_CJK_SPACE = re.compile(r"(?<=[^\x00-\x7f]) | (?=[^\x00-\x7f])")  # 中文两侧的空格不影响语义
+_TRAILING_PUNCT = "。．.！!？?～~，,；;"
+
+
+def normalize_text(text: str) -> str:
+    """NFKC（全角转半角）、去首尾空白与句末标点、压缩空白（去掉中文两侧空格）、英文小写。"""
+    text = unicodedata.normalize("NFKC", text).strip().rstrip(_TRAILING_PUNCT).strip()
+    return _CJK_SPACE.sub("", _SPACES.sub(" ", text)).casefold()
+
+
+def make_key(text: str, today: date) -> str:
+    return hashlib.sha256(f"{today.isoformat()}\n{normalize_text(text)}".encode()).hexdigest()
+
+
+class _LRU:
+    """线程安全的 LRU + TTL。"""
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_memory = _LRU(settings.NL_CACHE_SIZE, settings.NL_CACHE_TTL)
+_counters = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _counters_lock:
+        _counters[name] += n
+
+
+def stats() -> dict:
+    with _counters_lock:
+        data = dict(_counters)
+    total = data["memory_hits"] + data["db_hits"] + data["misses"]
+    data["size"] = len(_memory)
+    data["hit_ratio"] = round((total - data["misses"]) / total, 4) if total else 0.0
+    return data
+
+
+def clear() -> None:
+    _memory.clear()
+
+
+def get_memory(key: str) -> dict | None:
+    value = _memory.get(key)
+    if value is not None:
+        _count("memory_hits")
+    return value
+
+
+def put_memory(key: str, value: dict) -> None:
+    _memory.put(key, value)
+
+
+def record_miss(n: int = 1) -> None:
+    _count("misses", n)
+
+
+def _expired(expires_at: datetime, now: datetime) -> bool:
+    if expires_at.tzinfo is None:  # SQLite 不保存时区
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at < now
+
+
+def load_many(db: Session, keys: list[str]) -> dict[str, dict]:
+    """一次查询取回多条数据库层缓存；命中的回填进程内 LRU。查完即结束事务，未命中时调用方接着等 LLM，不占着连接。"""
+    if not keys:
+        return {}
+    try:
+        rows = db.execute(
+            select(NlParseCache.key, NlParseCache.result, NlParseCache.expires_at)
+            .where(NlParseCache.key.in_(set(keys)))
+        ).all()
+    except SQLAlchemyError as e:
+        logger.warning("nl cache load failed: %s", e)
+        return {}
+    finally:
+        db.rollback()
+    now = datetime.now(timezone.utc)
+    found = {}
+    for row in rows:
+        if _expired(row.expires_at, now):
+            continue
+        value = json.loads(row.result)
+        _memory.put(row.key, value)
+        found[row.key] = value
+    _count("db_hits", len(found))
+    return found
+
+
+def load(db: Session, key: str) -> dict | None:
+    """查数据库层；命中时回填进程内 LRU。"""
+    return load_many(db, [key]).get(key)
+
+
+_PRUNE_INTERVAL = 600.0  # 每个进程清理过期行的最短间隔（秒）
+_pruned_at = 0.0
+
+
+def _prune_due() -> bool:
+    global _pruned_at
+    now = time.monotonic()
+    if now - _pruned_at < _PRUNE_INTERVAL:
+        return False
+    _pruned_at = now
+    return True
+
+
+def store_many(db: Session, today: date, entries: list[tuple[str, str, dict]]) -> None:
+    """
+    写入数据库层（已存在则覆盖），entries 为 (key, text, value)：一条 INSERT ... ON CONFLICT 写入全部行；
+    过期行不在每次写入时清理，每个进程至多每 _PRUNE_INTERVAL 秒顺带删除一次。
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=settings.NL_CACHE_TTL)
+    # 同一批内重复的 key 只保留最后一条（PostgreSQL 不允许一条语句两次更新同一行）
+    rows = {
+        key: {
+            "key": key,
+            "text": text[:1000],
+            "ref_date": today,
+            "result": json.dumps(value, ensure_ascii=False),
+            "expires_at": expires_at,
+        }
+        for key, text, value in entries
+    }
+    if not rows:
+        return
+    insert_ = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert_(NlParseCache).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NlParseCache.key],
+        set_={"text": stmt.excluded.text, "ref_date": stmt.excluded.ref_date,
+              "result": stmt.excluded.result, "expires_at": stmt.excluded.expires_at},
+    )
+    try:
+        db.execute(stmt)
+        if _prune_due():
+            db.execute(delete(NlParseCache).where(NlParseCache.expires_at < now))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning("nl cache store failed: %s", e)
+
+
+def store(db: Session, key: str, text: str, today: date, value: dict) -> None:
+    store_many(db, today, [(key, text, value)])
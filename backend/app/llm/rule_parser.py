@@ -0,0 +1,285 @@
+"""
+本地规则解析：覆盖「周五前交周报 高优先级」「tomorrow call bank」这类简单句子，
+识别中英文相对日期 / 具体日期、优先级关键词、时间点，剩余部分作为标题，并给出置信度。
+置信度低于 NL_RULE_MIN_CONFIDENCE 时由调用方回退到 LLM。纯函数，不做 I/O。
+"""
+import calendar
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+_CN_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6, "末": 5}
+_EN_WEEKDAYS = {
+    "mon": 0, "monday": 0, "tue": 1, "tues": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5, "sun": 6, "sunday": 6,
+}
+_EN_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+_EN_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_name) if name})
+
+_CN_NUM = r"[0-9零一二两三四五六七八九十]{1,3}"
+_EN_WD = "|".join(sorted(_EN_WEEKDAYS, key=len, reverse=True))
+_EN_MON = "|".join(sorted(_EN_MONTHS, key=len, reverse=True))
+# 日期前后常见的介词 / 截止用语，随日期一起从标题中去掉
+_CN_SUFFIX = r"(?:之前|以前|前|之内|内|截止|为止)?"
+_EN_PREFIX = r"(?:(?:by|before|on|due|until|till)\s+)?"
+# 「3号楼」「8号线」这类编号不是日期
+_NOT_DAY = r"(?![楼线房室门栋层座床位口院路街巷区码车机厅馆店])"
+# 「1/2」只在句首、截止用语之后或带「前」等后缀时当作月/日，否则可能是分数、比例
+_MD = r"(\d{1,2})/(\d{1,2})(?![\d/])"
+
+_PRIORITY_PATTERNS = [
+    ("high", re.compile(r"(?:高优先级|优先级\s*高|高优|非常紧急|特别紧急|十万火急|紧急|很急|加急|尽快|马上|立刻|重要|"
+                        r"\bhigh[- ]priority\b|\bpriority\s*:?\s*high\b|\burgent(?:ly)?\b|\basap\b|\bimportant\b|\bcritical\b|!{2,})", re.I)),
+    ("low", re.compile(r"(?:低优先级|优先级\s*低|低优|不急|不着急|有空再|有空|闲时|"
+                       r"\blow[- ]priority\b|\bpriority\s*:?\s*low\b|\bwhenever\b|\bno rush\b|\bsomeday\b)", re.I)),
+    ("medium", re.compile(r"(?:中优先级|优先级\s*中|普通优先级|\bmedium[- ]priority\b|\bpriority\s*:?\s*medium\b|\bnormal priority\b)", re.I)),
+]
+
+_TIME_PATTERNS = [
+    re.compile(r"(?:早上|上午|中午|下午|傍晚|晚上|凌晨)?\s*[0-9零一二两三四五六七八九十]{1,3}\s*(?:点|时|:[0-5][0-9])(?:\s*(?:半|[0-9]{1,2}\s*分|一刻|三刻))?(?:左右)?"),
+    re.compile(r"(?:早上|上午|中午|下午|傍晚|晚上|凌晨)"),
+    re.compile(r"\b(?:at\s+)?[0-9]{1,2}(?::[0-5][0-9])?\s*(?:am|pm)\b|\bat\s+[0-9]{1,2}:[0-5][0-9]\b|\b(?:this|in the)\s+(?:morning|afternoon|evening)\b|\btonight\b|\bnoon\b", re.I),
+]
+
+# 规则无法可靠处理的时间说法，出现即大幅降低置信度，交给 LLM
+_VAGUE = re.compile(
+    r"(?:下下周|下个月|下月|月初|上旬|中旬|下旬|年底|年初|年末|季度|过几天|过两天|最近|近期|改天|回头|节前|节后|假期|"
+    r"\bnext month\b|\bend of (?:the )?(?:week|year|quarter)\b|\bweekend\b|\bsoon\b|\blater\b|\bsometime\b|\bin a (?:few|couple)\b)",
+    re.I,
+)
+# 「今晚」「明早」之类：日期取走后保留时段，交给时间点规则写入描述
+_KEEP_PERIOD = {"今晚": "晚上", "明晚": "晚上", "今早": "早上", "明早": "早上", "tonight": "this evening"}
+_CLAUSES = re.compile(r"[，,；;]|然后|并且|以及|之后再|\band then\b|\bthen\b|\balso\b", re.I)
+_LEADING_FILLER = re.compile(
+    r"^(?:请|麻烦)?(?:记得|别忘了|不要忘记|提醒我|提醒|帮我|我要|我得|我需要|需要|要|得|"
+    r"(?:please\s+)?remind me to|remember to|don'?t forget to|i need to|i have to|need to|have to|todo:?|please)\s*",
+    re.I,
+)
+_CJK_GAP = re.compile(r"(?<=[^\x00-\x7f]) | (?=[^\x00-\x7f])")
+_TRAILING_JUNK = re.compile(r"^[\s，,。.；;：:!！?？、\-—~～]+|[\s，,。.；;：:!！?？、\-—~～的]+$")
+
+
+@dataclass
+class RuleResult:
+    title: str
+    description: str | None = None
+    due_date: date | None = None
+    priority: str = "medium"
+    confidence: float = 0.0
+    reasons: list[str] = field(default_factory=list)
+
+    def as_parsed(self) -> dict:
+        """与 ali_client.normalize_parsed 的输出格式一致。"""
+        return {
+            "title": self.title,
+            "description": self.description,
+            "status": "pending",
+            "priority": self.priority,
+            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "category_id": None,
+        }
+
+
+def _cn_int(s: str) -> int | None:
+    """解析「3」「十二」「二十」这类 1～99 的数字。"""
+    if s.isdigit():
+        return int(s)
+    if not s or any(c not in _CN_DIGITS for c in s):
+        return None
+    if s == "十":
+        return 10
+    if "十" in s:
+        tens, _, ones = s.partition("十")
+        return (_CN_DIGITS[tens] if tens else 1) * 10 + (_CN_DIGITS[ones] if ones else 0)
+    return _CN_DIGITS[s] if len(s) == 1 else None
+
+
+def _safe_date(year: int, month: int, day: int) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _month_day(today: date, month: int, day: int) -> date | None:
+    """只给月日时取今天及以后最近的一次（已过则算明年）。"""
+    d = _safe_date(today.year, month, day)
+    if d is not None and d < today:
+        d = _safe_date(today.year + 1, month, day)
+    return d
+
+
+def _upcoming_weekday(today: date, weekday: int) -> date:
+    return today + timedelta(days=(weekday - today.weekday()) % 7)
+
+
+def _week_of(today: date, weeks_ahead: int, weekday: int) -> date:
+    monday = today - timedelta(days=today.weekday())
+    return monday + timedelta(weeks=weeks_ahead, days=weekday)
+
+
+def _date_rules(today: date):
+    """(pattern, handler) 列表；handler(match) -> date | None。越具体的规则越靠前。"""
+    def relative(days):
+        return lambda m: today + timedelta(days=days)
+
+    def cn_week(m):
+        prefix, wd = m.group(1), _CN_WEEKDAYS[m.group(2)]
+        if prefix in ("下", "下个"):
+            return _week_of(today, 1, wd)
+        if prefix in ("本", "这", "这个"):
+            return _week_of(today, 0, wd)
+        return _upcoming_weekday(today, wd)
+
+    def en_week(m):
+        prefix, wd = (m.group(1) or "").lower(), _EN_WEEKDAYS[m.group(2).lower()]
+        if prefix == "next":
+            return _week_of(today, 1, wd)
+        if prefix == "this":
+            return _week_of(today, 0, wd)
+        return _upcoming_weekday(today, wd)
+
+    def n_days(m):
+        n = _cn_int(m.group(1))
+        return today + timedelta(days=n) if n is not None else None
+
+    def cn_month_day(m):
+        month, day = _cn_int(m.group(1)), _cn_int(m.group(2))
+        return _month_day(today, month, day) if month and day else None
+
+    def day_only(m):
+        day = _cn_int(m.group(1))
+        if not day:
+            return None
+        d = _safe_date(today.year, today.month, day)
+        if d is None or d < today:
+            nxt = today.replace(day=1) + timedelta(days=32)
+            d = _safe_date(nxt.year, nxt.month, day)
+        return d
+
+    def month_end(_m):
+        return today.replace(day=calendar.monthrange(today.year, today.month)[1])
+
+    def en_month_day(m):
+        if m.group("mon1"):
+            return _month_day(today, _EN_MONTHS[m.group("mon1").lower()], int(m.group("day1")))
+        return _month_day(today, _EN_MONTHS[m.group("mon2").lower()], int(m.group("day2")))
+
+    return [
+        (re.compile(r"(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*[日号]?" + _CN_SUFFIX),
+         lambda m: _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))),
+        (re.compile(rf"({_CN_NUM})\s*月\s*({_CN_NUM})\s*[日号]" + _CN_SUFFIX), cn_month_day),
+        (re.compile(r"(?:^\s*|\b(?:by|before|on|due|until|till)\s+|(?:截止|截至)\s*)" + _MD + _CN_SUFFIX, re.I),
+         lambda m: _month_day(today, int(m.group(1)), int(m.group(2)))),
+        (re.compile(r"(?<![\d:/])" + _MD + r"\s*(?:之前|以前|前|截止|为止)"),
+         lambda m: _month_day(today, int(m.group(1)), int(m.group(2)))),
+        (re.compile(rf"\b{_EN_PREFIX}(?:(?P<mon1>{_EN_MON})\.?\s+(?P<day1>\d{{1,2}})(?:st|nd|rd|th)?|"
+                    rf"(?P<day2>\d{{1,2}})(?:st|nd|rd|th)?\s+(?P<mon2>{_EN_MON})\b\.?)", re.I), en_month_day),
+        (re.compile(r"大后天" + _CN_SUFFIX), relative(3)),
+        (re.compile(r"后天" + _CN_SUFFIX), relative(2)),
+        (re.compile(r"(?:明天|明日|明早|明晚)" + _CN_SUFFIX), relative(1)),
+        (re.compile(r"(?:今天|今日|今晚|今早|当天)" + _CN_SUFFIX), relative(0)),
+        (re.compile(rf"\b{_EN_PREFIX}(?:the\s+)?day after tomorrow\b", re.I), relative(2)),
+        (re.compile(rf"\b{_EN_PREFIX}(?:tomorrow|tmr|tmrw)\b", re.I), relative(1)),
+        (re.compile(rf"\b{_EN_PREFIX}(?:today|tonight|eod|end of (?:the )?day)\b", re.I), relative(0)),
+        (re.compile(r"(下个|下|本|这个|这)?(?:周|星期|礼拜)([一二三四五六日天末])" + _CN_SUFFIX), cn_week),
+        (re.compile(rf"\b{_EN_PREFIX}(?:(next|this)\s+)?({_EN_WD})\b", re.I), en_week),
+        (re.compile(rf"({_CN_NUM})\s*天(?:后|之后|以后|内|之内)"), n_days),
+        (re.compile(r"\bin\s+(\d{1,3})\s+days?\b", re.I), n_days),
+        (re.compile(r"(?:本月|这个月)?(?:月底|月末)" + _CN_SUFFIX), month_end),
+        (re.compile(rf"(?<![月\d])({_CN_NUM})\s*号{_NOT_DAY}" + _CN_SUFFIX), day_only),
+    ]
+
+
+def parse(text: str, today: date | None = None) -> RuleResult:
+    today = today or date.today()
+    rest = " ".join(text.split())
+    reasons: list[str] = []
+    confidence = 0.95
+
+    def cut(span, repl=" "):
+        nonlocal rest
+        rest = rest[: span[0]] + repl + rest[span[1]:]
+
+    # 优先级
+    priority, priorities = "medium", set()
+    for level, pattern in _PRIORITY_PATTERNS:
+        for m in list(pattern.finditer(rest))[::-1]:
+            priorities.add(level)
+            cut(m.span())
+    if len(priorities) > 1:
+        confidence -= 0.4
+        reasons.append("优先级冲突")
+    if priorities:
+        priority = next(iter(priorities)) if len(priorities) == 1 else "high" if "high" in priorities else "medium"
+
+    # 日期
+    dates = []
+    for pattern, handler in _date_rules(today):
+        while True:
+            m = pattern.search(rest)
+            if m is None:
+                break
+            d = handler(m)
+            if d is None:
+                confidence -= 0.5
+                reasons.append(f"无效日期 {m.group(0).strip()}")
+            else:
+                dates.append(d)
+            matched = m.group(0).lower()
+            keep = next((v for k, v in _KEEP_PERIOD.items() if k in matched), None)
+            cut(m.span(), f" {keep} " if keep else " ")
+    due_date = None
+    if dates:
+        due_date = dates[0]
+        if len(set(dates)) > 1:
+            confidence -= 0.5
+            reasons.append("多个日期")
+        if due_date < today:
+            confidence -= 0.3
+            reasons.append("日期已过")
+
+    # 时间点：放进描述，与 LLM 的习惯一致
+    times = []
+    for pattern in _TIME_PATTERNS:
+        for m in list(pattern.finditer(rest))[::-1]:
+            times.insert(0, m.group(0).strip())
+            cut(m.span())
+    description = _CJK_GAP.sub("", " ".join(times)) or None
+
+    if _VAGUE.search(text):
+        confidence -= 0.6
+        reasons.append("含模糊时间")
+
+    title = " ".join(rest.split())
+    title = _TRAILING_JUNK.sub("", title)
+    title = _LEADING_FILLER.sub("", title)
+    title = _TRAILING_JUNK.sub("", title)
+    title = _CJK_GAP.sub("", title)  # 去掉日期被移除后中文之间留下的空格
+
+    if len(title) < 2:
+        confidence -= 0.7
+        reasons.append("标题过短")
+    elif len(title) > 30:
+        confidence -= 0.3
+        reasons.append("句子较长")
+    if _CLAUSES.search(title):
+        confidence -= 0.25
+        reasons.append("多个分句")
+    if re.search(r"[?？]", text):
+        confidence -= 0.3
+        reasons.append("疑问句")
+    if re.search(r"\d", title):
+        confidence -= 0.15
+        reasons.append("标题含未识别的数字")
+
+    return RuleResult(
+        title=title[:200],
+        description=description,
+        due_date=due_date,
+        priority=priority,
+        confidence=round(max(confidence, 0.0), 2),
+        reasons=reasons,
+    )
@@ -1,17 +1,25 @@
-import time
-import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.exc import OperationalError
 
 from app.api import categories, todos
 from app.config import settings
-from app.core.logging import get_logger, request_id_ctx
+from app.core import metrics
+from app.core.logging import get_logger
+from app.core.middleware import (
+    AdmissionMiddleware,
+    MetricsMiddleware,
+    ReadYourWritesMiddleware,
+    RequestContextMiddleware,
+)
+from app.core.static_files import FrontendFiles
+from app.db import notify, replicas
+from app.llm import ali_client
+from app.services import archive_service, event_service, nl_job_service
 
 # 前端静态目录：本地为项目根/frontend，Docker 为 /app/frontend
 _root = Path(__file__).resolve().parent.parent  # backend/app -> backend 或 /app
@@ -19,55 +27,55 @@ _FRONTEND_DIR = _root.parent / "frontend"  # 项目根/frontend（本地）
 if not _FRONTEND_DIR.is_dir():
     _FRONTEND_DIR = _root / "frontend"  # Docker：/app/frontend
 
-app = FastAPI(title="待办事项管理平台", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动跨进程通知监听（PostgreSQL LISTEN），用于分类缓存失效等
+    notify.start_listener()
+    # 变更事件推送（/todos/events）：本进程的 SSE 连接在事件循环中分发
+    event_service.start()
+    # 自然语言后台任务的进程内队列与 worker
+    await nl_job_service.start()
+    # 只读副本的可用性与落后检查（未配置 DATABASE_READ_URLS 时不启动）
+    replicas.start()
+    # 已完成待办的后台归档（TODO_ARCHIVE_AFTER_DAYS=0 时不启动）
+    archive_service.start()
+    yield
+    await archive_service.stop()
+    await replicas.stop()
+    await nl_job_service.stop()
+    event_service.stop()
+    notify.stop_listener()
+    await ali_client.close_clients()
+    metrics.mark_process_dead()
+
+
+app = FastAPI(title="待办事项管理平台", version="0.1.0", lifespan=lifespan)
 logger = get_logger(__name__)
 
+
+# 纯 ASGI 中间件：读己之写窗口（最内层，仅配置了只读副本时），准入控制与限流，Prometheus 指标，
+# request_id 与访问日志（外层，被拒绝的请求同样记录日志与指标），见 app/core/middleware.py
+if settings.DATABASE_READ_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+# CORS 最后添加、位于最外层：准入控制的 429 / 503 同样带 CORS 头，跨域页面能读到状态码与 Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Next-Cursor", "X-Total-Count", "X-NL-Parse-Source", "Location",
+                    "X-DB-Queries", "Server-Timing", replicas.STICKY_HEADER, "Retry-After",
+                    "X-Archived"],
 )
 
 
-class RequestIdAndLoggingMiddleware(BaseHTTPMiddleware):
-    """为每个请求生成/透传 request_id，并记录请求与响应日志（含耗时）。"""
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
-        request.state.request_id = request_id
-        token = request_id_ctx.set(request_id)
-        start = time.perf_counter()
-        try:
-            logger.info("request started %s %s", request.method, request.url.path)
-            response = await call_next(request)
-            duration_ms = (time.perf_counter() - start) * 1000
-            logger.info(
-                "request finished %s %s %s %.2fms",
-                request.method,
-                request.url.path,
-                response.status_code,
-                duration_ms,
-            )
-            response.headers["X-Request-ID"] = request_id
-            return response
-        except Exception as e:
-            duration_ms = (time.perf_counter() - start) * 1000
-            logger.exception(
-                "request failed %s %s %.2fms: %s",
-                request.method,
-                request.url.path,
-                duration_ms,
-                e,
-            )
-            raise
-        finally:
-            request_id_ctx.reset(token)
-
-
-app.add_middleware(RequestIdAndLoggingMiddleware)
-
-
 @app.exception_handler(OperationalError)
 async def db_operational_error_handler(request: Request, exc: OperationalError):
     """数据库连接/执行失败时返回 503，便于前端提示。"""
@@ -95,9 +103,17 @@ def health():
     return {"status": "ok"}
 
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        body, content_type = metrics.render()
+        return Response(body, media_type=content_type)
+
+
 app.include_router(categories.router)
 app.include_router(todos.router)
 
-# 静态前端：API 未匹配的请求由前端静态文件处理（同域代理，无需单独起前端服务）
+# 静态前端：API 未匹配的请求由前端静态文件处理（同域代理，无需单独起前端服务）；
+# 启动时预压缩并加内容指纹，见 app/core/static_files.py
 if _FRONTEND_DIR.is_dir():
-    app.mount("/", StaticFiles(directory=str(_FRONTEND_DIR), html=True), name="frontend")
+    app.mount("/", FrontendFiles(_FRONTEND_DIR), name="frontend")
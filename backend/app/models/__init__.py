@@ -1,2 +1,12 @@
-from app.models.models import Category, TodoItem
-__all__ = ["Category", "TodoItem"]
\ No newline at end of file
+from app.models.models import (
+    Category,
+    DataVersion,
+    NlJob,
+    NlParseCache,
+    TodoArchive,
+    TodoItem,
+    TodoStat,
+    TodoTombstone,
+)
+from app.models import search  # noqa: F401  注册全文搜索 DDL（随 create_all 执行）
+__all__ = ["Category", "DataVersion", "NlJob", "NlParseCache", "TodoArchive", "TodoItem", "TodoStat", "TodoTombstone"]
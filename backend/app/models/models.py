@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, Index, String, Text, Date, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -13,6 +13,8 @@ class Category(Base):
 
 class TodoItem(Base):
     __tablename__ = "todo_items"
+    # SQLite 默认会复用已删除的最大 id；归档后恢复需要原 id 未被占用
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(200), nullable=False)
     description = Column(Text)
@@ -20,6 +22,93 @@ class TodoItem(Base):
     priority = Column(String(20), nullable=False, default="medium")
     due_date = Column(Date)
     category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"))
-    category = relationship("Category", backref="todo_items", lazy="joined")
+    # 读路径按列查询、分类名称走缓存，这里不再默认 JOIN
+    category = relationship("Category", backref="todo_items", lazy="select")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 最后一次改动所在事务的 todos 数据版本号（单调、与提交顺序一致），增量同步（GET /todos/changes）按它读取
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+
+Index("idx_todo_items_change_seq_id", TodoItem.change_seq, TodoItem.id)
+# 归档任务按 (status, updated_at) 取最早完成的一批，不扫描未完成与近期完成的行
+Index("idx_todo_items_status_updated_at", TodoItem.status, TodoItem.updated_at)
+
+
+class TodoTombstone(Base):
+    """已删除待办的墓碑：供增量同步告知客户端删除，change_seq 为删除所在事务的版本号，过期后由脚本清理。"""
+    __tablename__ = "todo_tombstones"
+    id = Column(Integer, primary_key=True)  # 被删除的待办 id
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+Index("idx_todo_tombstones_change_seq_id", TodoTombstone.change_seq, TodoTombstone.id)
+
+
+class TodoArchive(Base):
+    """
+    已归档（完成超过 TODO_ARCHIVE_AFTER_DAYS 天）的待办，列与 todo_items 相同、保留原 id，见 archive_service。
+    只在 include_archived 查询与恢复时读取，不参与全文搜索与统计。
+    """
+    __tablename__ = "todo_items_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text)
+    status = Column(String(20), nullable=False)
+    priority = Column(String(20), nullable=False)
+    due_date = Column(Date)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+Index("idx_todo_items_archive_category_id_id", TodoArchive.category_id, TodoArchive.id)
+Index("idx_todo_items_archive_due_date_id", TodoArchive.due_date, TodoArchive.id)
+
+
+class DataVersion(Base):
+    """数据版本号：每次写入在同一事务内 +1，用作 ETag 等的廉价变更水位。"""
+    __tablename__ = "data_versions"
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class TodoStat(Base):
+    """待办统计计数器：(维度, 取值) -> 条数，由 todo_service 的写路径在同一事务内增减，见 stats_service。"""
+    __tablename__ = "todo_stats"
+    dimension = Column(String(20), primary_key=True)
+    key = Column(String(50), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class NlParseCache(Base):
+    """自然语言解析结果缓存（跨 worker 共享层）：key 由规整后的文本与参考日期生成。"""
+    __tablename__ = "nl_parse_cache"
+    key = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False)
+    ref_date = Column(Date, nullable=False)
+    result = Column(Text, nullable=False)  # normalize_parsed 的 JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class NlJob(Base):
+    """自然语言创建待办的后台任务：queued -> running -> succeeded / failed。"""
+    __tablename__ = "nl_jobs"
+    id = Column(String(32), primary_key=True)
+    text = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    todo_id = Column(Integer, ForeignKey("todo_items.id", ondelete="SET NULL"))
+    source = Column(String(20))  # 解析来源：rule / memory / db / llm
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # 最后一次状态变化的时间，巡检按它找出滞留在 queued / running 的任务
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+Index("ix_nl_jobs_status_updated_at", NlJob.status, NlJob.updated_at)
@@ -0,0 +1,70 @@
+"""
+全文搜索相关的 DDL，随 todo_items 建表（create_all）执行；PostgreSQL 生产库见 scripts/init_db.sql 中相同的语句。
+索引由数据库在写入时同步维护，todo_service 的单条 / 批量写路径无需额外代码：
+- PostgreSQL：search_vector 为 tsvector 生成列（标题权重 A、描述权重 B）+ GIN。
+  中文没有空格分词，生成列里额外写入连续汉字 / 假名的二元组（「开会讨论」-> 开会 会讨 讨论），
+  两个字及以上的中文词可以走同一个 GIN 索引，不依赖 pg_trgm 等扩展。
+- SQLite：FTS5 外部内容表 todo_items_fts（trigram 分词，需 SQLite >= 3.34），由触发器随 todo_items 增删改。
+"""
+import sqlite3
+
+from sqlalchemy import DDL, event
+
+from app.models.models import TodoItem
+
+# 子串匹配用的拼接文本（中文单字、SQLite 短词）
+SEARCH_TEXT_SQL = "(coalesce(todo_items.title, '') || ' ' || coalesce(todo_items.description, ''))"
+
+POSTGRESQL_DDL = (
+    r"""
+    CREATE OR REPLACE FUNCTION todo_search_bigrams(s text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(string_agg(substr(m[1], i, 2), ' '), '')
+        FROM regexp_matches(coalesce(s, ''), '([\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]{2,})', 'g') AS m,
+             generate_series(1, char_length(m[1]) - 1) AS i
+    $$
+    """,
+    """
+    ALTER TABLE todo_items ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '') || ' ' || todo_search_bigrams(title)), 'A')
+        || setweight(to_tsvector('simple', coalesce(description, '') || ' ' || todo_search_bigrams(description)), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_todo_items_search_vector ON todo_items USING gin (search_vector)",
+)
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todo_items_fts USING fts5(
+        title, description, content='todo_items', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_items_fts_ai AFTER INSERT ON todo_items BEGIN
+        INSERT INTO todo_items_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_items_fts_ad AFTER DELETE ON todo_items BEGIN
+        INSERT INTO todo_items_fts (todo_items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_items_fts_au AFTER UPDATE OF title, description ON todo_items BEGIN
+        INSERT INTO todo_items_fts (todo_items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todo_items_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+
+def _sqlite_has_trigram(ddl, target, bind, **kw) -> bool:
+    return bind.dialect.name == "sqlite" and sqlite3.sqlite_version_info >= (3, 34)
+
+
+for _stmt in POSTGRESQL_DDL:
+    event.listen(TodoItem.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in SQLITE_DDL:
+    event.listen(TodoItem.__table__, "after_create", DDL(_stmt).execute_if(callable_=_sqlite_has_trigram))
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date, datetime
 from typing import Optional
 
@@ -34,4 +34,87 @@ class TodoResponse(BaseModel):
     updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# 批量接口：单次请求最多 BATCH_MAX_ITEMS 条，整批在一个事务内执行
+BATCH_MAX_ITEMS = 1000
+
+
+class TodoBatchCreate(BaseModel):
+    items: list[TodoCreate] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+
+class TodoBatchUpdate(BaseModel):
+    items: list[TodoBatchUpdateItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class TodoBatchDelete(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class TodoBatchResult(BaseModel):
+    """批量操作的逐条结果，顺序与请求一致。"""
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    item: Optional[TodoResponse] = None
+    error: Optional[str] = None
+
+class CategoryCount(BaseModel):
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    count: int
+
+
+class TodoStatsResponse(BaseModel):
+    """待办统计；overdue / due_today 只计未完成（status != done）的待办。"""
+    total: int
+    by_status: dict[str, int]
+    by_priority: dict[str, int]
+    by_category: list[CategoryCount]
+    overdue: int
+    due_today: int
+
+
+class TodoChange(BaseModel):
+    """增量同步的一条变更，与变更事件中的元素一致；op 为 upsert 时 todo 为改动后的完整数据。"""
+    seq: int
+    op: str
+    id: int
+    todo: Optional[TodoResponse] = None
+
+
+class TodoChangesResponse(BaseModel):
+    changes: list[TodoChange]
+    watermark: str
+    has_more: bool
+
+
+class TodoImportError(BaseModel):
+    line: int
+    error: str
+
+
+class TodoImportResult(BaseModel):
+    """批量导入结果；errors 最多列出前 1000 条，更多时 errors_truncated 为 true。"""
+    inserted: int
+    failed: int
+    errors: list[TodoImportError]
+    errors_truncated: bool
+
+
+class NlJobResponse(BaseModel):
+    """自然语言后台任务状态；succeeded 时 todo 为创建出的待办。"""
+    id: str
+    status: str
+    text: str
+    source: Optional[str] = None
+    error: Optional[str] = None
+    todo: Optional[TodoResponse] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
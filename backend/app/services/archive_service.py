@@ -0,0 +1,138 @@
+"""
+冷热分离：完成（status=done）超过 TODO_ARCHIVE_AFTER_DAYS 天（按 updated_at）的待办分批移入归档表 todo_items_archive，
+热表只剩未完成与近期完成的待办，列表查询与热表索引的规模不随历史增长。列表 / 详情默认只查热表，include_archived 时合并归档表。
+- 每批一个事务，与普通写路径相同：先推进版本号，复制到归档表后从热表删除，写墓碑、扣减统计并发出删除事件；
+  对增量同步与事件流的客户端，归档等同于从列表中移除，恢复等同于重新出现（带新的 change_seq）；
+- 进度就是热表本身：任何时候中断（进程退出、数据库断开），已提交的批次不会重做，下一轮从剩下的行继续；
+- 进程内后台任务每 TODO_ARCHIVE_INTERVAL_SECONDS 跑一轮，直到没有可归档的行，批次之间暂停 TODO_ARCHIVE_PAUSE_SECONDS
+  让出版本号行锁；多个 worker 用 PostgreSQL advisory 锁保证同一时刻只有一个在归档。也可用 python -m scripts.todo_archive 手工执行；
+- 恢复（POST /todos/{id}/restore）把行移回热表并刷新 updated_at，避免下一轮又被归档。
+统计计数（/todos/stats）与默认列表一致，只覆盖热表。
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.db import session as db_session
+from app.models.models import TodoArchive, TodoItem, TodoTombstone
+from app.services import event_service, stats_service, todo_service
+
+logger = get_logger(__name__)
+
+_LOCK_KEY = 0x746F646F_61726368  # "todoarch"，pg_try_advisory_xact_lock 的键
+_ARCHIVE_FIELDS = [c.key for c in todo_service._COLUMNS]
+_task: asyncio.Task | None = None
+
+
+def archive_batch(db: Session, older_than_days: float, limit: int) -> int | None:
+    """归档一批并提交，返回移动的行数；0 表示已没有可归档的行，None 表示其他进程正在归档。"""
+    if db.get_bind().dialect.name == "postgresql":
+        # 先于版本号行锁获取，普通写路径不碰这把锁，不会交叉等待
+        if not db.execute(select(func.pg_try_advisory_xact_lock(_LOCK_KEY))).scalar():
+            db.rollback()
+            return None
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    # 与其他写路径相同的锁顺序：版本号行 -> 待办行 -> 计数器；持有版本号行锁期间选中的行不会被并发修改
+    seq = todo_service._begin_write(db)
+    ids = db.execute(
+        select(TodoItem.id).where(TodoItem.status == stats_service.DONE, TodoItem.updated_at < cutoff)
+        .order_by(TodoItem.updated_at).limit(limit)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return 0
+    db.execute(insert(TodoArchive).from_select(_ARCHIVE_FIELDS, select(*todo_service._COLUMNS).where(TodoItem.id.in_(ids))))
+    rows = db.execute(
+        delete(TodoItem).where(TodoItem.id.in_(ids)).returning(TodoItem.id, *stats_service.STAT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).all()
+    todo_service._bury(db, seq, ids)
+    todo_service._touch(db, seq, stats_service.diff(removed=rows), [event_service.delete(r.id) for r in rows])
+    db.commit()
+    return len(rows)
+
+
+def _archive_once(older_than_days: float, limit: int) -> int | None:
+    with db_session.SessionLocal() as db:
+        return archive_batch(db, older_than_days, limit)
+
+
+def run(older_than_days: float, limit: int, pause: float = 0) -> int:
+    """同步执行一轮（脚本用），返回归档总数。"""
+    total = 0
+    while (moved := _archive_once(older_than_days, limit)):
+        total += moved
+        time.sleep(pause)
+    return total
+
+
+async def run_async(older_than_days: float, limit: int, pause: float = 0) -> int:
+    """后台任务执行一轮：每批在线程池中执行，批次之间让出事件循环与数据库。"""
+    total = 0
+    while (moved := await run_in_threadpool(_archive_once, older_than_days, limit)):
+        total += moved
+        await asyncio.sleep(pause)
+    return total
+
+
+def restore_todo(db: Session, todo_id: int) -> dict | None:
+    """把归档的待办移回热表，返回与详情接口相同的 dict；归档中没有该 id 返回 None，id 已被热表占用时抛出 ValueError。"""
+    seq = todo_service._begin_write(db)
+    archived = db.execute(
+        delete(TodoArchive).where(TodoArchive.id == todo_id).returning(*todo_service._columns(TodoArchive))
+        .execution_options(synchronize_session=False)
+    ).first()
+    if archived is None:
+        db.rollback()
+        return None
+    values = {**archived._mapping, "updated_at": func.now(), "change_seq": seq}
+    try:
+        row = db.execute(insert(TodoItem).values(values).returning(*todo_service._COLUMNS)).one()
+    except IntegrityError:
+        # 升级前创建的 SQLite 库会复用已删除的最大 id
+        db.rollback()
+        raise ValueError("该 id 已被其他待办占用，无法恢复")
+    # 之前归档时留下的墓碑作废，增量同步里该 id 只剩这次的 upsert
+    db.execute(delete(TodoTombstone).where(TodoTombstone.id == todo_id))
+    item = todo_service._returned_to_response(db, row)
+    todo_service._touch(db, seq, stats_service.diff(added=[row]), [event_service.upsert("todo", item)])
+    db.commit()
+    logger.info("todo restored from archive id=%s", todo_id)
+    return item
+
+
+async def _loop() -> None:
+    while True:
+        start = time.perf_counter()
+        try:
+            moved = await run_async(
+                settings.TODO_ARCHIVE_AFTER_DAYS, settings.TODO_ARCHIVE_BATCH_ROWS, settings.TODO_ARCHIVE_PAUSE_SECONDS,
+            )
+            if moved:
+                logger.info("todos archived count=%s elapsed=%.1fs", moved, time.perf_counter() - start)
+        except Exception:
+            logger.exception("todo archiver failed, will retry next round")
+        await asyncio.sleep(settings.TODO_ARCHIVE_INTERVAL_SECONDS)
+
+
+def start() -> None:
+    """应用启动时调用；TODO_ARCHIVE_AFTER_DAYS 为 0 时不启动后台归档。"""
+    global _task
+    if db_session.SessionLocal is None or settings.TODO_ARCHIVE_AFTER_DAYS <= 0 or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_loop())
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
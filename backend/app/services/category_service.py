@@ -1,15 +1,107 @@
+"""
+分类读写。分类极少变化，读取走进程内缓存：
+- 缓存快照记录加载时的版本号，create_category 提交后本进程版本号 +1，其他 worker 通过 NOTIFY 收到后 +1；
+- 快照版本落后或超过 CATEGORY_CACHE_TTL 时重新加载；按 id 查名称未命中时也会重载一次（兜底新建分类的通知延迟）。
+- 快照同时记录加载时读到的 todos 数据版本号，通知携带分类写入时的版本号：从落后的只读副本加载到的旧快照
+  版本号低于已知的分类变更，下次读取会再次加载，不会一直停留到 TTL 过期。
+加载过程中不持锁（异步模式下 service 运行在事件循环线程的 greenlet 中，持锁等待 I/O 会卡住其他协程）。
+"""
+import threading
+import time
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.etag import make_etag
+from app.core.serialization import to_json
+from app.db import notify
 from app.models.models import Category
 from app.schemas.category import CategoryCreate
+from app.services import event_service, version_service
+
+CHANNEL = "categories_changed"
+
+
+class _Snapshot:
+    __slots__ = ("version", "seq", "loaded_at", "items", "names", "body", "etag")
+
+    def __init__(self, version: int, seq: int, items: list[dict]):
+        self.version = version
+        self.seq = seq
+        self.loaded_at = time.monotonic()
+        self.items = items
+        self.names = {c["id"]: c["name"] for c in items}
+        # 预先序列化好响应体；ETag 取内容摘要，各 worker 对同样的数据给出同样的 ETag
+        self.body = to_json(items)
+        self.etag = make_etag("categories", self.body)
+
+
+_version = 0
+_version_lock = threading.Lock()
+_snapshot: _Snapshot | None = None
+_min_seq = 0  # 已知最近一次分类变更的 todos 版本号，快照不能比它旧
+
+
+def invalidate(payload: str | None = None) -> None:
+    global _version, _min_seq
+    with _version_lock:
+        _version += 1
+        if payload and payload.isdigit():
+            _min_seq = max(_min_seq, int(payload))
+
+
+notify.subscribe(CHANNEL, invalidate)
+
+
+def _load(db: Session) -> _Snapshot:
+    global _snapshot
+    version = _version  # 先读版本再查库，期间若有变更，快照版本落后会在下次读取时重载
+    seq = version_service.current(db, version_service.TODOS)
+    rows = db.execute(select(Category.id, Category.name, Category.created_at).order_by(Category.id)).all()
+    snap = _Snapshot(version, seq, [dict(r._mapping) for r in rows])
+    _snapshot = snap
+    return snap
+
+
+def _current(db: Session) -> _Snapshot:
+    snap = _snapshot
+    if (
+        snap is None
+        or snap.version != _version
+        or snap.seq < _min_seq
+        or time.monotonic() - snap.loaded_at > settings.CATEGORY_CACHE_TTL
+    ):
+        snap = _load(db)
+    return snap
 
 
 def list_categories(db: Session):
-    return db.query(Category).order_by(Category.id).all()
+    return _current(db).items
+
+
+def snapshot(db: Session) -> _Snapshot:
+    """当前缓存快照（含预序列化的 body 与 etag），供 GET /categories 使用。"""
+    return _current(db)
+
+
+def category_names(db: Session, category_ids=()) -> dict[int, str]:
+    """返回 id -> name；category_ids 中有缓存未知的 id 时重载一次。"""
+    snap = _current(db)
+    if any(c is not None and c not in snap.names for c in category_ids):
+        snap = _load(db)
+    return snap.names
 
 
 def create_category(db: Session, data: CategoryCreate):
     obj = Category(name=data.name)
     db.add(obj)
+    db.flush()
+    # 列表响应带分类名称，分类变更同样推进 todos 版本号，并以其为序号进入变更事件流
+    seq = version_service.bump(db, version_service.TODOS)
+    notify.publish(db, CHANNEL, str(seq))
+    event_service.publish(db, seq, "category", [event_service.upsert("category", {"id": obj.id, "name": obj.name})])
     db.commit()
     db.refresh(obj)
-    return obj
\ No newline at end of file
+    invalidate(str(seq))
+    return obj
@@ -0,0 +1,107 @@
+"""
+增量同步（GET /todos/changes?since=）：返回水位之后改动过的待办与删除墓碑，耗时只与变更条数有关。
+- 每个写事务先推进 todos 数据版本号，改动行的 change_seq 即该值（见 todo_service._begin_write），
+  删除写入 todo_tombstones；两表都有 (change_seq, id) 索引，按其顺序合并读取；
+- 只读到本次请求开始时的版本号 V 为止：版本号行锁保证序号不大于 V 的事务都已提交，不会跳过晚提交的小序号；
+- 水位为字符串：整页读完为 "V"，还有下一页时为 "序号.id"（同一事务改动的行可能跨页），客户端原样传回即可。
+  整数水位与 ETag / 变更事件（/todos/events）的序号同源，可以混用；
+- 墓碑按保留期清理（python -m scripts.todo_tombstones purge），清理过的水位之前的请求返回 TombstonesExpired，
+  客户端需不带 since 全量同步。
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.db.replicas import StaleRead
+from app.models.models import DataVersion, TodoItem, TodoTombstone
+from app.services import event_service, version_service
+from app.services.todo_service import READ_FIELDS, _COLUMNS, _with_category_names
+
+# data_versions 中记录已清理墓碑的最大序号
+TOMBSTONE_HORIZON = "todo_tombstones"
+
+
+class TombstonesExpired(Exception):
+    """since 早于已清理的墓碑，增量无法保证包含全部删除。"""
+
+
+def parse_watermark(value: str) -> tuple[int, int | None]:
+    """"V" -> (V, None)，"序号.id" -> (序号, id)；非法时抛出 ValueError。"""
+    seq, dot, last_id = value.partition(".")
+    try:
+        return int(seq), int(last_id) if dot else None
+    except ValueError:
+        raise ValueError("since 无效")
+
+
+def _after(column_seq, column_id, seq: int, last_id: int | None):
+    if last_id is None:
+        return column_seq > seq
+    # 行值比较，PostgreSQL / SQLite 都能直接按 (change_seq, id) 索引做范围扫描
+    return tuple_(column_seq, column_id) > tuple_(seq, last_id)
+
+
+def list_changes(db: Session, since: str | None = None, limit: int = 500) -> dict:
+    """
+    返回 {"changes": [...], "watermark": str, "has_more": bool}；changes 按 (序号, id) 升序，
+    元素与变更事件相同：{"seq", "op": "upsert", "id", "todo"} 或 {"seq", "op": "delete", "id"}。
+    """
+    full = not since
+    seq, last_id = parse_watermark(since) if since else (-1, None)
+    marks = dict(db.execute(
+        select(DataVersion.name, DataVersion.version)
+        .where(DataVersion.name.in_((version_service.TODOS, TOMBSTONE_HORIZON)))
+    ).all())
+    current, horizon = marks.get(version_service.TODOS, 0), marks.get(TOMBSTONE_HORIZON, 0)
+    if seq > current:
+        # 只读副本落后时客户端可能已见过更新的版本，StaleRead 使读会话改读主库重做
+        raise StaleRead("since 超出当前版本")
+    # 只检查整数水位：翻页游标来自刚开始的一轮同步，之后的删除都晚于当时的版本号，墓碑不会已被清理
+    if not full and last_id is None and seq < horizon:
+        raise TombstonesExpired()
+
+    todos = db.execute(
+        select(*_COLUMNS, TodoItem.change_seq)
+        .where(_after(TodoItem.change_seq, TodoItem.id, seq, last_id), TodoItem.change_seq <= current)
+        .order_by(TodoItem.change_seq, TodoItem.id).limit(limit + 1)
+    ).all()
+    # 全量同步的客户端本地没有数据，不需要墓碑
+    tombstones = [] if full else db.execute(
+        select(TodoTombstone.id, TodoTombstone.change_seq)
+        .where(_after(TodoTombstone.change_seq, TodoTombstone.id, seq, last_id), TodoTombstone.change_seq <= current)
+        .order_by(TodoTombstone.change_seq, TodoTombstone.id).limit(limit + 1)
+    ).all()
+    # 同一时刻一个 id 只会在其中一张表里（SQLite 复用 id 时墓碑序号更小），按 (序号, id) 归并
+    merged = sorted([(r.change_seq, r.id, r) for r in todos] + [(t.change_seq, t.id, None) for t in tombstones],
+                    key=lambda x: (x[0], x[1]))
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    rows = [r for _, _, r in merged if r is not None]
+    # 末尾多出的 change_seq 列在 zip(READ_FIELDS, ...) 时被截掉
+    items = {r[0]: dict(zip(READ_FIELDS, r)) for r in _with_category_names(db, rows)}
+    changes = [
+        {"seq": s, **(event_service.upsert("todo", items[i]) if r is not None else event_service.delete(i))}
+        for s, i, r in merged
+    ]
+    watermark = f"{merged[-1][0]}.{merged[-1][1]}" if has_more else str(current)
+    return {"changes": changes, "watermark": watermark, "has_more": has_more}
+
+
+def purge_tombstones(db: Session, retention_days: float) -> int:
+    """删除早于保留期的墓碑并推进清理水位，返回删除条数。"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    purged = db.execute(
+        delete(TodoTombstone).where(TodoTombstone.deleted_at < cutoff)
+        .returning(TodoTombstone.change_seq).execution_options(synchronize_session=False)
+    ).scalars().all()
+    if purged:
+        top = max(purged)
+        row = db.get(DataVersion, TOMBSTONE_HORIZON)
+        if row is None:
+            db.add(DataVersion(name=TOMBSTONE_HORIZON, version=top))
+        elif row.version < top:
+            row.version = top
+    db.commit()
+    return len(purged)
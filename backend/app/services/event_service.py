@@ -0,0 +1,237 @@
+"""
+变更事件推送（GET /todos/events，Server-Sent Events）。
+- 写路径在事务内 publish 一条紧凑事件（待办 / 分类的增改删），经 notify（PostgreSQL NOTIFY）在提交后送达所有 worker；
+- 每个 worker 复用 notify 模块那一条共享的 LISTEN 连接，收到后放入最近事件环形缓冲，并分发给本进程的 SSE 连接；
+- 事件序号即提交时推进的 todos 数据版本号：版本号行锁保证序号与提交顺序一致，各 worker 看到的序号相同；
+- 断线重连带 Last-Event-ID，从缓冲中补发之后的事件；缓冲已覆盖不到（太旧、监听断线期间可能漏通知）时发 reset，
+  客户端应全量重新加载。
+NOTIFY 负载上限约 8000 字节，放不下完整数据的大批量变更退化为只带 id 的事件。
+"""
+import asyncio
+import threading
+from collections import deque
+
+import orjson
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.core.serialization import to_json
+from app.db import notify
+from app.db.session import session_scope
+from app.services import version_service
+
+logger = get_logger(__name__)
+
+CHANNEL = "todo_events"
+_MAX_PAYLOAD = 7900
+
+
+def upsert(kind: str, item: dict) -> dict:
+    return {"op": "upsert", "id": item["id"], kind: item}
+
+
+def delete(item_id: int) -> dict:
+    return {"op": "delete", "id": item_id}
+
+
+def publish(db: Session, seq: int, kind: str, changes: list[dict] | None) -> None:
+    """
+    在写入事务内登记事件，seq 为本事务推进后的 todos 版本号；提交后才会送达。
+    changes 为 None（如批量导入不逐行取回数据）时直接发 {"reload": true}。
+    """
+    if changes is None:
+        notify.publish(db, CHANNEL, to_json({"seq": seq, "type": kind, "reload": True}).decode())
+        return
+    payload = to_json({"seq": seq, "type": kind, "changes": changes})
+    if len(payload) > _MAX_PAYLOAD:
+        payload = to_json({"seq": seq, "type": kind, "changes": [{"op": c["op"], "id": c["id"]} for c in changes]})
+    if len(payload) > _MAX_PAYLOAD:
+        payload = to_json({"seq": seq, "type": kind, "reload": True})
+    notify.publish(db, CHANNEL, payload.decode())
+
+
+def format_sse(event: str, data: bytes | str, event_id: int | None = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    if isinstance(data, bytes):
+        data = data.decode()
+    return f"{head}event: {event}\ndata: {data}\n\n".encode()
+
+
+class _Client:
+    __slots__ = ("queue", "closed")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SSE_CLIENT_QUEUE_SIZE)
+        self.closed = False
+
+
+class _Hub:
+    """进程内的事件缓冲与 SSE 连接表。notify 回调可能在监听线程或写请求线程中执行，分发统一切回事件循环。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: deque[tuple[int, bytes]] = deque(maxlen=settings.SSE_BUFFER_SIZE)
+        # 缓冲保证完整的起点：序号大于 floor 的事件都在缓冲里（或即将到达）；None 表示未知
+        self.floor: int | None = None
+        self._clients: set[_Client] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._generation = 0  # 监听连接每次（重）建立加一，丢弃重建之前发起的 floor 初始化
+
+    def bind(self, loop: asyncio.AbstractEventLoop | None) -> None:
+        self._loop = loop
+        if loop is not None:
+            self._call(self._schedule_init)
+
+    def _schedule_init(self) -> None:
+        self._loop.create_task(self._init_floor(self._generation))
+
+    async def _init_floor(self, generation: int) -> None:
+        """监听就绪后读当前版本号作为 floor，之后提交的事件都会到达，本 worker 即可为续传补发。"""
+        try:
+            async with session_scope() as db:
+                seq = await db.run_sync(version_service.current, version_service.TODOS)
+        except Exception:
+            logger.warning("init todo event floor failed", exc_info=True)
+            return
+        with self._lock:
+            if generation == self._generation and self.floor is None:
+                self.floor = seq
+
+    def on_notify(self, payload: str | None) -> None:
+        if payload is None:
+            # LISTEN 连接（重）建立，期间的通知可能丢失：清空缓冲并断开已有连接，重连时因缓冲覆盖不到而收到 reset
+            with self._lock:
+                self._events.clear()
+                self.floor = None
+                self._generation += 1
+            self._call(self._broadcast, None)
+            self._call(self._schedule_init)
+            return
+        try:
+            seq = int(orjson.loads(payload)["seq"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("invalid todo event payload: %.200s", payload)
+            return
+        frame = format_sse("change", payload, seq)
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.floor = self._events[0][0]
+            self._events.append((seq, frame))
+        self._call(self._broadcast, frame)
+
+    def _call(self, fn, *args) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            fn(*args)
+        else:
+            loop.call_soon_threadsafe(fn, *args)
+
+    def _broadcast(self, frame: bytes | None) -> None:
+        """frame 为 None 时断开全部连接。队列满（客户端消费跟不上）的连接也断开，重连后按 Last-Event-ID 从缓冲续传。"""
+        for client in list(self._clients):
+            if frame is None:
+                client.closed = True
+            try:
+                client.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                client.closed = True
+
+    def set_floor(self, seq: int) -> None:
+        with self._lock:
+            if self.floor is None:
+                self.floor = seq
+
+    def since(self, seq: int) -> list[bytes] | None:
+        """缓冲中序号大于 seq 的事件；缓冲已不能保证覆盖 seq 之后的全部事件时返回 None。"""
+        with self._lock:
+            if self.floor is None or seq < self.floor:
+                return None
+            return [frame for s, frame in self._events if s > seq]
+
+    def attach(self) -> _Client:
+        client = _Client()
+        self._clients.add(client)
+        return client
+
+    def detach(self, client: _Client) -> None:
+        self._clients.discard(client)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+
+hub = _Hub()
+notify.subscribe(CHANNEL, hub.on_notify)
+
+
+def start() -> None:
+    """应用启动时在事件循环中调用，之后收到的事件才会分发给 SSE 连接。"""
+    hub.bind(asyncio.get_running_loop())
+
+
+def stop() -> None:
+    """断开全部 SSE 连接（客户端会自动重连到其他 worker），避免长连接拖住优雅退出。"""
+    hub._broadcast(None)
+    hub.bind(None)
+
+
+def parse_last_event_id(value: str | None) -> int | None:
+    if value is None or not value.strip():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return -1  # 无法识别的游标按过旧处理，走 reset
+
+
+async def stream(last_id: int | None, current_seq: int):
+    """
+    SSE 帧生成器；current_seq 为连接时读到的 todos 版本号。
+    - 首次连接：ready 事件（id = current_seq），客户端收到后加载列表；
+    - 续传：ready（resumed=true，不带 id）后补发 last_id 之后的事件；缓冲覆盖不到时改发 reset（id = current_seq），
+      客户端应重新加载列表。
+    首次连接与 reset 也会补发缓冲中 current_seq 之后的事件，保证起点之后的事件按序全部送达。
+    先登记连接再取缓冲，两者之间到达的事件可能同时出现在缓冲与队列里，按序号去重。
+    """
+    hub.set_floor(current_seq)
+    client = hub.attach()
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n".encode()
+        backlog = hub.since(last_id) if last_id is not None else None
+        if backlog is None:
+            kind = "ready" if last_id is None else "reset"
+            yield format_sse(kind, to_json({"seq": current_seq, "resumed": False}), current_seq)
+            sent = current_seq
+            backlog = hub.since(current_seq) or []
+        else:
+            yield format_sse("ready", to_json({"seq": current_seq, "resumed": True}))
+            sent = last_id
+        for frame in backlog:
+            sent = _frame_seq(frame)
+            yield frame
+        while True:
+            try:
+                frame = await asyncio.wait_for(client.queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if client.closed:
+                return
+            seq = _frame_seq(frame)
+            if seq > sent:
+                sent = seq
+                yield frame
+    finally:
+        hub.detach(client)
+
+
+def _frame_seq(frame: bytes) -> int:
+    return int(frame[4:frame.index(b"\n")])
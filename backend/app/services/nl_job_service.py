@@ -0,0 +1,233 @@
+"""
+自然语言创建待办的后台任务。POST /todos/jobs 只落一行 nl_jobs 并入队，立即返回 202；
+每个进程有一个有界 asyncio 队列和 NL_JOB_WORKERS 个 worker 协程执行解析与写库，
+LLM 调用不再占住请求或线程池。队列满时拒绝（503），由客户端稍后重试。
+任务状态存在数据库，任一 worker 都能查询；认领用条件 UPDATE，多进程恢复积压任务时不会重复执行。
+每个进程定期巡检：入队进程已退出而滞留在 queued、或执行中断滞留在 running 的任务（按 updated_at 判断）重新排队，
+多次中断的任务标记失败，轮询方不会一直等下去。
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logging import get_logger, request_id_ctx
+from app.db import session as db_session
+from app.models.models import NlJob
+from app.services import nl_todo_service, todo_service
+
+logger = get_logger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_JOB_COLUMNS = (
+    NlJob.id, NlJob.status, NlJob.text, NlJob.source, NlJob.error, NlJob.todo_id,
+    NlJob.created_at, NlJob.started_at, NlJob.finished_at,
+)
+
+
+class JobQueueFullError(Exception):
+    """队列已满，调用方应返回 503 + Retry-After。"""
+
+
+# ---- 数据库操作（同步，经 db.run_sync 调用） ----
+
+def create_job(db: Session, text: str) -> str:
+    job_id = uuid.uuid4().hex
+    db.execute(insert(NlJob).values(id=job_id, text=text, status=QUEUED, attempts=0))
+    db.commit()
+    return job_id
+
+
+def get_job(db: Session, job_id: str) -> dict | None:
+    row = db.execute(select(*_JOB_COLUMNS).where(NlJob.id == job_id)).first()
+    if row is None:
+        return None
+    job = dict(row._mapping)
+    todo_id = job.pop("todo_id")
+    todo = todo_service.get_todo(db, todo_id) if todo_id is not None else None
+    job["todo"] = dict(zip(todo_service.READ_FIELDS, todo)) if todo else None
+    return job
+
+
+def claim_job(db: Session, job_id: str) -> str | None:
+    """queued -> running，返回任务文本；已被其他 worker 认领或不存在时返回 None。"""
+    text = db.execute(
+        update(NlJob)
+        .where(NlJob.id == job_id, NlJob.status == QUEUED)
+        .values(status=RUNNING, started_at=datetime.now(timezone.utc), attempts=NlJob.attempts + 1)
+        .returning(NlJob.text)
+    ).scalar()
+    db.commit()
+    return text
+
+
+def finish_job(db: Session, job_id: str, todo_id: int | None = None, source: str | None = None,
+               error: str | None = None) -> None:
+    db.execute(
+        update(NlJob).where(NlJob.id == job_id).values(
+            status=FAILED if error else SUCCEEDED,
+            todo_id=todo_id,
+            source=source,
+            error=error,
+            finished_at=datetime.now(timezone.utc),
+        )
+    )
+    db.commit()
+
+
+def sweep_jobs(db: Session, limit: int) -> list[str]:
+    """
+    把超过 NL_JOB_STALE_SECONDS 未推进的 queued / running 任务（至多 limit 个）改回 queued 并刷新 updated_at，返回其 id 供本进程入队；
+    已执行 NL_JOB_MAX_ATTEMPTS 次仍中断的 running 任务直接标记失败。
+    多个进程同时巡检时，外层 UPDATE 重新检查 updated_at，同一任务只会被一个进程取走；
+    任务若其实还在别的进程队列里，重复入队也无妨，认领（claim_job）保证只执行一次。
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.NL_JOB_STALE_SECONDS)
+    stale = NlJob.updated_at < stale_before
+    failed = db.execute(
+        update(NlJob)
+        .where(NlJob.status == RUNNING, stale, NlJob.attempts >= settings.NL_JOB_MAX_ATTEMPTS)
+        .values(status=FAILED, error="任务多次执行中断，已放弃", finished_at=now)
+        .returning(NlJob.id)
+    ).scalars().all()
+    if failed:
+        logger.warning("nl jobs abandoned after %s attempts ids=%s", settings.NL_JOB_MAX_ATTEMPTS, failed)
+    ids = []
+    if limit > 0:
+        candidates = (
+            select(NlJob.id).where(NlJob.status.in_((QUEUED, RUNNING)), stale)
+            .order_by(NlJob.created_at).limit(limit).scalar_subquery()
+        )
+        ids = db.execute(
+            update(NlJob).where(NlJob.id.in_(candidates), NlJob.status.in_((QUEUED, RUNNING)), stale)
+            .values(status=QUEUED).returning(NlJob.id)
+        ).scalars().all()
+    db.commit()
+    return ids
+
+
+def recover_jobs(db: Session, limit: int) -> list[str]:
+    """启动时把长时间 running（进程已退出）的任务放回队列，并取出待执行的积压任务。"""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.NL_JOB_STALE_SECONDS)
+    db.execute(
+        update(NlJob)
+        .where(NlJob.status == RUNNING, NlJob.started_at < stale_before)
+        .values(status=QUEUED)
+    )
+    db.commit()
+    return list(db.execute(
+        select(NlJob.id).where(NlJob.status == QUEUED).order_by(NlJob.created_at).limit(limit)
+    ).scalars())
+
+
+# ---- 进程内队列与 worker ----
+
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+
+
+async def _run(job_id: str) -> None:
+    async with db_session.session_scope() as db:
+        text = await db.run_sync(claim_job, job_id)
+    if text is None:
+        return
+    # 认领已提交即归还连接；新会话按需取连接，解析（等待 LLM）期间不占连接
+    async with db_session.session_scope() as db:
+        try:
+            item, source = await nl_todo_service.create_from_text(db, text)
+        except Exception as e:
+            logger.warning("nl job failed id=%s err=%s", job_id, e)
+            error = str(e) or e.__class__.__name__
+            item = source = None
+        else:
+            error = None
+    # 失败时原 session 可能处于回滚状态，结果用新 session 写入
+    async with db_session.session_scope() as db:
+        await db.run_sync(finish_job, job_id, item["id"] if item else None, source, error)
+    logger.info("nl job done id=%s status=%s source=%s", job_id, FAILED if error else SUCCEEDED, source)
+
+
+async def _worker() -> None:
+    while True:
+        job_id = await _queue.get()
+        token = request_id_ctx.set(f"job-{job_id[:8]}")
+        try:
+            await _run(job_id)
+        except Exception:
+            logger.exception("nl job crashed id=%s", job_id)
+        finally:
+            request_id_ctx.reset(token)
+            _queue.task_done()
+
+
+async def _sweeper() -> None:
+    while True:
+        await asyncio.sleep(settings.NL_JOB_SWEEP_SECONDS)
+        try:
+            async with db_session.session_scope() as db:
+                requeued = await db.run_sync(sweep_jobs, _queue.maxsize - _queue.qsize())
+        except Exception:
+            logger.exception("nl job sweep failed")
+            continue
+        for job_id in requeued:
+            try:
+                _queue.put_nowait(job_id)
+            except asyncio.QueueFull:
+                # 巡检期间新任务占满了队列：剩下的已刷新 updated_at，等下一次超时后再被取走
+                break
+        if requeued:
+            logger.info("nl jobs requeued count=%s", len(requeued))
+
+
+async def start() -> None:
+    """应用启动时调用：创建队列与 worker，并恢复积压任务。"""
+    global _queue
+    if db_session.SessionLocal is None or _queue is not None:
+        return
+    _queue = asyncio.Queue(maxsize=settings.NL_JOB_QUEUE_SIZE)
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(settings.NL_JOB_WORKERS))
+    _workers.append(asyncio.create_task(_sweeper()))
+    try:
+        async with db_session.session_scope() as db:
+            pending = await db.run_sync(recover_jobs, settings.NL_JOB_QUEUE_SIZE)
+    except Exception as e:
+        logger.warning("nl job recovery skipped: %s", e)
+        return
+    for job_id in pending:
+        _queue.put_nowait(job_id)
+    if pending:
+        logger.info("nl jobs recovered count=%s", len(pending))
+
+
+async def stop() -> None:
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+def queue_depth() -> int:
+    return _queue.qsize() if _queue is not None else 0
+
+
+async def submit(db, text: str) -> str:
+    """落库并入队，返回任务 id；队列已满时抛出 JobQueueFullError（不落库）。"""
+    if _queue is None:
+        raise JobQueueFullError("后台任务未启动")
+    if _queue.full():
+        raise JobQueueFullError("任务队列已满，请稍后重试")
+    job_id = await db.run_sync(create_job, text)
+    try:
+        _queue.put_nowait(job_id)
+    except asyncio.QueueFull:
+        # 落库期间队列被占满：任务仍在库中，标记失败以免被误认为在排队
+        await db.run_sync(finish_job, job_id, error="任务队列已满")
+        raise JobQueueFullError("任务队列已满，请稍后重试") from None
+    return job_id
@@ -0,0 +1,176 @@
+"""
+自然语言创建待办：解析 -> TodoCreate -> 写库。
+解析顺序：本地规则（置信度足够时直接采用）-> 解析缓存 -> 异步 LLM 客户端；
+数据库访问通过 db.run_sync 复用同步 service；缓存读写与写库各用一个短会话，等待 LLM 期间不占数据库连接。
+批量模式把未命中的句子按条数 / 字符数打包，每包一次 LLM 调用、各包并发，每包完成即批量写库并产出结果。
+"""
+import asyncio
+from datetime import date, datetime
+from typing import AsyncIterator
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.deps import DbSession
+from app.db.session import session_scope
+from app.llm import parse_cache, rule_parser
+from app.llm.ali_client import aparse_natural_language_batch, aparse_natural_language_to_todo
+from app.schemas.todo import TodoCreate
+from app.services import todo_service
+
+
+def _parse_local(text: str, today: date) -> tuple[dict, str] | None:
+    """不需要 I/O 的解析：本地规则、进程内缓存。"""
+    if settings.NL_RULE_ENABLED:
+        local = rule_parser.parse(text, today)
+        if local.confidence >= settings.NL_RULE_MIN_CONFIDENCE:
+            return local.as_parsed(), "rule"
+    if settings.NL_CACHE_ENABLED:
+        cached = parse_cache.get_memory(parse_cache.make_key(text, today))
+        if cached is not None:
+            return dict(cached), "memory"
+    return None
+
+
+async def _in_session(fn, *args):
+    """在一个短会话中执行同步的数据库函数，执行完即归还连接。"""
+    async with session_scope() as db:
+        return await db.run_sync(fn, *args)
+
+
+def to_todo_create(parsed: dict) -> TodoCreate:
+    """解析结果中的 due_date 是字符串，无法识别时置空。"""
+    data = dict(parsed)
+    due_date_str = data.get("due_date")
+    due_date = None
+    if due_date_str and isinstance(due_date_str, str):
+        try:
+            due_date = datetime.strptime(due_date_str.strip()[:10], "%Y-%m-%d").date()
+        except ValueError:
+            pass
+    data["due_date"] = due_date
+    return TodoCreate(**data)
+
+
+async def parse_text(text: str, today: date | None = None) -> tuple[dict, str]:
+    """
+    返回 (解析结果, 来源)，来源为 rule / memory / db / llm。
+    缓存 key 含参考日期：「明天」在不同日期解析结果不同。数据库层缓存的读、写各自用短会话。
+    """
+    today = today or date.today()
+    local = _parse_local(text, today)
+    if local is not None:
+        return local
+    if not settings.NL_CACHE_ENABLED:
+        return await aparse_natural_language_to_todo(text, today), "llm"
+
+    key = parse_cache.make_key(text, today)
+    if settings.NL_CACHE_DB:
+        cached = await _in_session(parse_cache.load, key)
+        if cached is not None:
+            return dict(cached), "db"
+
+    parse_cache.record_miss()
+    parsed = await aparse_natural_language_to_todo(text, today)
+    parse_cache.put_memory(key, parsed)
+    if settings.NL_CACHE_DB:
+        await _in_session(parse_cache.store, key, text, today, parsed)
+    return dict(parsed), "llm"
+
+
+async def create_from_text(db: DbSession, text: str) -> tuple[dict, str]:
+    """db 只在解析完成后用于写库；会话按需取连接，解析期间不占连接。"""
+    parsed, source = await parse_text(text)
+    item = await db.run_sync(todo_service.create_todo, to_todo_create(parsed))
+    return item, source
+
+
+# ---------- 批量 ----------
+
+
+def _chunks(pending: list[tuple[int, str]]) -> list[list[tuple[int, str]]]:
+    """按 NL_BATCH_MAX_ITEMS / NL_BATCH_MAX_CHARS 打包，单句超长时独占一包。"""
+    chunks, current, chars = [], [], 0
+    for index, text in pending:
+        if current and (len(current) >= settings.NL_BATCH_MAX_ITEMS or chars + len(text) > settings.NL_BATCH_MAX_CHARS):
+            chunks.append(current)
+            current, chars = [], 0
+        current.append((index, text))
+        chars += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _insert_parsed(db: Session, parsed: list[tuple[int, dict, str]], failed: list[tuple[int, str]]) -> list[dict]:
+    """把一组解析结果批量写库，返回逐条结果（index 为请求中的序号）。"""
+    results = [
+        {"index": index, "id": None, "ok": False, "item": None, "error": error, "source": None}
+        for index, error in failed
+    ]
+    if parsed:
+        created = todo_service.create_todos(db, [to_todo_create(p) for _, p, _ in parsed])
+        for (index, _, source), result in zip(parsed, created):
+            results.append({**result, "index": index, "source": source})
+    return results
+
+
+async def _parse_chunk(chunk: list[tuple[int, str]], today: date) -> tuple[list, list]:
+    """一包一次 LLM 调用；整包失败时每条都记为失败。"""
+    try:
+        outputs = await aparse_natural_language_batch([text for _, text in chunk], today)
+    except Exception as e:
+        message = str(e) or e.__class__.__name__
+        return [], [(index, f"解析失败: {message}") for index, _ in chunk]
+    parsed, failed = [], []
+    for (index, _), out in zip(chunk, outputs):
+        if isinstance(out, ValueError):
+            failed.append((index, str(out)))
+        else:
+            parsed.append((index, out, "llm"))
+    return parsed, failed
+
+
+async def create_many_from_texts(texts: list[str], today: date | None = None) -> AsyncIterator[list[dict]]:
+    """
+    批量自然语言创建：依次产出若干组逐条结果，先是本地 / 缓存命中的，之后每个 LLM 包完成产出一组。
+    用于流式响应，每次读写各开一个短会话，不依赖请求作用域，等待 LLM 与客户端读取期间不占数据库连接。
+    """
+    today = today or date.today()
+    hits, pending = [], []
+    for index, text in enumerate(texts):
+        local = _parse_local(text, today)
+        if local is None:
+            pending.append((index, text))
+        else:
+            hits.append((index, *local))
+
+    if pending and settings.NL_CACHE_ENABLED and settings.NL_CACHE_DB:
+        keys = {index: parse_cache.make_key(text, today) for index, text in pending}
+        found = await _in_session(parse_cache.load_many, list(keys.values()))
+        hits.extend((index, dict(found[keys[index]]), "db") for index, _ in pending if keys[index] in found)
+        pending = [(index, text) for index, text in pending if keys[index] not in found]
+    if hits:
+        yield await _in_session(_insert_parsed, hits, [])
+    if not pending:
+        return
+
+    parse_cache.record_miss(len(pending))
+    texts_by_index = dict(pending)
+    tasks = [asyncio.create_task(_parse_chunk(chunk, today)) for chunk in _chunks(pending)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            parsed, failed = await next_done
+            if parsed and settings.NL_CACHE_ENABLED:
+                entries = [(parse_cache.make_key(texts_by_index[i], today), texts_by_index[i], p) for i, p, _ in parsed]
+                for key, _, p in entries:
+                    parse_cache.put_memory(key, p)
+                if settings.NL_CACHE_DB:
+                    await _in_session(parse_cache.store_many, today, entries)
+            yield await _in_session(_insert_parsed, parsed, failed)
+    finally:
+        # 客户端断开时生成器被关闭，取消尚未完成的 LLM 调用，并等取消处理完
+        # （half-open 的试探请求被取消时要交还熔断器的试探名额）再结束
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
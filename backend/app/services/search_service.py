@@ -0,0 +1,125 @@
+"""
+待办全文搜索（GET /todos/search?q=），索引定义见 app/models/search.py。
+- PostgreSQL：英文 / 数字按前缀、中文按二元组匹配 search_vector（tsvector + GIN），ts_rank 计分；
+  含中文的词再用 ILIKE 复核整词连续出现。只有中文单字时无法走索引，退化为子串匹配，标题命中计分更高。
+- SQLite：不少于 3 个字符的词走 FTS5 trigram（bm25 计分，标题权重 2），更短的词退化为 LIKE。
+多个词之间为 AND，可与 status / priority / category_id 筛选组合；结果按 (相关度, id) 倒序，游标分页。
+"""
+import re
+
+from sqlalchemy import Float, and_, case, cast, func, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.models.models import TodoItem
+from app.models.search import SEARCH_TEXT_SQL
+from app.services.todo_service import _COLUMNS, _apply_filters, _with_category_names, decode_cursor, encode_cursor
+
+MAX_TERMS = 8
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]")  # 假名与汉字
+_CJK_SPLIT = re.compile(r"([\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]+)")
+_WORD = re.compile(r"\w+")
+_SEARCH_TEXT = literal_column(SEARCH_TEXT_SQL)
+_SEARCH_VECTOR = literal_column("todo_items.search_vector")
+_FTS_MIN_CHARS = 3  # trigram 分词下短于 3 个字符的词无法用 FTS5 匹配
+
+
+def parse_terms(q: str) -> list[str]:
+    """按空白切词，去重，最多 MAX_TERMS 个。"""
+    terms: list[str] = []
+    for term in q.split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _substring_match(term: str):
+    """子串匹配条件与计分：标题命中 1，仅描述命中 0.5。"""
+    pattern = _like_pattern(term)
+    cond = _SEARCH_TEXT.ilike(pattern, escape="\\")
+    score = case((TodoItem.title.ilike(pattern, escape="\\"), 1.0), else_=0.5)
+    return cond, score
+
+
+def _cjk_bigrams(run: str) -> list[str]:
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _postgresql_query(terms: list[str]):
+    lexemes, conds, scores = [], [], []
+    for term in terms:
+        for word in _WORD.findall(term):
+            # 拆开中英混写的词：汉字段转成二元组（与 todo_search_bigrams 一致），其余按前缀匹配
+            for part in _CJK_SPLIT.split(word):
+                if not part:
+                    continue
+                if _CJK.match(part):
+                    lexemes.extend(_cjk_bigrams(part))
+                else:
+                    lexemes.append(f"{part}:*")
+        if _CJK.search(term):
+            cond, score = _substring_match(term)
+            conds.append(cond)
+            scores.append(score)
+    if lexemes:
+        # 词元只含 \w 字符，不会带入 tsquery 运算符
+        tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), " & ".join(dict.fromkeys(lexemes)))
+        conds.insert(0, _SEARCH_VECTOR.op("@@")(tsquery))
+        scores = [func.ts_rank(_SEARCH_VECTOR, tsquery)]
+    return select(*_COLUMNS), conds, scores
+
+
+def _sqlite_query(terms: list[str]):
+    stmt = select(*_COLUMNS)
+    conds, scores = [], []
+    fts_terms = [t for t in terms if len(t) >= _FTS_MIN_CHARS]
+    if fts_terms:
+        match = " AND ".join('"' + t.replace('"', '""') + '"' for t in fts_terms)
+        fts = (
+            select(literal_column("rowid").label("id"), literal_column("-bm25(todo_items_fts, 2.0, 1.0)").label("score"))
+            .select_from(text("todo_items_fts"))
+            .where(text("todo_items_fts MATCH :match").bindparams(match=match))
+            .subquery("fts")
+        )
+        stmt = stmt.join(fts, fts.c.id == TodoItem.id)
+        scores.append(fts.c.score)
+    for term in terms:
+        if len(term) < _FTS_MIN_CHARS:
+            cond, score = _substring_match(term)
+            conds.append(cond)
+            scores.append(score)
+    return stmt, conds, scores
+
+
+def search_todos(
+    db: Session,
+    q: str,
+    status=None,
+    priority=None,
+    category_id=None,
+    limit=20,
+    cursor: str | None = None,
+):
+    """返回 (rows, next_cursor)，rows 为按 READ_FIELDS 排列的元组；搜索词无效或游标无效时抛出 ValueError。"""
+    terms = parse_terms(q)
+    if not any(_WORD.search(t) for t in terms):
+        raise ValueError("搜索词至少需要包含一个字母、数字或汉字")
+    keyset = decode_cursor(cursor, "rank") if cursor else None
+    if db.get_bind().dialect.name == "postgresql":
+        stmt, conds, scores = _postgresql_query(terms)
+    else:
+        stmt, conds, scores = _sqlite_query(terms)
+    # 计分统一转成 double：游标里的相关度经 JSON 往返后仍能与库中的值精确比较
+    rank = cast(scores[0] if len(scores) == 1 else sum(scores[1:], scores[0]), Float(53))
+    stmt = _apply_filters(stmt.add_columns(rank.label("rank")).where(*conds),
+                          status=status, priority=priority, category_id=category_id)
+    if keyset is not None:
+        stmt = stmt.where(or_(rank < keyset["r"], and_(rank == keyset["r"], TodoItem.id < keyset["id"])))
+    rows = db.execute(stmt.order_by(rank.desc(), TodoItem.id.desc()).limit(limit + 1)).all()
+    next_cursor = encode_cursor("rank", rows[limit - 1]) if len(rows) > limit else None
+    # 去掉末尾的 rank 列，与列表接口的元组格式一致
+    return [row[:-1] for row in _with_category_names(db, rows[:limit])], next_cursor
@@ -0,0 +1,140 @@
+"""
+待办统计（GET /todos/stats）：计数器表 todo_stats，每行为 (维度, 取值) -> 条数，读取耗时与待办总数无关。
+todo_service 的写路径把新旧行的差值合并成一条 INSERT ... ON CONFLICT DO UPDATE，与数据写入同一事务提交。
+维度：
+- total / status / priority / category（取值为分类 id，无分类为 "none"）
+- due：未完成且有截止日期的待办按日期计数。逾期 = 早于今天的各行之和，今天到期 = 今天这一行；
+  行数只取决于不同截止日期的个数，日期变化时无需改写计数。
+手工改库、seed 脚本直接插入等造成的漂移用 python -m scripts.todo_stats verify / rebuild 检查与重建。
+"""
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import TodoItem, TodoStat
+from app.services import category_service, version_service
+
+DONE = "done"
+NONE_KEY = "none"
+# 影响统计的列：写路径只在改到这些列时才需要读旧值
+STAT_COLUMNS = (TodoItem.status, TodoItem.priority, TodoItem.category_id, TodoItem.due_date)
+STAT_FIELDS = frozenset(c.key for c in STAT_COLUMNS)
+
+
+def _keys(row) -> list[tuple[str, str]]:
+    keys = [
+        ("total", ""),
+        ("status", row.status),
+        ("priority", row.priority),
+        ("category", NONE_KEY if row.category_id is None else str(row.category_id)),
+    ]
+    if row.due_date is not None and row.status != DONE:
+        keys.append(("due", row.due_date.isoformat()))
+    return keys
+
+
+def diff(added=(), removed=()) -> Counter:
+    """新增行 +1、移除行 -1；更新即「移除旧值 + 新增新值」。行需带有 STAT_COLUMNS 各列。"""
+    delta: Counter = Counter()
+    for row in added:
+        for key in _keys(row):
+            delta[key] += 1
+    for row in removed:
+        for key in _keys(row):
+            delta[key] -= 1
+    return delta
+
+
+def _upsert(db: Session, counts: list[tuple[tuple[str, str], int]]):
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(TodoStat).values([{"dimension": d, "key": k, "count": n} for (d, k), n in counts])
+    return stmt.on_conflict_do_update(
+        index_elements=[TodoStat.dimension, TodoStat.key], set_={"count": TodoStat.count + stmt.excluded["count"]},
+    )
+
+
+def apply(db: Session, delta: Counter) -> None:
+    """把增减量写入计数器，需在写入的同一事务内、version_service.bump 之后调用。"""
+    # 按键排序，并发事务以相同顺序锁计数器行，避免死锁
+    counts = sorted((k, n) for k, n in delta.items() if n)
+    if counts:
+        db.execute(_upsert(db, counts))
+
+
+def get_stats(db: Session, today: date | None = None) -> dict:
+    today_key = (today or date.today()).isoformat()
+    rows = db.execute(
+        select(TodoStat.dimension, TodoStat.key, TodoStat.count)
+        .where(TodoStat.dimension != "due", TodoStat.count != 0)
+        .order_by(TodoStat.dimension, TodoStat.key)
+    ).all()
+    overdue, due_today = db.execute(
+        select(
+            func.coalesce(func.sum(case((TodoStat.key < today_key, TodoStat.count), else_=0)), 0),
+            func.coalesce(func.sum(case((TodoStat.key == today_key, TodoStat.count), else_=0)), 0),
+        ).where(TodoStat.dimension == "due", TodoStat.key <= today_key)
+    ).one()
+    by = {"total": {}, "status": {}, "priority": {}, "category": {}}
+    for dimension, key, count in rows:
+        by.setdefault(dimension, {})[key] = count
+    category_counts = {None if k == NONE_KEY else int(k): n for k, n in by["category"].items()}
+    names = category_service.category_names(db, category_counts)
+    return {
+        "total": by["total"].get("", 0),
+        "by_status": by["status"],
+        "by_priority": by["priority"],
+        "by_category": [
+            {"category_id": cid, "category_name": names.get(cid), "count": n}
+            for cid, n in sorted(category_counts.items(), key=lambda kv: (kv[0] is None, kv[0] or 0))
+        ],
+        "overdue": int(overdue),  # PostgreSQL 的 SUM(bigint) 返回 numeric
+        "due_today": int(due_today),
+    }
+
+
+# ---------- 校验与重建 ----------
+
+
+def expected(db: Session) -> Counter:
+    """按 todo_items 全表聚合出应有的计数。"""
+    counts: Counter = Counter()
+    counts[("total", "")] = db.execute(select(func.count()).select_from(TodoItem)).scalar()
+    for dimension, column in (("status", TodoItem.status), ("priority", TodoItem.priority)):
+        for key, n in db.execute(select(column, func.count()).group_by(column)).all():
+            counts[(dimension, key)] = n
+    for cid, n in db.execute(select(TodoItem.category_id, func.count()).group_by(TodoItem.category_id)).all():
+        counts[("category", NONE_KEY if cid is None else str(cid))] = n
+    due = (
+        select(TodoItem.due_date, func.count())
+        .where(TodoItem.due_date.is_not(None), TodoItem.status != DONE)
+        .group_by(TodoItem.due_date)
+    )
+    for due_date, n in db.execute(due).all():
+        counts[("due", due_date.isoformat())] = n
+    return counts
+
+
+def stored(db: Session) -> Counter:
+    return Counter({(d, k): n for d, k, n in db.execute(select(TodoStat.dimension, TodoStat.key, TodoStat.count))})
+
+
+def verify(db: Session) -> dict[tuple[str, str], tuple[int, int]]:
+    """返回不一致的计数 {(维度, 取值): (计数器, 实际)}，为空表示无漂移。"""
+    have, want = stored(db), expected(db)
+    return {key: (have[key], want[key]) for key in sorted(have.keys() | want.keys()) if have[key] != want[key]}
+
+
+def rebuild(db: Session) -> int:
+    """按全表聚合重写计数器并提交，返回写入的行数。"""
+    # 先推进版本号拿到其行锁：写路径同样先 bump 再改计数器，重建期间的写入会排在重建提交之后
+    version_service.bump(db, version_service.TODOS)
+    db.execute(delete(TodoStat))
+    counts = sorted((k, n) for k, n in expected(db).items() if n)
+    if counts:
+        db.execute(_upsert(db, counts))
+    db.commit()
+    return len(counts)
@@ -1,113 +1,449 @@
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import and_, delete, func, insert, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session
-from app.models.models import TodoItem, Category
-from app.schemas.todo import TodoCreate, TodoUpdate
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.models.models import TodoArchive, TodoItem, TodoTombstone
+from app.schemas.todo import TodoBatchUpdateItem, TodoCreate, TodoUpdate
 from app.core.logging import get_logger
+from app.services import category_service, event_service, stats_service, version_service
 
 logger = get_logger(__name__)
 
 
-def list_todos(db: Session, status=None, priority=None, category_id=None, limit=100, offset=0):
-    q = db.query(TodoItem)
+def _apply_filters(q, status=None, priority=None, category_id=None, model=TodoItem):
+    """model 为 TodoItem 或 TodoArchive（两表列名相同）。"""
     if status:
-        q = q.filter(TodoItem.status == status)
+        q = q.filter(model.status == status)
     if priority:
-        q = q.filter(TodoItem.priority == priority)
+        q = q.filter(model.priority == priority)
     if category_id is not None:
-        q = q.filter(TodoItem.category_id == category_id)
-    total = q.count()
-    rows = q.order_by(TodoItem.id.desc()).offset(offset).limit(limit).all()
-    # 手动挂上 category_name 供 Pydantic 序列化
-    out = []
-    for r in rows:
-        d = {
-            "id": r.id, "title": r.title, "description": r.description,
-            "status": r.status, "priority": r.priority, "due_date": r.due_date,
-            "category_id": r.category_id, "created_at": r.created_at, "updated_at": r.updated_at,
-        }
-        d["category_name"] = r.category.name if r.category else None
-        out.append(d)
-    return out, total
-
-
-def get_todo(db: Session, todo_id: int):
-    row = db.query(TodoItem).filter(TodoItem.id == todo_id).first()
-    if not row:
-        return None
-    return {
-        "id": row.id, "title": row.title, "description": row.description,
-        "status": row.status, "priority": row.priority, "due_date": row.due_date,
-        "category_id": row.category_id, "category_name": row.category.name if row.category else None,
-        "created_at": row.created_at, "updated_at": row.updated_at,
-    }
+        q = q.filter(model.category_id == category_id)
+    return q
+
+
+# 游标分页：cursor 为 base64url(JSON)，对客户端不透明
+# sort=id       按 id 倒序，游标 {"s":"id","id":..}
+# sort=due_date 按 (due_date 升序且空值在后, id 升序)，游标 {"s":"due_date","d":"YYYY-MM-DD"|null,"id":..}
+# 搜索结果按 (相关度, id) 倒序，游标 {"s":"rank","r":..,"id":..}（见 search_service）
+SORTS = ("id", "due_date")
+
+
+def encode_cursor(sort: str, row) -> str:
+    payload = {"s": sort, "id": row.id}
+    if sort == "due_date":
+        payload["d"] = row.due_date.isoformat() if row.due_date else None
+    elif sort == "rank":
+        payload["r"] = row.rank
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> dict:
+    """解析游标，非法或与 sort 不匹配时抛出 ValueError。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload.get("s") != sort or not isinstance(payload.get("id"), int):
+            raise ValueError
+        if sort == "due_date" and payload.get("d") is not None:
+            payload["d"] = date.fromisoformat(payload["d"])
+        if sort == "rank" and not isinstance(payload.get("r"), (int, float)):
+            raise ValueError
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("cursor 无效")
+    return payload
+
+
+def _order_by(q, sort: str, cols):
+    if sort == "due_date":
+        return q.order_by(cols.due_date.asc().nulls_last(), cols.id.asc())
+    return q.order_by(cols.id.desc())
+
+
+def _apply_keyset(q, sort: str, cursor: dict | None, model=TodoItem):
+    if cursor is not None and sort == "due_date":
+        d, last_id = cursor.get("d"), cursor["id"]
+        if d is None:
+            q = q.filter(model.due_date.is_(None), model.id > last_id)
+        else:
+            q = q.filter(or_(
+                model.due_date > d,
+                and_(model.due_date == d, model.id > last_id),
+                model.due_date.is_(None),
+            ))
+    elif cursor is not None:
+        q = q.filter(model.id < cursor["id"])
+    return _order_by(q, sort, model)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <stmt>：由当前方言编译，绑定参数与驱动的占位符风格一致（psycopg2 命名、asyncpg 位置）。"""
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+def _estimate_count(db: Session, stmt) -> int:
+    """PostgreSQL 下用 EXPLAIN 的行数估计代替 COUNT(*)，其他库退回精确计数。"""
+    if db.get_bind().dialect.name != "postgresql":
+        return _exact_count(db, stmt)
+    plan = db.execute(_Explain(stmt)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _exact_count(db: Session, stmt) -> int:
+    return db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+
+
+def _columns(model):
+    return (
+        model.id, model.title, model.description, model.status, model.priority,
+        model.due_date, model.category_id, model.created_at, model.updated_at,
+    )
+
+
+# 读写路径只取响应需要的列，不构造 ORM 对象；category_name 不再 JOIN，由分类缓存补齐
+_COLUMNS = _columns(TodoItem)
+# 对外返回的元组按 READ_FIELDS 排列，与 TodoResponse 字段顺序一致
+READ_FIELDS = (
+    "id", "title", "description", "status", "priority",
+    "due_date", "category_id", "category_name", "created_at", "updated_at",
+)
+_CATEGORY_POS = 7
+
+
+def _read_select():
+    return select(*_COLUMNS)
+
+
+def _with_category_names(db: Session, rows) -> list[tuple]:
+    names = category_service.category_names(db, {r.category_id for r in rows})
+    return [(*r[:_CATEGORY_POS], names.get(r.category_id), *r[_CATEGORY_POS:]) for r in rows]
+
+
+def list_todos(
+    db: Session,
+    status=None,
+    priority=None,
+    category_id=None,
+    limit=100,
+    offset=0,
+    cursor: str | None = None,
+    sort: str = "id",
+    with_total: bool = False,
+    estimate_total: bool = False,
+    include_archived: bool = False,
+):
+    """
+    返回 (rows, total, next_cursor)，rows 为按 READ_FIELDS 排列的元组。
+    传入 cursor 时走键集分页（忽略 offset），深翻页耗时不随页码增长；
+    total 仅在 with_total / estimate_total 时计算，否则为 None。
+    include_archived 时合并归档表（归档的都是已完成待办，按其他状态筛选时不查归档表）。
+    """
+    if sort not in SORTS:
+        raise ValueError("sort 仅支持 id / due_date")
+    keyset = decode_cursor(cursor, sort) if cursor else None
+    models = (TodoItem, TodoArchive) if include_archived and status in (None, "", stats_service.DONE) else (TodoItem,)
+    filters = {"status": status, "priority": priority, "category_id": category_id}
+    ids = [_apply_filters(select(m.id), **filters, model=m) for m in models]
+    filtered = ids[0] if len(ids) == 1 else union_all(*ids)
+    total = None
+    if estimate_total:
+        total = _estimate_count(db, filtered)
+    elif with_total:
+        total = _exact_count(db, filtered)
+    if len(models) == 1:
+        stmt = _apply_keyset(_apply_filters(_read_select(), **filters), sort, keyset)
+    else:
+        # 两表各自按索引取够 offset + limit + 1 行再归并排序，不会扫描整张归档表
+        branches = [
+            _apply_keyset(_apply_filters(select(*_columns(m)), **filters, model=m), sort, keyset, m)
+            .limit((0 if keyset else offset) + limit + 1).subquery()
+            for m in models
+        ]
+        merged = union_all(*(select(*b.c) for b in branches)).subquery()
+        stmt = _order_by(select(*merged.c), sort, merged.c)
+    if keyset is None and offset:
+        stmt = stmt.offset(offset)
+    # 多取一行用于判断是否还有下一页
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    next_cursor = encode_cursor(sort, rows[limit - 1]) if len(rows) > limit else None
+    return _with_category_names(db, rows[:limit]), total, next_cursor
+
+
+def list_version(db: Session) -> int:
+    """列表的变更水位，供 ETag 使用。"""
+    return version_service.current(db, version_service.TODOS)
+
+
+def get_todo(db: Session, todo_id: int, model=TodoItem):
+    """返回按 READ_FIELDS 排列的元组，不存在时为 None；model=TodoArchive 时查归档表。"""
+    row = db.execute(select(*_columns(model)).where(model.id == todo_id)).first()
+    return _with_category_names(db, [row])[0] if row else None
+
+
+# 写路径统一用 RETURNING 一次取回响应所需的全部列，分类名称由缓存补齐；
+# 响应在提交前组装好，同时作为变更事件（/todos/events）的内容。
+# 写事务先推进版本号，改动行的 change_seq 直接写成该值；未命中任何行时回滚，版本号不变
+
+
+def _begin_write(db: Session) -> int:
+    """
+    写事务的第一条语句：推进 todos 数据版本号（列表 ETag 随之变化）并返回，作为本事务改动行的 change_seq
+    与变更事件序号。版本号行锁持有到提交，序号与提交顺序一致；各写路径都先取这把锁再锁待办行，不会交叉死锁。
+    """
+    return version_service.bump(db, version_service.TODOS)
+
+
+def _touch(db: Session, seq: int, stats=None, changes=None) -> None:
+    """写入成功后在同一事务内应用统计计数的增减，并以 seq 为序号发布变更事件。"""
+    if stats:
+        stats_service.apply(db, stats)
+    if changes:
+        event_service.publish(db, seq, "todo", changes)
+
+
+def _bury(db: Session, seq: int, ids) -> None:
+    """删除的待办写入墓碑；SQLite 可能复用已删除的最大 id，同一 id 再次删除时覆盖旧墓碑。"""
+    insert_ = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert_(TodoTombstone).values([{"id": i, "change_seq": seq} for i in sorted(ids)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TodoTombstone.id],
+        set_={"change_seq": stmt.excluded.change_seq, "deleted_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def _locked_stat_rows(db: Session, ids) -> dict:
+    """改动影响统计的列之前，锁行并读出旧值（id -> row），用于计算计数差值。"""
+    stmt = select(TodoItem.id, *stats_service.STAT_COLUMNS).where(TodoItem.id.in_(ids)).with_for_update()
+    return {row.id: row for row in db.execute(stmt).all()}
+
+
+def _returned_to_response(db: Session, row) -> dict:
+    return dict(zip(READ_FIELDS, _with_category_names(db, [row])[0]))
+
+
+def _returned_to_responses(db: Session, rows) -> dict[int, dict]:
+    """id -> 响应 dict，分类名称一次补齐。"""
+    return {r[0]: dict(zip(READ_FIELDS, r)) for r in _with_category_names(db, rows)}
 
 
 def create_todo(db: Session, data: TodoCreate):
-    obj = TodoItem(
+    seq = _begin_write(db)
+    stmt = insert(TodoItem).values(
         title=data.title,
         description=data.description,
         status=data.status,
         priority=data.priority,
         due_date=data.due_date,
         category_id=data.category_id,
-    )
-    db.add(obj)
+        change_seq=seq,
+    ).returning(*_COLUMNS)
+    row = db.execute(stmt).one()
+    item = _returned_to_response(db, row)
+    _touch(db, seq, stats_service.diff(added=[row]), [event_service.upsert("todo", item)])
     db.commit()
-    db.refresh(obj)
-    logger.info("todo created id=%s title=%s", obj.id, obj.title)
-    return _row_to_response(db, obj)
+    logger.info("todo created id=%s title=%s", row.id, row.title)
+    return item
 
 
-def _row_to_response(db: Session, row: TodoItem):
-    db.refresh(row)
-    cat = db.query(Category).filter(Category.id == row.category_id).first() if row.category_id else None
-    return {
-        "id": row.id, "title": row.title, "description": row.description,
-        "status": row.status, "priority": row.priority, "due_date": row.due_date,
-        "category_id": row.category_id, "category_name": cat.name if cat else None,
-        "created_at": row.created_at, "updated_at": row.updated_at,
-    }
+def _update_returning(db: Session, todo_id: int, values: dict):
+    """单条 UPDATE ... RETURNING；无字段可改时退化为一次 SELECT。行不存在返回 None。"""
+    if not values:
+        row = db.execute(select(*_COLUMNS).where(TodoItem.id == todo_id)).first()
+        db.commit()
+        return _returned_to_response(db, row) if row else None
+    seq = _begin_write(db)
+    old = _locked_stat_rows(db, [todo_id]) if stats_service.STAT_FIELDS & values.keys() else {}
+    stmt = (
+        update(TodoItem).where(TodoItem.id == todo_id).values({**values, "change_seq": seq})
+        .returning(*_COLUMNS).execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        db.rollback()
+        return None
+    item = _returned_to_response(db, row)
+    stats = stats_service.diff(added=[row], removed=[old[row.id]]) if old else None
+    _touch(db, seq, stats, [event_service.upsert("todo", item)])
+    db.commit()
+    return item
 
 
 def update_todo_full(db: Session, todo_id: int, data: TodoUpdate):
-    row = db.query(TodoItem).filter(TodoItem.id == todo_id).first()
-    if not row:
-        return None
-    row.title = data.title or row.title
-    row.description = data.description if data.description is not None else row.description
-    row.status = data.status or row.status
-    row.priority = data.priority or row.priority
-    row.due_date = data.due_date if data.due_date is not None else row.due_date
-    row.category_id = data.category_id if data.category_id is not None else row.category_id
-    db.commit()
-    db.refresh(row)
-    return _row_to_response(db, row)
+    # 与历史行为一致：标题/状态/优先级为空串时保持原值，其余字段为 None 时保持原值
+    values = {}
+    for field in ("title", "status", "priority"):
+        if getattr(data, field):
+            values[field] = getattr(data, field)
+    for field in ("description", "due_date", "category_id"):
+        if getattr(data, field) is not None:
+            values[field] = getattr(data, field)
+    return _update_returning(db, todo_id, values)
 
 
 def update_todo_partial(db: Session, todo_id: int, data: TodoUpdate):
-    row = db.query(TodoItem).filter(TodoItem.id == todo_id).first()
-    if not row:
-        return None
-    if data.title is not None:
-        row.title = data.title
-    if data.description is not None:
-        row.description = data.description
-    if data.status is not None:
-        row.status = data.status
-    if data.priority is not None:
-        row.priority = data.priority
-    if data.due_date is not None:
-        row.due_date = data.due_date
-    if data.category_id is not None:
-        row.category_id = data.category_id
-    db.commit()
-    db.refresh(row)
-    return _row_to_response(db, row)
+    return _update_returning(db, todo_id, data.model_dump(exclude_none=True))
 
 
 def delete_todo(db: Session, todo_id: int) -> bool:
-    row = db.query(TodoItem).filter(TodoItem.id == todo_id).first()
-    if not row:
+    """单条 DELETE ... RETURNING 统计列，无返回行即不存在。"""
+    seq = _begin_write(db)
+    row = db.execute(
+        delete(TodoItem).where(TodoItem.id == todo_id).returning(*stats_service.STAT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        db.rollback()
         return False
-    db.delete(row)
+    _bury(db, seq, [todo_id])
+    _touch(db, seq, stats_service.diff(removed=[row]), [event_service.delete(todo_id)])
     db.commit()
-    return True
\ No newline at end of file
+    return True
+
+
+# ---------- 批量写入：整批一个事务，多行 INSERT/UPDATE/DELETE ... RETURNING ----------
+
+
+def _existing_category_ids(db: Session, category_ids) -> set[int]:
+    ids = {c for c in category_ids if c is not None}
+    if not ids:
+        return set()
+    return ids & category_service.category_names(db, ids).keys()
+
+
+def _result(index, todo_id=None, item=None, error=None) -> dict:
+    return {"index": index, "id": todo_id, "ok": error is None, "item": item, "error": error}
+
+
+def create_todos(db: Session, items: list[TodoCreate]) -> list[dict]:
+    """批量创建：引用不存在分类的条目单独报错，其余一条多行 INSERT ... RETURNING 写入。"""
+    known = _existing_category_ids(db, (d.category_id for d in items))
+    results: list[dict | None] = [None] * len(items)
+    params, positions = [], []
+    for i, data in enumerate(items):
+        if data.category_id is not None and data.category_id not in known:
+            results[i] = _result(i, error="分类不存在")
+            continue
+        params.append(data.model_dump())
+        positions.append(i)
+    if params:
+        seq = _begin_write(db)
+        for p in params:
+            p["change_seq"] = seq
+        # insertmanyvalues：PostgreSQL 上按批渲染为多行 INSERT ... VALUES ... RETURNING，且结果与参数顺序一致
+        stmt = insert(TodoItem).returning(*_COLUMNS, sort_by_parameter_order=True)
+        rows = db.execute(stmt, params).all()
+        responses = _returned_to_responses(db, rows)
+        _touch(db, seq, stats_service.diff(added=rows), [event_service.upsert("todo", responses[r.id]) for r in rows])
+        db.commit()
+        for i, row in zip(positions, rows):
+            results[i] = _result(i, row.id, responses[row.id])
+    logger.info("todo batch created count=%s", len(params))
+    return results
+
+
+def update_todos(db: Session, items: list[TodoBatchUpdateItem]) -> list[dict]:
+    """
+    批量部分更新（语义同 PATCH）：相同修改内容的条目合并为一条 UPDATE ... WHERE id IN (...) RETURNING，
+    多选「全部标记完成」这类操作只需一条语句。同一 id 重复出现时仅第一次生效。
+    """
+    known = _existing_category_ids(db, (d.category_id for d in items))
+    results: list[dict | None] = [None] * len(items)
+    groups: dict[tuple, list[int]] = {}
+    seen: set[int] = set()
+    for i, data in enumerate(items):
+        if data.id in seen:
+            results[i] = _result(i, data.id, error="重复的 id")
+            continue
+        seen.add(data.id)
+        if data.category_id is not None and data.category_id not in known:
+            results[i] = _result(i, data.id, error="分类不存在")
+            continue
+        patch = data.model_dump(exclude={"id"}, exclude_none=True)
+        groups.setdefault(tuple(sorted(patch.items())), []).append(i)
+
+    seq = _begin_write(db) if any(groups) else None
+    stat_ids = [items[i].id for key, positions in groups.items() if stats_service.STAT_FIELDS & dict(key).keys()
+                for i in positions]
+    old = _locked_stat_rows(db, stat_ids) if stat_ids else {}
+    returned = {}
+    changed_ids = []
+    for key, positions in groups.items():
+        ids = [items[i].id for i in positions]
+        if key:
+            stmt = (
+                update(TodoItem).where(TodoItem.id.in_(ids)).values({**dict(key), "change_seq": seq})
+                .returning(*_COLUMNS).execution_options(synchronize_session=False)
+            )
+        else:
+            stmt = select(*_COLUMNS).where(TodoItem.id.in_(ids))
+        for row in db.execute(stmt).all():
+            returned[row.id] = row
+            if key:
+                changed_ids.append(row.id)
+    responses = _returned_to_responses(db, list(returned.values()))
+    if changed_ids:
+        _touch(
+            db,
+            seq,
+            stats_service.diff(
+                added=[returned[i] for i in old if i in returned], removed=[old[i] for i in old if i in returned],
+            ),
+            [event_service.upsert("todo", responses[i]) for i in changed_ids],
+        )
+        db.commit()
+    else:
+        db.rollback()
+
+    for positions in groups.values():
+        for i in positions:
+            item = responses.get(items[i].id)
+            if item is None:
+                results[i] = _result(i, items[i].id, error="待办不存在")
+            else:
+                results[i] = _result(i, item["id"], item)
+    return results
+
+
+def delete_todos(db: Session, ids: list[int]) -> list[dict]:
+    """
+    批量删除：一条 DELETE ... WHERE id IN (...) RETURNING id 与统计列，未命中的 id 逐条报告。
+    同一 id 重复出现时只有第一次计为删除，之后的报告为重复。
+    """
+    seq = _begin_write(db)
+    stmt = delete(TodoItem).where(TodoItem.id.in_(set(ids))).returning(TodoItem.id, *stats_service.STAT_COLUMNS)
+    rows = db.execute(stmt.execution_options(synchronize_session=False)).all()
+    deleted = {row.id for row in rows}
+    if deleted:
+        _bury(db, seq, deleted)
+        _touch(db, seq, stats_service.diff(removed=rows), [event_service.delete(row.id) for row in rows])
+        db.commit()
+    else:
+        db.rollback()
+    logger.info("todo batch deleted count=%s", len(deleted))
+    results, seen = [], set()
+    for i, todo_id in enumerate(ids):
+        if todo_id in seen:
+            results.append(_result(i, todo_id, error="重复的 id"))
+        elif todo_id in deleted:
+            results.append(_result(i, todo_id))
+        else:
+            results.append(_result(i, todo_id, error="待办不存在"))
+        seen.add(todo_id)
+    return results
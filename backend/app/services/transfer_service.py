@@ -0,0 +1,263 @@
+"""
+待办批量导出 / 导入，内存占用与行数无关：
+- 导出（GET /todos/export）：服务端游标（yield_per，PostgreSQL 上为命名游标 / asyncpg cursor）每次取
+  TODO_EXPORT_CHUNK_ROWS 行，编码成 NDJSON 或 CSV 后立即写出；整个导出是一条语句，读到的是同一快照。
+- 导入（POST /todos/import）：边读请求体边解析，逐行校验，攒满 TODO_IMPORT_BATCH_ROWS 行写一次库：
+  PostgreSQL 走 COPY（psycopg2 copy_expert / asyncpg copy_records_to_table），SQLite 为 executemany。
+  每批一个事务，与普通写路径一样推进版本号、写 change_seq、更新统计计数并发出 reload 事件；
+  无效行不影响其他行，按行号报告（最多 MAX_REPORTED_ERRORS 条）。
+"""
+import asyncio
+import codecs
+import contextlib
+import csv
+import io
+from datetime import date, datetime
+from typing import AsyncIterator, Iterator
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from app.config import settings
+from app.core.deps import DbSession
+from app.core.serialization import to_ndjson
+from app.db.replicas import Replica
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.models import TodoItem
+from app.schemas.todo import TodoCreate
+from app.services import category_service, event_service, stats_service, todo_service
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+IMPORT_FIELDS = ("title", "description", "status", "priority", "due_date", "category_id")
+MAX_REPORTED_ERRORS = 1000
+_COPY_COLUMNS = (*IMPORT_FIELDS, "change_seq")
+
+
+# ---------- 导出 ----------
+
+
+def _export_stmt(status=None, priority=None, category_id=None):
+    stmt = todo_service._apply_filters(select(*todo_service._COLUMNS), status, priority, category_id)
+    return stmt.order_by(TodoItem.id).execution_options(yield_per=settings.TODO_EXPORT_CHUNK_ROWS)
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _encode(fmt: str, rows, names: dict[int, str]) -> bytes:
+    """一批行编码为 NDJSON / CSV 字节，分类名称由导出开始时读到的分类表补齐。"""
+    pos = todo_service._CATEGORY_POS
+    rows = [(*r[:pos], names.get(r.category_id), *r[pos:]) for r in rows]
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerows([_csv_value(v) for v in r] for r in rows)
+        return buf.getvalue().encode()
+    return b"".join(to_ndjson(dict(zip(todo_service.READ_FIELDS, r))) for r in rows)
+
+
+def _header(fmt: str) -> bytes:
+    return (",".join(todo_service.READ_FIELDS) + "\r\n").encode() if fmt == "csv" else b""
+
+
+def _export_sync(fmt: str, stmt, session_factory) -> Iterator[bytes]:
+    # 普通迭代器：StreamingResponse 在线程池中逐块取
+    with session_factory() as db:
+        names = category_service.category_names(db)
+        yield _header(fmt)
+        for rows in db.execute(stmt).partitions():
+            yield _encode(fmt, rows, names)
+
+
+async def _export_async(fmt: str, stmt, session_factory) -> AsyncIterator[bytes]:
+    async with session_factory() as db:
+        names = await db.run_sync(category_service.category_names)
+        yield _header(fmt)
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield _encode(fmt, rows, names)
+
+
+def export_todos(fmt: str, status=None, priority=None, category_id=None, replica: Replica | None = None):
+    """
+    返回导出内容的分块迭代器（DB_ASYNC 下为异步迭代器）。使用独立会话，随响应结束（或客户端断开）关闭，
+    不占用请求注入的会话。replica 为只读副本时在副本上读（导出中途出错不会改读主库）。
+    """
+    stmt = _export_stmt(status, priority, category_id)
+    if replica is not None:
+        session_factory, async_session_factory = replica.session_factory, replica.async_session_factory
+    else:
+        session_factory, async_session_factory = SessionLocal, AsyncSessionLocal
+    if async_session_factory is not None:
+        return _export_async(fmt, stmt, async_session_factory)
+    if session_factory is None:
+        raise RuntimeError("DATABASE_URL 未配置，无法使用数据库")
+    return _export_sync(fmt, stmt, session_factory)
+
+
+# ---------- 导入 ----------
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """请求体按行切分并解码为 (行号, 文本)，行尾不含换行；去掉开头的 UTF-8 BOM。"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_no = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield line_no + 1, pending.rstrip("\r")
+
+
+async def _ndjson_records(chunks) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    async for line_no, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield line_no, None, "不是合法的 JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "每行应为一个 JSON 对象"
+            continue
+        yield line_no, record, None
+
+
+async def _csv_records(chunks) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """首行为表头；引号内可以换行，按引号个数是否成对判断一条记录是否结束。空字段视为未填。"""
+    header = None
+    buffered: list[str] = []
+    start = 0
+    async for line_no, line in _lines(chunks):
+        if not buffered:
+            start = line_no
+        buffered.append(line)
+        text = "\n".join(buffered)
+        if text.count('"') % 2:
+            continue
+        buffered = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if len(values) != len(header):
+            yield start, None, f"列数 {len(values)} 与表头 {len(header)} 不一致"
+            continue
+        yield start, {k: v for k, v in zip(header, values) if k in IMPORT_FIELDS and v != ""}, None
+    if buffered:
+        yield start, None, "引号未闭合"
+
+
+def _validate(record: dict) -> tuple[TodoCreate | None, str | None]:
+    try:
+        return TodoCreate.model_validate({k: v for k, v in record.items() if k in IMPORT_FIELDS}), None
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+
+def _copy_field(value) -> str:
+    """COPY 的 CSV 格式：未加引号的空字段为 NULL，字符串一律加引号，空字符串不会变成 NULL。"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def _copy_rows(db: Session, items: list[TodoCreate], seq: int) -> None:
+    records = [(*(getattr(d, f) for f in IMPORT_FIELDS), seq) for d in items]
+    conn = db.connection()
+    raw = conn.connection.driver_connection
+    if conn.dialect.driver == "asyncpg":
+        # run_sync 的 greenlet 内等待 asyncpg 协程
+        await_only(raw.copy_records_to_table(TodoItem.__tablename__, records=records, columns=_COPY_COLUMNS))
+        return
+    buf = io.StringIO("".join(",".join(map(_copy_field, r)) + "\n" for r in records))
+    sql = f"COPY {TodoItem.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    with raw.cursor() as cur:
+        cur.copy_expert(sql, buf)
+
+
+def _insert_batch(db: Session, batch: list[tuple[int, TodoCreate]]) -> tuple[int, list[dict]]:
+    """写入一批已校验的行，返回 (写入条数, 引用不存在分类的行的错误)。"""
+    known = todo_service._existing_category_ids(db, (d.category_id for _, d in batch))
+    items, errors = [], []
+    for line_no, d in batch:
+        if d.category_id is not None and d.category_id not in known:
+            errors.append({"line": line_no, "error": "分类不存在"})
+        else:
+            items.append(d)
+    if not items:
+        return 0, errors
+    seq = todo_service._begin_write(db)
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, items, seq)
+    else:
+        db.execute(insert(TodoItem), [{**d.model_dump(), "change_seq": seq} for d in items])
+    todo_service._touch(db, seq, stats_service.diff(added=items))
+    # 不逐行取回 id，事件流订阅方整表重新加载；增量同步按 change_seq 能读到这些行
+    event_service.publish(db, seq, "todo", None)
+    db.commit()
+    return len(items), errors
+
+
+async def import_todos(db: DbSession, fmt: str, chunks: AsyncIterator[bytes]) -> dict:
+    """
+    返回 {"inserted", "failed", "errors": [{"line", "error"}], "errors_truncated"}。
+    写完一批才继续读请求体，读取速度受写库速度约束，内存只有一批行。
+    """
+    report = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def fail(line: int, error: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    async def flush(batch) -> None:
+        inserted, errors = await db.run_sync(_insert_batch, batch)
+        report["inserted"] += inserted
+        for e in errors:
+            fail(e["line"], e["error"])
+
+    records = _csv_records(chunks) if fmt == "csv" else _ndjson_records(chunks)
+    batch: list[tuple[int, TodoCreate]] = []
+    # 上一批写库的同时解析下一批：同一时刻最多一批在写（会话不并发使用），内存最多两批
+    writing: asyncio.Task | None = None
+    try:
+        async for line_no, record, error in records:
+            item = None
+            if error is None:
+                item, error = _validate(record)
+            if error is not None:
+                fail(line_no, error)
+                continue
+            batch.append((line_no, item))
+            if len(batch) >= settings.TODO_IMPORT_BATCH_ROWS:
+                if writing is not None:
+                    await writing
+                writing, batch = asyncio.ensure_future(flush(batch)), []
+        if writing is not None:
+            await writing
+            writing = None
+        if batch:
+            await flush(batch)
+    finally:
+        # 读请求体出错（如客户端断开）时等在途的一批写完，再让会话随请求关闭
+        if writing is not None:
+            with contextlib.suppress(Exception):
+                await writing
+    report["errors"].sort(key=lambda e: e["line"])  # 分类错误在写库时才发现，按行号重排
+    return report
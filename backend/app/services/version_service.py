@@ -0,0 +1,30 @@
+"""
+数据版本号：每类数据一行计数器，写路径在同一事务内调用 bump，读路径用 current 生成 ETag。
+计数器行在事务提交前持有行锁，因此版本号与提交顺序一致；读到的永远是已提交的值。
+"""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.models import DataVersion
+
+TODOS = "todos"
+
+
+def bump(db: Session, name: str) -> int:
+    """版本号 +1 并返回新值，需在写入的同一事务内调用。"""
+    stmt = (
+        update(DataVersion).where(DataVersion.name == name)
+        .values(version=DataVersion.version + 1).returning(DataVersion.version)
+        .execution_options(synchronize_session=False)
+    )
+    version = db.execute(stmt).scalar()
+    if version is None:
+        # 新库（如本地 create_all）还没有这一行
+        db.add(DataVersion(name=name, version=1))
+        db.flush()
+        version = 1
+    return version
+
+
+def current(db: Session, name: str) -> int:
+    return db.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar() or 0
@@ -0,0 +1,14 @@
+"""
+可复现的压测套件：按指定规模播种数据，运行混合负载，输出机器可读的 JSON 并与基线对比。
+
+用法（在 backend 目录下）：
+    # 1. 播种：10 万条待办、50 个分类（PostgreSQL 用 generate_series，SQLite 用递归 CTE，在库内生成）
+    uv run python -m scripts.bench seed --todos 100000 --categories 50 --reset
+    # 2. 压测：进程内 ASGI 或真实 uvicorn worker；负载含 NL 时自动启动假 LLM 服务
+    uv run python -m scripts.bench run --target asgi --workload mixed --duration 20 --out base.json
+    uv run python -m scripts.bench run --target uvicorn --workers 4 --workload mixed --baseline base.json
+    # 3. 对比两次结果（吞吐下降或 p95/p99 上升超过阈值时退出码非 0）
+    uv run python -m scripts.bench compare base.json new.json --threshold 0.1
+
+数据库由 DATABASE_URL 决定（--database-url 可覆盖），SQLite 可作为本地替身。
+"""
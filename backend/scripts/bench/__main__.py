@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from scripts.bench import compare, workloads
+
+
+def _cmd_seed(args) -> int:
+    from scripts.bench.seed import seed
+
+    url = args.database_url or os.getenv("DATABASE_URL")
+    if not url:
+        print("需要 DATABASE_URL 或 --database-url", file=sys.stderr)
+        return 2
+    print(json.dumps(seed(url, args.todos, args.categories, reset=args.reset, chunk=args.chunk)))
+    return 0
+
+
+def _report(results: dict) -> str:
+    lines = [f"{'op':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"]
+    for name, r in [("overall", results["overall"]), *results["ops"].items()]:
+        lines.append(f"{name:<14}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+    return "\n".join(lines)
+
+
+def _check(baseline_path: str, results: dict, threshold: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    for mismatch in compare.meta_mismatches(baseline, results):
+        print(f"warning: 运行参数不同 {mismatch}", file=sys.stderr)
+    rows = compare.compare(baseline, results, threshold)
+    print(compare.format_rows(rows), file=sys.stderr)
+    return 1 if any(r["regressed"] for r in rows) else 0
+
+
+def _cmd_run(args) -> int:
+    from scripts.bench.runner import run
+
+    results = asyncio.run(run(args))
+    data = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+    # 人读的表格走 stderr，stdout 保持为纯 JSON
+    print(_report(results), file=sys.stderr)
+    if args.baseline:
+        return _check(args.baseline, results, args.threshold)
+    return 0
+
+
+def _cmd_compare(args) -> int:
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    return _check(args.baseline, current, args.threshold)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m scripts.bench", description="load test and benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("seed", help="按规模播种待办与分类")
+    p.add_argument("--todos", type=int, default=10_000)
+    p.add_argument("--categories", type=int, default=20)
+    p.add_argument("--reset", action="store_true", help="先清空待办、分类与 NL 相关表")
+    p.add_argument("--chunk", type=int, default=1_000_000, help="每个事务插入的行数")
+    p.add_argument("--database-url")
+    p.set_defaults(func=_cmd_seed)
+
+    p = sub.add_parser("run", help="运行负载并输出 JSON")
+    p.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    p.add_argument("--workers", type=int, default=1, help="uvicorn worker 数")
+    p.add_argument("--workload", choices=tuple(workloads.PROFILES), default="mixed")
+    p.add_argument("--concurrency", type=int, default=50)
+    p.add_argument("--duration", type=float, default=20.0)
+    p.add_argument("--warmup", type=float, default=3.0, help="预热秒数，不计入结果")
+    p.add_argument("--seed", type=int, default=1, help="请求序列的随机种子")
+    p.add_argument("--db-async", action="store_true", help="以 DB_ASYNC=true 运行")
+    p.add_argument("--llm-latency", type=float, default=0.5, help="假 LLM 每次回复的延迟（秒）")
+    p.add_argument("--nl-llm-only", action="store_true", help="关闭规则解析与缓存，NL 请求都走假 LLM")
+    p.add_argument("--port", type=int, default=8800)
+    p.add_argument("--database-url")
+    p.add_argument("--out", help="结果写入文件（默认 stdout）")
+    p.add_argument("--baseline", help="与基线 JSON 对比，回退时退出码为 1")
+    p.add_argument("--threshold", type=float, default=0.1)
+    p.set_defaults(func=_cmd_run)
+
+    p = sub.add_parser("compare", help="对比两次结果")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.1)
+    p.set_defaults(func=_cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
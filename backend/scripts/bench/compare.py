@@ -0,0 +1,44 @@
+"""
+对比两次压测结果：吞吐下降或 p95 / p99 上升超过阈值（相对值）记为回退。
+延迟绝对变化小于 min_delta_ms 时忽略，避免毫秒级抖动在低延迟操作上被放大。
+"""
+
+METRICS = (("rps", -1), ("p95_ms", 1), ("p99_ms", 1))  # (指标, 变差的方向)
+# 这些运行参数不同时结果不可直接比较
+_COMPARABLE = ("target", "workers", "db_async", "database", "workload", "concurrency", "seeded_max_id", "cpus")
+
+
+def meta_mismatches(baseline: dict, current: dict) -> list[str]:
+    base, cur = baseline.get("meta", {}), current.get("meta", {})
+    return [f"{k}: {base.get(k)} -> {cur.get(k)}" for k in _COMPARABLE if base.get(k) != cur.get(k)]
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1, min_delta_ms: float = 1.0) -> list[dict]:
+    rows = []
+    sections = {"overall": (baseline.get("overall"), current.get("overall"))}
+    for name in current.get("ops", {}):
+        sections[name] = (baseline.get("ops", {}).get(name), current["ops"][name])
+    for name, (base, cur) in sections.items():
+        if not base or not cur:
+            continue
+        for metric, worse in METRICS:
+            before, after = base[metric], cur[metric]
+            change = (after - before) / before if before else 0.0
+            regressed = change * worse > threshold
+            if metric != "rps" and abs(after - before) < min_delta_ms:
+                regressed = False
+            rows.append({
+                "op": name, "metric": metric, "baseline": before, "current": after,
+                "change": round(change, 4), "regressed": regressed,
+            })
+    return rows
+
+
+def format_rows(rows: list[dict]) -> str:
+    lines = [f"{'op':<14}{'metric':<9}{'baseline':>11}{'current':>11}{'change':>9}"]
+    for r in rows:
+        flag = "  REGRESSED" if r["regressed"] else ""
+        lines.append(
+            f"{r['op']:<14}{r['metric']:<9}{r['baseline']:>11}{r['current']:>11}{r['change']:>+9.1%}{flag}"
+        )
+    return "\n".join(lines)
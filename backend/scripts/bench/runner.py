@@ -0,0 +1,193 @@
+"""
+压测执行：固定并发的闭环客户端在 duration 秒内按权重发请求，分操作统计吞吐与延迟分位。
+目标为进程内 ASGI（httpx.ASGITransport，排除网络与 uvicorn，适合对比 service / 中间件改动）
+或真实 uvicorn worker（子进程，含 HTTP 解析与多进程调度）。负载含 NL 时启动本地假 LLM 服务。
+"""
+import asyncio
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+from scripts.bench import workloads
+from scripts.bench_db_modes import _wait_ready
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(pct(0.50), 2),
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, profile: dict[str, int], dataset: workloads.Dataset,
+                   concurrency: int, duration: float, seed: int) -> dict:
+    names = list(profile)
+    weights = [profile[n] for n in names]
+    latencies: dict[str, list[float]] = {n: [] for n in names}
+    errors: dict[str, int] = {n: 0 for n in names}
+    stop_at = time.monotonic() + duration
+
+    async def worker(n: int) -> None:
+        state = workloads.WorkerState(dataset, random.Random(seed * 10_000 + n))
+        while time.monotonic() < stop_at:
+            name = state.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await workloads.OPS[name](client, state)
+            except httpx.HTTPError:
+                response = False
+            if response is None:
+                continue
+            latencies[name].append(time.perf_counter() - start)
+            if response is False or response.status_code not in workloads.OK_STATUS.get(name, (200,)):
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ops = {n: summarize(latencies[n], errors[n], elapsed) for n in names if latencies[n]}
+    overall = summarize([x for v in latencies.values() for x in v], sum(errors.values()), elapsed)
+    return {"overall": overall, "ops": ops}
+
+
+async def _dataset(client: httpx.AsyncClient, with_nl: bool) -> workloads.Dataset:
+    newest = (await client.get("/todos", params={"limit": 1})).json()
+    categories = (await client.get("/categories")).json()
+    return workloads.Dataset(
+        max_id=newest[0]["id"] if newest else 0,
+        category_ids=[c["id"] for c in categories],
+        nl_texts=workloads.load_nl_texts() if with_nl else [],
+    )
+
+
+def _server_env(args, llm_port: int | None) -> dict:
+    env = {"LOG_LEVEL": "WARNING", "DB_ASYNC": "true" if args.db_async else "false"}
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    if llm_port:
+        env.update(BAILIAN_API_KEY="bench", ALI_BASE_URL=f"http://127.0.0.1:{llm_port}/v1", LLM_MAX_RETRIES="0")
+        if args.nl_llm_only:
+            # 关闭规则解析与缓存，每个 NL 请求都走（假）LLM
+            env.update(NL_RULE_ENABLED="false", NL_CACHE_ENABLED="false")
+    return env
+
+
+@asynccontextmanager
+async def _fake_llm(args, needed: bool):
+    if not needed:
+        yield None
+        return
+    port = args.port + 100
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "scripts.fake_llm_server", "--port", str(port), "--latency", str(args.llm_latency)],
+        cwd=_BACKEND_DIR, stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 15
+        async with httpx.AsyncClient() as probe:
+            while True:
+                try:
+                    await probe.get(f"http://127.0.0.1:{port}/")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("fake llm server not ready") from None
+                    await asyncio.sleep(0.2)
+        yield port
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+@asynccontextmanager
+async def _asgi_client(env: dict):
+    # 配置在导入 app 时读取
+    os.environ.update(env)
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            yield client
+
+
+@asynccontextmanager
+async def _uvicorn_client(env: dict, args):
+    base = f"http://127.0.0.1:{args.port}"
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=_BACKEND_DIR, env=dict(os.environ, **env),
+    )
+    try:
+        await _wait_ready(base)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60.0) as client:
+            yield client
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+
+
+def _git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=_BACKEND_DIR)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, cwd=_BACKEND_DIR)
+        return rev.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+    except OSError:
+        return "unknown"
+
+
+async def run(args) -> dict:
+    profile = workloads.PROFILES[args.workload]
+    with_nl = profile.get("nl", 0) > 0
+    async with _fake_llm(args, with_nl) as llm_port:
+        env = _server_env(args, llm_port)
+        target = _asgi_client(env) if args.target == "asgi" else _uvicorn_client(env, args)
+        async with target as client:
+            dataset = await _dataset(client, with_nl)
+            if args.warmup:
+                await run_load(client, profile, dataset, min(args.concurrency, 20), args.warmup, args.seed + 1)
+            results = await run_load(client, profile, dataset, args.concurrency, args.duration, args.seed)
+    database_url = args.database_url or os.getenv("DATABASE_URL", "")
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "target": args.target,
+            "workers": args.workers if args.target == "uvicorn" else 1,
+            "db_async": args.db_async,
+            "database": database_url.split(":", 1)[0],
+            "seeded_max_id": dataset.max_id,
+            "categories": len(dataset.category_ids),
+            "workload": args.workload,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+            "nl_llm_only": args.nl_llm_only if with_nl else None,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        **results,
+    }
@@ -0,0 +1,104 @@
+"""
+播种压测数据：行在数据库内由序列生成（PostgreSQL generate_series / SQLite 递归 CTE），
+不经过 Python 逐行构造，千万级也只是几条 INSERT ... SELECT。内容由序号决定，同样的参数得到同样的数据。
+"""
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.db.session import Base
+import app.models  # noqa: F401  注册全部表
+from app.services import stats_service
+from scripts.bench.workloads import SEARCH_WORDS
+
+# 标题取词表 g % 16 处的词，描述取 (g / 16) % 16 处的词，两词同时出现的概率约 1/256
+def _word_case(expr: str) -> str:
+    whens = " ".join(f"WHEN {i} THEN '{w}'" for i, w in enumerate(SEARCH_WORDS))
+    return f"CASE {expr} {whens} END"
+
+
+# 按序号 g 生成各列；分类约 10% 为空，状态 / 优先级 / 截止日期循环分布
+_TODO_COLUMNS = f"""
+    'bench todo ' || g || ' ' || {_word_case(f"g % {len(SEARCH_WORDS)}")},
+    CASE WHEN g % 3 = 0 THEN 'bench description ' || g || ' ' || {_word_case(f"(g / {len(SEARCH_WORDS)}) % {len(SEARCH_WORDS)}")} END,
+    CASE g % 3 WHEN 0 THEN 'pending' WHEN 1 THEN 'in_progress' ELSE 'done' END,
+    CASE (g / 3) % 3 WHEN 0 THEN 'low' WHEN 1 THEN 'medium' ELSE 'high' END,
+    {{due_date}},
+    {{category}}
+"""
+_CATEGORY = "CASE WHEN g % 10 = 0 THEN NULL ELSE :first_category + (g / 10) % :categories END"
+
+_INSERT_TODOS = {
+    "postgresql": """
+        INSERT INTO todo_items (title, description, status, priority, due_date, category_id)
+        SELECT {columns} FROM generate_series(:start, :stop) AS g
+    """,
+    "sqlite": """
+        WITH RECURSIVE seq(g) AS (SELECT :start UNION ALL SELECT g + 1 FROM seq WHERE g < :stop)
+        INSERT INTO todo_items (title, description, status, priority, due_date, category_id)
+        SELECT {columns} FROM seq
+    """,
+}
+_DUE_DATE = {
+    "postgresql": "DATE '2025-01-01' + (g % 365)",
+    "sqlite": "date('2025-01-01', '+' || (g % 365) || ' days')",
+}
+_INSERT_CATEGORIES = {
+    "postgresql": "INSERT INTO categories (name) SELECT 'bench category ' || g FROM generate_series(1, :n) AS g",
+    "sqlite": """
+        WITH RECURSIVE seq(g) AS (SELECT 1 UNION ALL SELECT g + 1 FROM seq WHERE g < :n)
+        INSERT INTO categories (name) SELECT 'bench category ' || g FROM seq
+    """,
+}
+_RESET = {
+    "postgresql": ["TRUNCATE todo_items, categories, nl_jobs, nl_parse_cache RESTART IDENTITY CASCADE"],
+    "sqlite": [
+        "DELETE FROM nl_jobs", "DELETE FROM nl_parse_cache", "DELETE FROM todo_items", "DELETE FROM categories",
+    ],
+}
+
+
+def seed(url: str, todos: int, categories: int, reset: bool = False, chunk: int = 1_000_000) -> dict:
+    """插入 todos 条待办与 categories 个分类，返回播种后的规模与耗时。"""
+    engine = create_engine(url)
+    dialect = engine.dialect.name
+    if dialect not in _INSERT_TODOS:
+        raise ValueError(f"不支持的数据库：{dialect}")
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if reset:
+            for stmt in _RESET[dialect]:
+                conn.execute(text(stmt))
+        first_category = None
+        if categories:
+            # 单条 INSERT 内分配的自增 id 连续，取最小值作为待办 category_id 的起点
+            ids = conn.execute(text(_INSERT_CATEGORIES[dialect] + " RETURNING id"), {"n": categories}).scalars()
+            first_category = min(ids)
+        first_todo = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM todo_items")).scalar() + 1
+
+    columns = _TODO_COLUMNS.format(due_date=_DUE_DATE[dialect], category=_CATEGORY if categories else "NULL")
+    insert_todos = text(_INSERT_TODOS[dialect].format(columns=columns))
+    params = {"first_category": first_category, "categories": categories} if categories else {}
+    for start in range(first_todo, first_todo + todos, chunk):
+        stop = min(start + chunk, first_todo + todos) - 1
+        with engine.begin() as conn:  # 分批提交，避免千万级单事务
+            conn.execute(insert_todos, {**params, "start": start, "stop": stop})
+        print(f"seeded todos {stop - first_todo + 1}/{todos}", flush=True)
+
+    with Session(engine) as db:
+        # 直接 INSERT 绕过了写路径，按全表重建统计计数器（同时推进版本号，让已缓存的列表 ETag 失效）
+        stats_service.rebuild(db)
+    with engine.begin() as conn:
+        # 重新收集统计信息供规划器与估算总数使用
+        conn.exec_driver_sql("ANALYZE")
+        total = conn.execute(text("SELECT COUNT(*) FROM todo_items")).scalar()
+        max_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM todo_items")).scalar()
+    engine.dispose()
+    return {
+        "dialect": dialect,
+        "todos": total,
+        "max_id": max_id,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
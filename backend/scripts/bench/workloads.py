@@ -0,0 +1,144 @@
+"""
+负载定义：每个操作是一个协程 op(client, state) -> Response | None（None 表示本轮跳过、不计入统计），
+PROFILES 为按权重混合的负载。每个并发 worker 有独立的随机数种子与游标等状态，同样的种子得到同样的请求序列。
+"""
+import json
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+_CORPUS = Path(__file__).resolve().parent.parent / "nl_corpus.jsonl"
+_STATUSES = ("pending", "in_progress", "done")
+_PRIORITIES = ("low", "medium", "high")
+# 搜索负载的词表，seed 按序号把这些词写进标题与描述
+SEARCH_WORDS = (
+    "meeting", "report", "review", "deploy", "invoice", "travel", "dentist", "grocery",
+    "开会", "报告", "复习", "发布", "报销", "出差", "看牙", "买菜",
+)
+
+
+@dataclass
+class Dataset:
+    """压测开始前从服务读出的数据规模。"""
+    max_id: int
+    category_ids: list[int]
+    nl_texts: list[str] = field(default_factory=list)
+
+
+@dataclass
+class WorkerState:
+    dataset: Dataset
+    rng: random.Random
+    cursor: str | None = None
+    created: list[int] = field(default_factory=list)  # 本 worker 创建的待办，删除只删这些，保持播种数据稳定
+
+    def seeded_id(self) -> int:
+        return self.rng.randint(1, max(self.dataset.max_id, 1))
+
+    def category_id(self) -> int | None:
+        ids = self.dataset.category_ids
+        return self.rng.choice(ids) if ids and self.rng.random() < 0.9 else None
+
+
+def load_nl_texts() -> list[str]:
+    with _CORPUS.open(encoding="utf-8") as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+# ---- 操作 ----
+
+async def list_filtered(client: httpx.AsyncClient, state: WorkerState):
+    params = {"limit": 20}
+    kind = state.rng.randrange(4)
+    if kind == 1:
+        params["status"] = state.rng.choice(_STATUSES)
+    elif kind == 2:
+        params["priority"] = state.rng.choice(_PRIORITIES)
+    elif kind == 3 and state.dataset.category_ids:
+        params["category_id"] = state.rng.choice(state.dataset.category_ids)
+    return await client.get("/todos", params=params)
+
+
+async def list_deep_cursor(client: httpx.AsyncClient, state: WorkerState):
+    """沿 X-Next-Cursor 一直往后翻页，到底后从头开始。"""
+    params = {"limit": 50}
+    if state.cursor:
+        params["cursor"] = state.cursor
+    response = await client.get("/todos", params=params)
+    state.cursor = response.headers.get("X-Next-Cursor")
+    return response
+
+
+async def list_deep_offset(client: httpx.AsyncClient, state: WorkerState):
+    """OFFSET 深翻页，与游标分页对照。"""
+    offset = state.rng.randrange(max(min(state.dataset.max_id, 100_000) - 20, 1))
+    return await client.get("/todos", params={"limit": 20, "offset": offset})
+
+
+async def get_todo(client: httpx.AsyncClient, state: WorkerState):
+    return await client.get(f"/todos/{state.seeded_id()}")
+
+
+async def search(client: httpx.AsyncClient, state: WorkerState):
+    """单词 / 双词（AND）搜索，部分请求带筛选条件。"""
+    words = state.rng.sample(SEARCH_WORDS, state.rng.choice((1, 1, 2)))
+    params = {"q": " ".join(words), "limit": 20}
+    if state.rng.random() < 0.3:
+        params["status"] = state.rng.choice(_STATUSES)
+    return await client.get("/todos/search", params=params)
+
+
+async def create_todo(client: httpx.AsyncClient, state: WorkerState):
+    n = state.rng.randrange(1_000_000)
+    response = await client.post("/todos", json={
+        "title": f"bench created {n}",
+        "priority": state.rng.choice(_PRIORITIES),
+        "category_id": state.category_id(),
+    })
+    if response.status_code == 200:
+        state.created.append(response.json()["id"])
+    return response
+
+
+async def patch_todo(client: httpx.AsyncClient, state: WorkerState):
+    return await client.patch(f"/todos/{state.seeded_id()}", json={"status": state.rng.choice(_STATUSES)})
+
+
+async def delete_todo(client: httpx.AsyncClient, state: WorkerState):
+    if not state.created:
+        return None
+    return await client.delete(f"/todos/{state.created.pop()}")
+
+
+async def create_from_nl(client: httpx.AsyncClient, state: WorkerState):
+    response = await client.post("/todos/from-natural-language", json={"text": state.rng.choice(state.dataset.nl_texts)})
+    if response.status_code == 200:
+        state.created.append(response.json()["id"])
+    return response
+
+
+OPS = {
+    "list": list_filtered,
+    "deep_cursor": list_deep_cursor,
+    "deep_offset": list_deep_offset,
+    "get": get_todo,
+    "search": search,
+    "create": create_todo,
+    "patch": patch_todo,
+    "delete": delete_todo,
+    "nl": create_from_nl,
+}
+
+# 操作 -> 权重
+PROFILES = {
+    "read": {"list": 50, "deep_cursor": 15, "deep_offset": 5, "get": 30},
+    "mixed": {"list": 30, "deep_cursor": 10, "deep_offset": 5, "get": 20, "create": 12, "patch": 12, "delete": 8, "nl": 3},
+    "write": {"create": 40, "patch": 40, "delete": 20},
+    "nl": {"nl": 100},
+    "search": {"search": 80, "create": 10, "patch": 10},
+}
+
+# 视为成功的状态码：删除为 204；随机 id 可能落在之前运行删掉的行上，get / patch 的 404 不算错误
+OK_STATUS = {"delete": (204,), "get": (200, 404), "patch": (200, 404)}
@@ -0,0 +1,135 @@
+"""
+同步 / 异步数据库模式吞吐对比：分别以 DB_ASYNC=false / true 启动 uvicorn，
+用高并发客户端压测同一组接口，并排输出 req/s 与延迟分位。
+
+用法（在 backend 目录下，需已配置 DATABASE_URL 且已建表）：
+    uv run python -m scripts.bench_db_modes --concurrency 200 --duration 15
+    uv run python -m scripts.bench_db_modes --json > bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+PATHS = ["/todos?limit=20", "/categories"]
+
+
+def _start_server(port: int, db_async: bool, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_ASYNC="true" if db_async else "false", LOG_LEVEL="WARNING")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        env=env,
+    )
+
+
+async def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server {base} not ready")
+
+
+async def _seed(base: str, count: int) -> None:
+    async with httpx.AsyncClient(base_url=base) as client:
+        existing = (await client.get("/todos", params={"limit": 1})).json()
+        if existing:
+            return
+        for i in range(count):
+            await client.post("/todos", json={"title": f"bench todo {i}"})
+
+
+async def _load(base: str, concurrency: int, duration: float, paths: list[str] = PATHS) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30.0) as client:
+        async def worker(n: int) -> None:
+            nonlocal errors
+            i = n
+            while time.monotonic() < stop_at:
+                path = paths[i % len(paths)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    if resp.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(pct(0.50), 2),
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+    }
+
+
+async def _bench_mode(db_async: bool, args) -> dict:
+    port = args.port + (1 if db_async else 0)
+    base = f"http://127.0.0.1:{port}"
+    proc = _start_server(port, db_async, args.workers)
+    try:
+        await _wait_ready(base)
+        await _seed(base, args.seed)
+        await _load(base, min(args.concurrency, 20), 2.0)  # 预热连接池
+        return await _load(base, args.concurrency, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="sync vs async DB throughput")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=200, help="表为空时预先插入的待办数")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 便于对比")
+    args = parser.parse_args()
+
+    results = {
+        "sync": await _bench_mode(False, args),
+        "async": await _bench_mode(True, args),
+    }
+    if args.json:
+        print(json.dumps({"concurrency": args.concurrency, "duration": args.duration, **results}, indent=2))
+        return
+    print(f"concurrency={args.concurrency} duration={args.duration}s workers={args.workers}")
+    print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+访问日志中间件前后对比：
+- before：BaseHTTPMiddleware 版 RequestIdAndLoggingMiddleware + 每个 logger 直接挂同步 StreamHandler（改造前的实现，复刻在本脚本中）；
+- after：纯 ASGI RequestContextMiddleware + QueueHandler/QueueListener。
+两种配置分别以 uvicorn 启动（stdout 写入临时文件，接近真实部署），对 /health 与 GET /todos 压测并输出 req/s 与延迟分位。
+
+用法（在 backend 目录下，需已配置 DATABASE_URL 且已建表）：
+    uv run python -m scripts.bench_middleware --concurrency 100 --duration 10
+    uv run python -m scripts.bench_middleware --json > bench_middleware.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from fastapi import Request
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from scripts.bench_db_modes import _load, _seed, _wait_ready
+
+PATHS = {"health": "/health", "todos": "/todos?limit=20"}
+
+
+class LegacyRequestIdAndLoggingMiddleware(BaseHTTPMiddleware):
+    """改造前的实现，仅用于对比。"""
+    async def dispatch(self, request: Request, call_next):
+        from app.core.logging import request_id_ctx
+
+        logger = logging.getLogger("app.main")
+        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        request.state.request_id = request_id
+        token = request_id_ctx.set(request_id)
+        start = time.perf_counter()
+        try:
+            logger.info("request started %s %s", request.method, request.url.path)
+            response = await call_next(request)
+            duration_ms = (time.perf_counter() - start) * 1000
+            logger.info(
+                "request finished %s %s %s %.2fms",
+                request.method, request.url.path, response.status_code, duration_ms,
+            )
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            request_id_ctx.reset(token)
+
+
+def legacy_app():
+    """uvicorn --factory 入口：把 app 还原为改造前的中间件与同步日志输出。"""
+    from app.core import logging as app_logging
+    from app.core.middleware import RequestContextMiddleware
+    from app.main import app
+
+    app_logging.stop_listener()
+    formatter = logging.Formatter(
+        "%(asctime)s [%(request_id)s] %(levelname)s %(name)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger) and app_logging._queue_handler in logger.handlers:
+            logger.removeHandler(app_logging._queue_handler)
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(formatter)
+            handler.addFilter(app_logging.RequestIdFilter())
+            logger.addHandler(handler)
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not RequestContextMiddleware]
+    app.user_middleware.insert(0, Middleware(LegacyRequestIdAndLoggingMiddleware))
+    return app
+
+
+def current_app():
+    from app.main import app
+    return app
+
+
+def _start_server(port: int, factory: str, log_file) -> subprocess.Popen:
+    env = dict(os.environ, LOG_LEVEL="INFO")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", f"scripts.bench_middleware:{factory}", "--factory",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ],
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def _bench_variant(factory: str, port: int, args) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryFile() as log_file:
+        proc = _start_server(port, factory, log_file)
+        try:
+            await _wait_ready(base)
+            await _seed(base, args.seed)
+            results = {}
+            for name, path in PATHS.items():
+                await _load(base, min(args.concurrency, 20), 1.0, [path])  # 预热
+                results[name] = await _load(base, args.concurrency, args.duration, [path])
+            return results
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="BaseHTTPMiddleware vs pure ASGI middleware")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=200, help="表为空时预先插入的待办数")
+    parser.add_argument("--port", type=int, default=8775)
+    parser.add_argument("--json", action="store_true", help="输出 JSON 便于对比")
+    args = parser.parse_args()
+
+    results = {
+        "before": await _bench_variant("legacy_app", args.port, args),
+        "after": await _bench_variant("current_app", args.port + 1, args),
+    }
+    if args.json:
+        print(json.dumps({"concurrency": args.concurrency, "duration": args.duration, **results}, indent=2))
+        return
+    print(f"concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'path':<8}{'variant':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in PATHS:
+        for variant in ("before", "after"):
+            r = results[variant][name]
+            print(f"{name:<8}{variant:<8}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+    for name in PATHS:
+        before, after = results["before"][name]["rps"], results["after"][name]["rps"]
+        if before:
+            print(f"{name}: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+本地规则解析评估：在标注语料（scripts/nl_corpus.jsonl）上统计
+- 覆盖率：置信度 >= NL_RULE_MIN_CONFIDENCE、可跳过 LLM 的比例；
+- 准确率：被覆盖条目的 due_date / priority 与标注一致的比例（标题只做参考，不计入）；
+- 加 --llm 时同时调用百炼：规则与 LLM 输出的一致率，以及被覆盖条目节省的 LLM 耗时。
+
+用法（在 backend 目录下）：
+    uv run python -m scripts.eval_rule_parser
+    uv run python -m scripts.eval_rule_parser --llm --json > eval.json
+"""
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+from app.config import settings
+from app.llm import rule_parser
+
+CORPUS = Path(__file__).resolve().parent / "nl_corpus.jsonl"
+
+
+def _load(path: Path) -> list[dict]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _same(a: dict, b: dict) -> bool:
+    return a.get("due_date") == b.get("due_date") and a.get("priority") == b.get("priority")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="rule parser vs labels / LLM")
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--threshold", type=float, default=settings.NL_RULE_MIN_CONFIDENCE)
+    parser.add_argument("--llm", action="store_true", help="同时调用 LLM 对比（需配置 BAILIAN_API_KEY）")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="逐条输出")
+    args = parser.parse_args()
+
+    if args.llm:
+        from app.llm.ali_client import parse_natural_language_to_todo
+
+    rows = []
+    for item in _load(args.corpus):
+        today = date.fromisoformat(item["today"])
+        start = time.perf_counter()
+        result = rule_parser.parse(item["text"], today)
+        rule_ms = (time.perf_counter() - start) * 1000
+        row = {
+            "text": item["text"],
+            "expected": item["expected"],
+            "rule": result.as_parsed(),
+            "confidence": result.confidence,
+            "reasons": result.reasons,
+            "covered": result.confidence >= args.threshold,
+            "rule_ms": rule_ms,
+        }
+        row["rule_correct"] = _same(row["rule"], item["expected"])
+        if args.llm:
+            start = time.perf_counter()
+            try:
+                row["llm"] = parse_natural_language_to_todo(item["text"], today)
+            except Exception as e:
+                row["llm"] = {"error": str(e)}
+            row["llm_ms"] = (time.perf_counter() - start) * 1000
+            row["llm_correct"] = _same(row["llm"], item["expected"])
+            row["agree"] = _same(row["rule"], row["llm"])
+        rows.append(row)
+
+    covered = [r for r in rows if r["covered"]]
+    summary = {
+        "items": len(rows),
+        "threshold": args.threshold,
+        "covered": len(covered),
+        "coverage": round(len(covered) / len(rows), 3) if rows else 0.0,
+        "covered_accuracy": round(sum(r["rule_correct"] for r in covered) / len(covered), 3) if covered else 0.0,
+        "avg_rule_ms": round(sum(r["rule_ms"] for r in rows) / len(rows), 3) if rows else 0.0,
+    }
+    if args.llm:
+        summary["llm_accuracy"] = round(sum(r["llm_correct"] for r in rows) / len(rows), 3)
+        summary["covered_agreement"] = (
+            round(sum(r["agree"] for r in covered) / len(covered), 3) if covered else 0.0
+        )
+        summary["avg_llm_ms"] = round(sum(r["llm_ms"] for r in rows) / len(rows), 1)
+        summary["saved_ms_total"] = round(sum(r["llm_ms"] - r["rule_ms"] for r in covered), 1)
+
+    if args.json:
+        print(json.dumps({"summary": summary, "items": rows}, ensure_ascii=False, indent=2, default=str))
+        return
+    if args.verbose:
+        for r in rows:
+            mark = "ok " if r["rule_correct"] else "ERR"
+            flag = "rule" if r["covered"] else "llm "
+            print(f"{mark} {flag} {r['confidence']:.2f} {r['text']} -> "
+                  f"{r['rule']['title']} | {r['rule']['due_date']} | {r['rule']['priority']} {r['reasons'] or ''}")
+        print()
+    for key, value in summary.items():
+        print(f"{key:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
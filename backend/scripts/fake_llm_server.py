@@ -0,0 +1,110 @@
+"""
+本地假 LLM 服务：兼容 OpenAI /v1/chat/completions，用于联调与压测自然语言接口，不消耗真实额度。
+回复内容由本地规则解析生成（批量提示词下按 JSON 数组逐条回复），可配置固定延迟与失败率（返回 500，可用来观察熔断）。
+
+用法（在 backend 目录下）：
+    uv run python -m scripts.fake_llm_server --port 9100 --latency 1.5 --fail-rate 0.1
+    # 另开终端，让后端指向它
+    BAILIAN_API_KEY=fake ALI_BASE_URL=http://127.0.0.1:9100/v1 NL_RULE_ENABLED=false uv run uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import re
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.llm import rule_parser
+
+_TODAY = re.compile(r"今天是 (\d{4}-\d{2}-\d{2})")
+
+
+def _reply_content(messages: list[dict]) -> str:
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    found = _TODAY.findall(system)  # 取最后一处：提示词示例里也有「今天是」
+    today = date.fromisoformat(found[-1]) if found else date.today()
+    try:
+        batch = json.loads(user)
+    except ValueError:
+        batch = None
+    if isinstance(batch, list):
+        return json.dumps([{"i": item["i"], **_fields(item["text"], today)} for item in batch], ensure_ascii=False)
+    return json.dumps(_fields(user, today), ensure_ascii=False)
+
+
+def _fields(text: str, today: date) -> dict:
+    parsed = rule_parser.parse(text, today).as_parsed()
+    return {k: parsed[k] for k in ("title", "description", "due_date", "priority")}
+
+
+def make_handler(latency: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 保持长连接，与真实服务一致
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, body: dict) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            if latency:
+                time.sleep(latency)
+            if random.random() < fail_rate:
+                self._send(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                return
+            messages = payload.get("messages", [])
+            content = _reply_content(messages)
+            # 粗略估算 token 数（约 2 字符 1 token），便于观察 llm_tokens_total 指标
+            prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 2
+            completion_tokens = len(content) // 2
+            self._send(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="fake OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=1.0, help="每次回复前的固定延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回 500 的比例，0～1")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.latency, args.fail_rate))
+    print(f"fake llm listening on http://{args.host}:{args.port}/v1 latency={args.latency}s fail_rate={args.fail_rate}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
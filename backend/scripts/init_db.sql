@@ -20,4 +20,100 @@ CREATE TABLE IF NOT EXISTS todo_items (
 
 -- 常用查询字段加索引
 CREATE INDEX IF NOT EXISTS idx_todo_items_status ON todo_items(status);
-CREATE INDEX IF NOT EXISTS idx_todo_items_category_id ON todo_items(category_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_todo_items_category_id ON todo_items(category_id);
+
+-- 游标分页：WHERE 筛选 + 按 id 倒序，或按 (due_date, id) 排序时可直接走索引，无需 OFFSET 扫描
+CREATE INDEX IF NOT EXISTS idx_todo_items_due_date_id ON todo_items(due_date, id);
+CREATE INDEX IF NOT EXISTS idx_todo_items_status_id ON todo_items(status, id);
+CREATE INDEX IF NOT EXISTS idx_todo_items_priority_id ON todo_items(priority, id);
+CREATE INDEX IF NOT EXISTS idx_todo_items_category_id_id ON todo_items(category_id, id);
+
+-- 数据版本号：写入时同事务 +1，作为列表 ETag 的变更水位
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO data_versions (name, version) VALUES ('todos', 0) ON CONFLICT (name) DO NOTHING;
+
+-- 增量同步（GET /todos/changes）：change_seq 为最后一次改动所在事务的 todos 版本号；
+-- 删除写入墓碑，过期墓碑由 python -m scripts.todo_tombstones purge 清理
+ALTER TABLE todo_items ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_todo_items_change_seq_id ON todo_items(change_seq, id);
+CREATE TABLE IF NOT EXISTS todo_tombstones (
+    id INTEGER PRIMARY KEY,
+    change_seq BIGINT NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_todo_tombstones_change_seq_id ON todo_tombstones(change_seq, id);
+CREATE INDEX IF NOT EXISTS ix_todo_tombstones_deleted_at ON todo_tombstones(deleted_at);
+
+-- 冷热分离：完成超过 TODO_ARCHIVE_AFTER_DAYS 天的待办由后台任务分批移入归档表（保留原 id），
+-- 列表 / 详情带 include_archived 时才查询；手工执行见 python -m scripts.todo_archive
+CREATE TABLE IF NOT EXISTS todo_items_archive (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(200) NOT NULL,
+    description TEXT,
+    status VARCHAR(20) NOT NULL,
+    priority VARCHAR(20) NOT NULL,
+    due_date DATE,
+    category_id INTEGER REFERENCES categories(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_todo_items_archive_category_id_id ON todo_items_archive(category_id, id);
+CREATE INDEX IF NOT EXISTS idx_todo_items_archive_due_date_id ON todo_items_archive(due_date, id);
+CREATE INDEX IF NOT EXISTS idx_todo_items_status_updated_at ON todo_items(status, updated_at);
+
+-- 待办统计计数器（GET /todos/stats）：(维度, 取值) -> 条数，写入时同事务增减；
+-- 已有数据的库建表后执行一次 python -m scripts.todo_stats rebuild
+CREATE TABLE IF NOT EXISTS todo_stats (
+    dimension VARCHAR(20) NOT NULL,
+    key VARCHAR(50) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, key)
+);
+
+-- 自然语言解析缓存：key = sha256(参考日期 + 规整后的文本)，多个 worker 共享
+CREATE TABLE IF NOT EXISTS nl_parse_cache (
+    key VARCHAR(64) PRIMARY KEY,
+    text TEXT NOT NULL,
+    ref_date DATE NOT NULL,
+    result TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_nl_parse_cache_expires_at ON nl_parse_cache(expires_at);
+
+-- 自然语言创建待办的后台任务（POST /todos/jobs），任一 worker 都可查询状态
+CREATE TABLE IF NOT EXISTS nl_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    text TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    todo_id INTEGER REFERENCES todo_items(id) ON DELETE SET NULL,
+    source VARCHAR(20),
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_nl_jobs_status ON nl_jobs(status);
+-- 滞留任务巡检：按 (status, updated_at) 找出超时未推进的 queued / running 任务
+ALTER TABLE nl_jobs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+CREATE INDEX IF NOT EXISTS ix_nl_jobs_status_updated_at ON nl_jobs(status, updated_at);
+
+-- 全文搜索（GET /todos/search），与 app/models/search.py 保持一致：
+-- search_vector 为生成列，写入时由数据库自动维护；标题权重 A、描述权重 B。
+-- 中文没有空格分词，额外写入连续汉字 / 假名的二元组，两个字及以上的中文词也能走 GIN 索引
+CREATE OR REPLACE FUNCTION todo_search_bigrams(s text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(string_agg(substr(m[1], i, 2), ' '), '')
+    FROM regexp_matches(coalesce(s, ''), '([\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]{2,})', 'g') AS m,
+         generate_series(1, char_length(m[1]) - 1) AS i
+$$;
+ALTER TABLE todo_items ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(title, '') || ' ' || todo_search_bigrams(title)), 'A')
+    || setweight(to_tsvector('simple', coalesce(description, '') || ' ' || todo_search_bigrams(description)), 'B')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_todo_items_search_vector ON todo_items USING gin (search_vector);
@@ -0,0 +1,53 @@
+"""
+已完成待办的归档与恢复（见 app/services/archive_service.py）。应用进程内可开启后台归档任务，
+这里用于首次上线时集中归档存量数据、或不开后台任务（TODO_ARCHIVE_AFTER_DAYS 默认 0）而由 cron 定时执行。
+中断后重新执行即可继续，已提交的批次不会重做。
+
+用法（在 backend 目录下）：
+    uv run python -m scripts.todo_archive run                  # 归档完成超过 TODO_ARCHIVE_AFTER_DAYS 天的待办（未设置时需给 --days）
+    uv run python -m scripts.todo_archive run --days 30 --batch 2000
+    uv run python -m scripts.todo_archive restore --id 123     # 把归档的待办移回热表
+"""
+import argparse
+import sys
+
+from app.config import settings
+from app.db.session import SessionLocal
+from app.services import archive_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="archive completed todos / restore archived todos")
+    parser.add_argument("action", choices=("run", "restore"))
+    parser.add_argument("--days", type=float, default=settings.TODO_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch", type=int, default=settings.TODO_ARCHIVE_BATCH_ROWS)
+    parser.add_argument("--pause", type=float, default=settings.TODO_ARCHIVE_PAUSE_SECONDS)
+    parser.add_argument("--id", type=int)
+    args = parser.parse_args()
+    if SessionLocal is None:
+        print("DATABASE_URL 未配置", file=sys.stderr)
+        return 2
+    if args.action == "run":
+        if args.days <= 0:
+            print("--days 必须大于 0（或设置 TODO_ARCHIVE_AFTER_DAYS）", file=sys.stderr)
+            return 2
+        print(f"archived {archive_service.run(args.days, args.batch, args.pause)} todos")
+        return 0
+    if args.id is None:
+        print("restore 需要 --id", file=sys.stderr)
+        return 2
+    with SessionLocal() as db:
+        try:
+            item = archive_service.restore_todo(db, args.id)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    if item is None:
+        print(f"todo {args.id} not in archive", file=sys.stderr)
+        return 1
+    print(f"restored todo {args.id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
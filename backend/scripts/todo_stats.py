@@ -0,0 +1,35 @@
+"""
+待办统计计数器（todo_stats）的校验与重建：计数器由写路径增量维护，
+手工改库、seed 脚本直接插入或旧库升级后可能与 todo_items 不一致。
+
+用法（在 backend 目录下）：
+    uv run python -m scripts.todo_stats verify     # 有漂移时逐项列出，退出码为 1
+    uv run python -m scripts.todo_stats rebuild    # 按全表聚合重写计数器
+"""
+import argparse
+import sys
+
+from app.db.session import SessionLocal
+from app.services import stats_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="verify / rebuild todo stats counters")
+    parser.add_argument("action", choices=("verify", "rebuild"))
+    args = parser.parse_args()
+    if SessionLocal is None:
+        print("DATABASE_URL 未配置", file=sys.stderr)
+        return 2
+    with SessionLocal() as db:
+        if args.action == "rebuild":
+            print(f"rebuilt {stats_service.rebuild(db)} counters")
+            return 0
+        drift = stats_service.verify(db)
+    for (dimension, key), (have, want) in drift.items():
+        print(f"{dimension}:{key or '-'} counter={have} actual={want}")
+    print(f"{len(drift)} counters drifted" if drift else "todo stats ok")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
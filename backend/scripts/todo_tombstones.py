@@ -0,0 +1,31 @@
+"""
+增量同步（GET /todos/changes）删除墓碑的清理：删除早于保留期的墓碑，并记录清理水位，
+水位之前的 since 请求返回 410，客户端改为全量同步。建议每天定时执行一次。
+
+用法（在 backend 目录下）：
+    uv run python -m scripts.todo_tombstones purge               # 保留 TODO_TOMBSTONE_RETENTION_DAYS 天（默认 30）
+    uv run python -m scripts.todo_tombstones purge --days 7
+"""
+import argparse
+import sys
+
+from app.config import settings
+from app.db.session import SessionLocal
+from app.services import change_service
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="purge expired todo tombstones")
+    parser.add_argument("action", choices=("purge",))
+    parser.add_argument("--days", type=float, default=settings.TODO_TOMBSTONE_RETENTION_DAYS)
+    args = parser.parse_args()
+    if SessionLocal is None:
+        print("DATABASE_URL 未配置", file=sys.stderr)
+        return 2
+    with SessionLocal() as db:
+        print(f"purged {change_service.purge_tombstones(db, args.days)} tombstones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -239,6 +239,55 @@ async function loadTodos() {
   }
 }
 
+// ========== 变更事件（SSE） ==========
+// 连上 /todos/events 后，增删改由事件推送到本地列表（含其他标签页 / 用户的修改），写操作后不再整表重拉；
+// 断线期间浏览器会带 Last-Event-ID 自动重连补发，服务端补不齐时发 reset，此时整表重新加载。
+let eventsConnected = false;
+
+async function refreshTodosIfOffline() {
+  if (!eventsConnected) await loadTodos();
+}
+
+function applyTodoChanges(changes) {
+  for (const c of changes) {
+    const idx = todos.findIndex((t) => t.id === c.id);
+    if (c.op === 'delete') {
+      if (idx >= 0) todos.splice(idx, 1);
+    } else if (idx >= 0) {
+      todos[idx] = c.todo;
+    } else {
+      todos.unshift(c.todo);
+    }
+  }
+  renderTodos();
+}
+
+function onChangeEvent(e) {
+  const data = JSON.parse(e.data);
+  if (data.type === 'category') {
+    loadCategories();
+  } else if (data.reload || (data.changes || []).some((c) => c.op === 'upsert' && !c.todo)) {
+    // 大批量变更只带 id，整表重新加载
+    loadTodos();
+  } else {
+    applyTodoChanges(data.changes || []);
+  }
+}
+
+function connectEvents() {
+  if (typeof EventSource === 'undefined') return;
+  const source = new EventSource(`${API_BASE}/todos/events`);
+  source.addEventListener('ready', (e) => {
+    eventsConnected = true;
+    if (!JSON.parse(e.data).resumed) loadTodos();
+  });
+  source.addEventListener('reset', () => loadTodos());
+  source.addEventListener('change', onChangeEvent);
+  source.onerror = () => {
+    eventsConnected = false;
+  };
+}
+
 function openTodoModal(id) {
   if (id) {
     el.modalTitle.textContent = '编辑任务';
@@ -287,7 +336,7 @@ async function submitTodo(e) {
       showApiStatus('已创建', 'success');
     }
     closeTodoModal();
-    await loadTodos();
+    await refreshTodosIfOffline();
     setTimeout(hideApiStatus, 2000);
   } catch (err) {
     showApiStatus('保存失败：' + err.message, 'error');
@@ -301,7 +350,7 @@ async function toggleTodoStatus(id) {
   try {
     await apiPatch(`/todos/${id}`, { status: nextStatus });
     showApiStatus(nextStatus === 'done' ? '已标记完成' : '已标记未完成', 'success');
-    await loadTodos();
+    await refreshTodosIfOffline();
     setTimeout(hideApiStatus, 1500);
   } catch (err) {
     showApiStatus('更新失败：' + err.message, 'error');
@@ -313,7 +362,7 @@ async function deleteTodo(id) {
   try {
     await apiDelete(`/todos/${id}`);
     showApiStatus('已删除', 'success');
-    await loadTodos();
+    await refreshTodosIfOffline();
     setTimeout(hideApiStatus, 1500);
   } catch (err) {
     showApiStatus('删除失败：' + err.message, 'error');
@@ -544,7 +593,7 @@ el.btnNaturalLanguageTodo.addEventListener('click', async () => {
     await apiPost('/todos/from-natural-language', { text });
     el.inputNaturalLanguage.value = '';
     showApiStatus('已根据「' + text.slice(0, 20) + (text.length > 20 ? '…' : '') + '」创建任务', 'success');
-    await loadTodos();
+    await refreshTodosIfOffline();
     setTimeout(hideApiStatus, 3000);
   } catch (err) {
     showApiStatus('创建失败：' + err.message, 'error');
@@ -585,5 +634,7 @@ el.todoList.addEventListener('click', onTodoListClick);
 // ========== 初始化 ==========
 (async function init() {
   await loadCategories();
+  connectEvents();
+  // 事件流连上后 ready 事件会再加载一次列表；先加载一次，不让首屏等待连接
   await loadTodos();
 })();